@@ -0,0 +1,102 @@
+"""
+Benchmark of /chart throughput under parallel load.
+
+A uvicorn server with --workers worker processes is started on a copy of the database, and
+POST /chart requests for --countries countries are sent by 1, 4, 16 and 64 concurrent clients.
+The DB read cache is disabled by default, so that every request reads the database.
+Basic values missing in the database are scraped from the fake upstream server on startup.
+
+Usage: python -m benchmarks.bench_chart_concurrency --database database.db --requests 200 --workers 4
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.bench_scenarios import percentile
+from benchmarks.upstream import FakeUpstream
+
+
+async def load(url: str, form: dict, concurrency: int, requests: int) -> tuple[float, list[float]]:
+    """
+    Send requests by concurrent clients.
+
+    :return: tuple of total time and durations of every request in seconds
+    """
+    durations = []
+    remaining = iter(range(requests))
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        async def worker():
+            for _ in remaining:
+                started = time.perf_counter()
+                response = await client.post(url, data=form)
+                durations.append(time.perf_counter() - started)
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - started, durations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", default="database.db", help="database with scraped values")
+    parser.add_argument("--countries", type=int, default=10, help="number of countries on the chart")
+    parser.add_argument("--requests", type=int, default=200, help="number of requests per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--db-cache-size", type=int, default=0, help="DB read cache size of the server")
+    parser.add_argument("--workers", type=int, default=1, help="number of server worker processes")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir, FakeUpstream() as upstream:
+        database_path = os.path.join(tmp_dir, "database.db")
+        shutil.copyfile(args.database, database_path)
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        env = dict(os.environ, LOG_LEVEL="WARNING", DB_PATH=database_path, DB_CACHE_SIZE=str(args.db_cache_size),
+                   FINMARKET_URL=upstream.finmarket_url, IBAN_URL=upstream.iban_url,
+                   HTTP_CACHE_DIR=os.path.join(tmp_dir, "http_cache"))
+        server = subprocess.Popen([sys.executable, "-m", "uvicorn", "--factory", "src.presentation.app:get_app",
+                                   "--port", str(port), "--workers", str(args.workers), "--log-level", "warning"],
+                                  env=env)
+        try:
+            base_url = f"http://127.0.0.1:{port}"
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    countries = httpx.get(f"{base_url}/api/countries").json()
+                    break
+                except httpx.TransportError:
+                    if time.monotonic() > deadline or server.poll() is not None:
+                        raise SystemExit("Server did not start")
+                    time.sleep(0.1)
+            with httpx.Client() as client:
+                dates = client.get(f"{base_url}/api/series/country/{countries[0]['name']}",
+                                   params={"start_date": "1992-07-03",
+                                           "end_date": time.strftime("%Y-%m-%d")}).json()["dates"]
+            form = {"start_date": dates[0], "end_date": dates[-1],
+                    "input_country": [el["name"] for el in countries[:args.countries]]}
+            print(f"/chart for {len(form['input_country'])} countries from {dates[0]} to {dates[-1]}, "
+                  f"{args.workers} workers")
+            print(f"{'clients':>8} {'requests':>9} {'req/s':>9} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9}")
+            for concurrency in args.concurrency:
+                elapsed, durations = asyncio.run(load(f"{base_url}/chart", form, concurrency, args.requests))
+                print(f"{concurrency:>8} {len(durations):>9} {len(durations) / elapsed:>9.1f} "
+                      f"{percentile(durations, 50) * 1000:>9.1f} {percentile(durations, 90) * 1000:>9.1f} "
+                      f"{percentile(durations, 99) * 1000:>9.1f}")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark of currency value ingest into SQLite.
+
+Compares the old row-by-row UPSERT loop with Database.bulk_insert_curr_values on a
+synthetic multi-year backfill for every currency from currencies.json. The old loop
+writes values only, so the time bulk insert spends on monthly rollups is reported
+separately.
+
+Usage: python -m benchmarks.bench_db_ingest --years 30
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from src.database.sqlite import Database
+from src.models.country_curr import Currency
+
+
+def generate_rows(cur_ids: list[int], start_date: datetime, end_date: datetime) -> list[tuple]:
+    rows = []
+    for cur_id in cur_ids:
+        value = random.uniform(1, 100)
+        date = start_date
+        while date <= end_date:
+            if date.weekday() < 5:
+                value = round(value * random.uniform(0.99, 1.01), 4)
+                rows.append((cur_id, value, round(value - 50, 4), date.strftime('%Y-%m-%d')))
+            date += timedelta(days=1)
+    return rows
+
+
+def row_by_row_insert(path: str, rows: list[tuple]):
+    conn = sqlite3.connect(path)
+    with conn as con:
+        for cur_id, value, relative_value, date in rows:
+            con.execute("INSERT INTO curr_value (cur_id, value, relative_value, datetime) VALUES (?, ?, ?, ?)"
+                        "ON CONFLICT DO UPDATE SET value = ?, relative_value = ? WHERE value IS DISTINCT FROM ? OR relative_value IS DISTINCT FROM ?",
+                        (cur_id, value, relative_value, date, value, relative_value, value, relative_value))
+    conn.close()
+
+
+def report(name: str, elapsed: float, rows_count: int):
+    print(f"{name:<32} {rows_count:>9} rows {elapsed:>8.3f} s {rows_count / elapsed:>12.0f} rows/s")
+
+
+def measure(name: str, func, rows_count: int) -> float:
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    report(name, elapsed, rows_count)
+    return elapsed
+
+
+def time_rollups(db: Database) -> list[float]:
+    """
+    Record durations of monthly rollup updates of the database.
+
+    :param db:
+    :return: list the durations are appended to
+    """
+    durations = []
+    update_rollups = db._update_rollups
+
+    def timed_update(con, months):
+        started = time.perf_counter()
+        update_rollups(con, months)
+        durations.append(time.perf_counter() - started)
+    db._update_rollups = timed_update
+    return durations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=int, default=30, help="length of the backfill in years")
+    parser.add_argument("--currencies", default="currencies.json", help="path to currencies config")
+    args = parser.parse_args()
+
+    with open(args.currencies) as f:
+        currencies = [Currency(**elem, value=1) for elem in json.load(f)]
+    end_date = datetime(2024, 1, 1)
+    start_date = end_date - timedelta(days=365 * args.years)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name in ("row_by_row", "bulk"):
+            path = os.path.join(tmp_dir, f"{name}.db")
+            db = Database(path)
+            db.insert_currencies(currencies)
+            rows = generate_rows(sorted(set(db.get_currency_ids().values())), start_date, end_date)
+            if name == "row_by_row":
+                measure("row-by-row insert", lambda: row_by_row_insert(path, rows), len(rows))
+                measure("row-by-row re-insert (no-op)", lambda: row_by_row_insert(path, rows), len(rows))
+            else:
+                rollup_durations = time_rollups(db)
+                elapsed = measure("bulk insert", lambda: db.bulk_insert_curr_values(rows), len(rows))
+                report("  values only", elapsed - sum(rollup_durations), len(rows))
+                report("  monthly rollups", sum(rollup_durations), len(rows))
+                measure("bulk re-insert (no-op)", lambda: db.bulk_insert_curr_values(rows), len(rows))
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
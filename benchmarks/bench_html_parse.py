@@ -0,0 +1,84 @@
+"""
+Benchmark of HTML table extraction backends on rate and country pages.
+
+Every backend must produce the same result as the original BeautifulSoup parsing,
+the benchmark fails otherwise.
+By default pages are generated by benchmarks.fixtures; saved finmarket pages can be
+passed with --pages.
+
+Usage: python -m benchmarks.bench_html_parse --years 2 --pages saved/*.html
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from bs4 import BeautifulSoup
+
+from benchmarks.fixtures import finmarket_page, iban_page
+from src.models.country_curr import Currency, DateValue
+from src.parsers import tables
+from src.parsers.countries import CountryParser
+from src.parsers.currency import CurrencyParser
+from src.settings.config import settings
+
+
+def reference_rates(content: bytes) -> list[DateValue]:
+    soup = BeautifulSoup(content, 'html.parser')
+    rows = soup.find('table', class_='karramba').find_all('tr')[1:]
+    return [DateValue(date=datetime.strptime(row.find_all('td')[0].text.strip(), "%d.%m.%Y"),
+                      value=float(row.find_all('td')[2].text.strip().replace(",", ".")))
+            for row in rows]
+
+
+def measure(parse, pages: list[bytes], repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            parse(page)
+    return (time.perf_counter() - started) / (repeat * len(pages))
+
+
+def run(name: str, parse, reference, pages: list[bytes], repeat: int):
+    expected = [reference(page) for page in pages]
+    rows_count = sum(len(el) if isinstance(el, list) else sum(map(len, el.values())) for el in expected)
+    print(f"{name}: {len(pages)} pages, {rows_count} rows")
+    elapsed = measure(reference, pages, repeat)
+    print(f"  {'original':<8} {elapsed * 1000:>9.2f} ms/page {rows_count / len(pages) / elapsed:>12.0f} rows/s")
+    for backend in tables.BACKENDS:
+        settings.HTML_PARSER_BACKEND = backend
+        if [parse(page) for page in pages] != expected:
+            raise SystemExit(f"{backend} backend result differs from the original parsing")
+        elapsed = measure(parse, pages, repeat)
+        print(f"  {backend:<8} {elapsed * 1000:>9.2f} ms/page {rows_count / len(pages) / elapsed:>12.0f} rows/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=int, default=2, help="date range of every generated rates page")
+    parser.add_argument("--repeat", type=int, default=5, help="number of timed passes over the pages")
+    parser.add_argument("--pages", nargs="*", default=[], help="saved finmarket pages to parse instead")
+    args = parser.parse_args()
+
+    if args.pages:
+        rate_pages = []
+        for path in args.pages:
+            with open(path, "rb") as f:
+                rate_pages.append(f.read())
+    else:
+        end_date = datetime(2024, 1, 1)
+        start_date = end_date - timedelta(days=365 * args.years)
+        rate_pages = [finmarket_page(cur_code, start_date, end_date) for cur_code in (52148, 52170, 52146, 52246)]
+    run("rates", CurrencyParser._parse_table, reference_rates, rate_pages, args.repeat)
+
+    country_parser = CountryParser([Currency(ru_name=name, en_name=name, cur_code=0, value=0)
+                                    for name in ("Доллар США", "Евро", "Йена")])
+
+    def reference_countries(content: bytes) -> dict[str, list[str]]:
+        settings.HTML_PARSER_BACKEND = "bs4"
+        return country_parser._parse_table(content)
+
+    run("countries", country_parser._parse_table, reference_countries, [iban_page()], args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+End-to-end benchmark scenarios against the fake upstream server.
+
+Scenarios:
+  cold_start  fresh DB and HTTP cache, basic values are scraped, app is created and / is rendered
+  backfill    fresh DB and HTTP cache, countries and --years of values for all currencies are scraped
+  chart_N     POST /chart for 1, 10 and all countries over the backfilled range
+
+Every scenario reports latency percentiles and throughput. Results can be saved as a baseline
+and later runs compared against it, the exit code is 1 if any metric regressed by more than
+--tolerance. Settings such as SCRAPER_RATE_LIMIT or SCRAPER_MAX_CONCURRENCY are read from
+the environment and .env as usual.
+
+Usage: python -m benchmarks.bench_scenarios --latency 0.05 --save-baseline benchmarks/baseline.json
+       python -m benchmarks.bench_scenarios --latency 0.05 --baseline benchmarks/baseline.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.upstream import FakeUpstream
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[max(math.ceil(q / 100 * len(ordered)) - 1, 0)]
+
+
+def summarize(durations: list[float], amount: float, unit: str) -> dict:
+    """
+    :param durations: durations of every run in seconds
+    :param amount: number of processed units within all runs
+    :param unit: name of throughput unit
+    :return: dictionary of latency percentiles in ms and throughput
+    """
+    return {"runs": len(durations),
+            "mean_ms": sum(durations) / len(durations) * 1000,
+            "p50_ms": percentile(durations, 50) * 1000,
+            "p90_ms": percentile(durations, 90) * 1000,
+            "p99_ms": percentile(durations, 99) * 1000,
+            "max_ms": max(durations) * 1000,
+            "throughput": amount / sum(durations),
+            "unit": unit}
+
+
+class Scenarios:
+    def __init__(self, work_dir: str, years: int, db_cache_size: int):
+        # src is imported here, so that settings are read after the environment points to the fake upstream
+        from src.container import APP_CONTAINER
+        from src.parsers.http_cache import http_cache
+
+        self.container = APP_CONTAINER
+        self.http_cache = http_cache
+        self.work_dir = work_dir
+        self.db_cache_size = db_cache_size
+        self.end_date = datetime.now() - timedelta(days=1)
+        self.start_date = self.end_date - timedelta(days=365 * years)
+        self.runs = 0
+
+    def reset(self):
+        """
+        Point the container to a new empty DB and clear the HTTP cache.
+
+        :return: None
+        """
+        from dependency_injector.providers import Object
+        from src.database.sqlite import Database
+
+        self.runs += 1
+        self.container.reset_singletons()
+        database = Database(os.path.join(self.work_dir, f"bench_{self.runs}.db"), cache_size=self.db_cache_size)
+        self.container.database.reset_override()
+        self.container.database.override(Object(database))
+        shutil.rmtree(self.http_cache.directory, ignore_errors=True)
+
+    def cold_start(self) -> float:
+        from fastapi.testclient import TestClient
+        from src.presentation.app import get_app
+
+        self.reset()
+        started = time.perf_counter()
+        self.container.currencies()
+        with TestClient(get_app()) as client:
+            client.get("/").raise_for_status()
+        return time.perf_counter() - started
+
+    def backfill(self) -> tuple[float, int]:
+        from src.adapter.parsers import ParserAdapter
+
+        self.reset()
+        self.container.currencies()
+        started = time.perf_counter()
+        rows = asyncio.run(ParserAdapter().parse(self.start_date.strftime("%Y-%m-%d"),
+                                                 self.end_date.strftime("%Y-%m-%d")))
+        return time.perf_counter() - started, rows
+
+    def chart(self, countries_count: int, requests: int) -> list[float]:
+        from fastapi.testclient import TestClient
+        from src.presentation.app import get_app
+
+        countries = self.container.database().get_all_countries()[:countries_count]
+        form = {"start_date": self.start_date.strftime("%Y-%m-%d"), "end_date": self.end_date.strftime("%Y-%m-%d"),
+                "input_country": countries}
+        durations = []
+        with TestClient(get_app()) as client:
+            for _ in range(requests):
+                started = time.perf_counter()
+                response = client.post("/chart", data=form)
+                durations.append(time.perf_counter() - started)
+                if response.status_code != 200 or "alert" in response.text:
+                    raise SystemExit(f"/chart failed for {countries_count} countries")
+        return durations
+
+
+def run(args) -> dict:
+    results = dict()
+    with tempfile.TemporaryDirectory() as work_dir, \
+            FakeUpstream(args.latency, args.currencies, args.countries_per_currency) as upstream:
+        os.environ.update({"FINMARKET_URL": upstream.finmarket_url, "IBAN_URL": upstream.iban_url,
+                           "HTTP_CACHE_DIR": os.path.join(work_dir, "http_cache"), "CURR_CONFIG": args.currencies,
+                           "DB_PATH": os.path.join(work_dir, "database.db")})
+        scenarios = Scenarios(work_dir, args.years, args.db_cache_size)
+
+        durations = [scenarios.cold_start() for _ in range(args.repeat)]
+        results["cold_start"] = summarize(durations, len(durations), "starts/s")
+
+        durations, rows = [], 0
+        for _ in range(args.repeat):
+            duration, run_rows = scenarios.backfill()
+            durations.append(duration)
+            rows += run_rows
+        results["backfill"] = summarize(durations, rows, "rows/s")
+
+        countries_count = len(scenarios.container.database().get_all_countries())
+        for name, count in (("chart_1", 1), ("chart_10", 10), ("chart_all", countries_count)):
+            durations = scenarios.chart(count, args.requests)
+            results[name] = summarize(durations, len(durations), "req/s")
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> bool:
+    """
+    Print changes against the baseline.
+
+    :return: True if any metric regressed by more than tolerance
+    """
+    regressed = False
+    print(f"\n{'scenario':<12} {'metric':<10} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, metrics in results.items():
+        if name not in baseline:
+            continue
+        for metric in ("p50_ms", "p90_ms", "p99_ms", "throughput"):
+            old, new = baseline[name][metric], metrics[metric]
+            change = (new - old) / old if old else 0
+            worse = -change if metric == "throughput" else change
+            flag = " REGRESSION" if worse > tolerance else ""
+            regressed |= bool(flag)
+            print(f"{name:<12} {metric:<10} {old:>12.2f} {new:>12.2f} {change:>+8.1%}{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.05, help="delay of every upstream response in seconds")
+    parser.add_argument("--years", type=int, default=2, help="length of the backfill in years")
+    parser.add_argument("--repeat", type=int, default=3, help="number of cold start and backfill runs")
+    parser.add_argument("--requests", type=int, default=30, help="number of /chart requests per scenario")
+    parser.add_argument("--db-cache-size", type=int, default=256, help="DB read cache size, 0 disables it")
+    parser.add_argument("--currencies", default="currencies.json", help="path to currencies config")
+    parser.add_argument("--countries-per-currency", type=int, default=8)
+    parser.add_argument("--baseline", help="compare results with the baseline JSON file")
+    parser.add_argument("--save-baseline", help="save results as the baseline JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed relative regression")
+    args = parser.parse_args()
+
+    results = run(args)
+    print(f"{'scenario':<12} {'runs':>5} {'mean ms':>10} {'p50 ms':>10} {'p90 ms':>10} {'p99 ms':>10} "
+          f"{'throughput':>14}")
+    for name, metrics in results.items():
+        print(f"{name:<12} {metrics['runs']:>5} {metrics['mean_ms']:>10.1f} {metrics['p50_ms']:>10.1f} "
+              f"{metrics['p90_ms']:>10.1f} {metrics['p99_ms']:>10.1f} {metrics['throughput']:>9.1f} "
+              f"{metrics['unit']}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=4)
+    if args.baseline:
+        with open(args.baseline) as f:
+            if compare(results, json.load(f), args.tolerance):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Recorded-page stand-ins for www.finmarket.ru and www.iban.ru.
+
+Pages reproduce the markup the parsers depend on (karramba rates table in windows-1251,
+table-bordered currency codes table in utf-8) surrounded by page noise, and are deterministic
+for the given parameters.
+"""
+import json
+import math
+import random
+from datetime import datetime, timedelta
+
+NOISE = "".join(f'<div class="menu-item"><a href="/news/{i}">Новость {i}</a><span>&nbsp;|&nbsp;</span></div>\n'
+                for i in range(300))
+SCRIPTS = "<script>var banners = [" + ",".join(str(i) for i in range(2000)) + "];</script>\n"
+
+
+def rate(cur_code: int, date: datetime) -> float:
+    day = date.toordinal()
+    return round(10 + cur_code % 97 + 5 * math.sin(day / 60 + cur_code) + (day % 7) / 10, 4)
+
+
+def finmarket_page(cur_code: int, start_date: datetime, end_date: datetime) -> bytes:
+    rows = []
+    previous = None
+    date = start_date
+    while date <= end_date:
+        if date.weekday() < 5:
+            value = rate(cur_code, date)
+            change = round(value - previous, 4) if previous is not None else 0
+            css = "red" if change < 0 else "green"
+            rows.append(f'<tr><td class="date">{date.strftime("%d.%m.%Y")}</td><td>1</td>'
+                        f'<td>{value:.4f}</td><td><span class="{css}">{change:+.4f}</span></td></tr>'
+                        .replace(f"{value:.4f}", f"{value:.4f}".replace(".", ",")))
+            previous = value
+        date += timedelta(days=1)
+    page = ('<!DOCTYPE html><html><head><meta http-equiv="Content-Type" content="text/html; charset=windows-1251">'
+            '<title>Архив курсов валют</title></head><body>\n' + NOISE + SCRIPTS +
+            '<table class="fs11"><tr><td>Курсы ЦБ РФ</td></tr></table>\n'
+            '<table class="karramba" cellspacing="0">\n'
+            '<tr><th>Дата</th><th>Кол-во</th><th>Курс</th><th>Изменение</th></tr>\n' +
+            "\n".join(rows) + '\n</table>\n' + NOISE + '</body></html>')
+    return page.encode("windows-1251")
+
+
+def iban_page(currencies_path: str = "currencies.json", countries_per_currency: int = 8) -> bytes:
+    with open(currencies_path) as f:
+        currencies = json.load(f)
+    names = [el["ru_name"] for el in currencies] + [f"Валюта {i}" for i in range(150)]
+    rng = random.Random(0)
+    rows = []
+    for i, name in enumerate(names):
+        for j in range(countries_per_currency if i < len(currencies) else 1):
+            rows.append(f"<tr><td>Страна {i}-{j} &amp; острова</td><td>{name}</td>"
+                        f"<td>C{i:02d}</td><td>{rng.randint(1, 999):03d}</td></tr>")
+    rng.shuffle(rows)
+    page = ('<!DOCTYPE html><html><head><meta charset="utf-8"><title>Коды валют</title></head><body>\n' + NOISE +
+            '<table class="table table-bordered downloads tablesorter">\n'
+            '<thead><tr><th>Страна</th><th>Валюта</th><th>Код</th><th>Номер</th></tr></thead><tbody>\n' +
+            "\n".join(rows) + '\n</tbody></table>\n' + NOISE + '</body></html>')
+    return page.encode("utf-8")
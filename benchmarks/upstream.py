@@ -0,0 +1,154 @@
+"""
+Local stand-in for www.finmarket.ru and www.iban.ru serving benchmarks.fixtures pages.
+
+Pages are generated once per url and then served like recorded ones, with an ETag so that
+conditional requests are answered with 304. Every response is delayed by --latency seconds,
+and --error-rate of rate pages are answered with 503 to exercise retries of the scrapers.
+The server can be started alone to work on the parsers without network access:
+
+Usage: python -m benchmarks.upstream --port 8765 --latency 0.05
+       FINMARKET_URL=http://127.0.0.1:8765/currency/rates/ IBAN_URL=http://127.0.0.1:8765/currency-codes python main.py
+"""
+import argparse
+import hashlib
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from benchmarks.fixtures import finmarket_page, iban_page
+
+FINMARKET_PATH = "/currency/rates/"
+IBAN_PATH = "/currency-codes"
+
+
+@lru_cache(maxsize=4096)
+def render(path: str, query: str, currencies_path: str, countries_per_currency: int) -> bytes:
+    if path == IBAN_PATH:
+        return iban_page(currencies_path, countries_per_currency)
+    params = dict(parse_qsl(query))
+    start_date = datetime(int(params["by"]), int(params["bm"]), int(params["bd"]))
+    end_date = datetime(int(params["ey"]), int(params["em"]), int(params["ed"]))
+    return finmarket_page(int(params["cur"]), start_date, end_date)
+
+
+class UpstreamHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+    error_rate = 0.0
+    currencies_path = "currencies.json"
+    countries_per_currency = 8
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        url = urlsplit(self.path)
+        if url.path not in (FINMARKET_PATH, IBAN_PATH):
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if url.path == FINMARKET_PATH and random.random() < self.error_rate:
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = render(url.path, url.query, self.currencies_path, self.countries_per_currency)
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeUpstream:
+    def __init__(self, latency: float = 0.0, currencies_path: str = "currencies.json",
+                 countries_per_currency: int = 8, error_rate: float = 0.0):
+        """
+        Runs the stand-in server in a subprocess, so page rendering does not compete with the benchmarked code
+        for the GIL.
+
+        :param latency: delay of every response in seconds
+        :param currencies_path: path to currencies config used to generate the countries page
+        :param countries_per_currency: number of countries of every configured currency
+        :param error_rate: fraction of rate pages answered with 503
+        """
+        self.latency = latency
+        self.error_rate = error_rate
+        self.currencies_path = currencies_path
+        self.countries_per_currency = countries_per_currency
+        self.port = None
+        self._process = None
+
+    @property
+    def finmarket_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}{FINMARKET_PATH}"
+
+    @property
+    def iban_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}{IBAN_PATH}"
+
+    def __enter__(self) -> "FakeUpstream":
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        self._process = subprocess.Popen([sys.executable, "-m", "benchmarks.upstream", "--port", str(self.port),
+                                          "--latency", str(self.latency), "--currencies", self.currencies_path,
+                                          "--countries-per-currency", str(self.countries_per_currency),
+                                          "--error-rate", str(self.error_rate)],
+                                         cwd=os.getcwd())
+        deadline = time.monotonic() + 10
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", self.port), timeout=1).close()
+                return self
+            except OSError:
+                if time.monotonic() > deadline or self._process.poll() is not None:
+                    self._process.kill()
+                    raise RuntimeError("Fake upstream server did not start")
+                time.sleep(0.05)
+
+    def __exit__(self, *exc_info):
+        self._process.terminate()
+        self._process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="delay of every response in seconds")
+    parser.add_argument("--currencies", default="currencies.json", help="path to currencies config")
+    parser.add_argument("--countries-per-currency", type=int, default=8)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of rate pages answered with 503")
+    args = parser.parse_args()
+
+    UpstreamHandler.latency = args.latency
+    UpstreamHandler.error_rate = args.error_rate
+    UpstreamHandler.currencies_path = args.currencies
+    UpstreamHandler.countries_per_currency = args.countries_per_currency
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), UpstreamHandler)
+    server.daemon_threads = True
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,58 @@
+import argparse
+import asyncio
+
 import uvicorn
-from src.presentation.app import get_app
+from src.adapter.export import ExportFormat
+from src.adapter.parsers import ParserAdapter
 from src.container import APP_CONTAINER
-from src.parsers.json_curr import JsonCurrParser
 from src.settings import logging_config
 
 if __name__ == "__main__":
-    db = APP_CONTAINER.database()
-    db.insert_currencies(currencies=JsonCurrParser().parse_county_curr())
+    parser = argparse.ArgumentParser(description="Currency parser")
+    parser.add_argument("command", nargs="?", default="serve",
+                        choices=["serve", "scheduler", "ingest", "resume", "export", "import"],
+                        help="serve: run web app, scheduler: run daily ingest, ingest: ingest the latest days once, "
+                             "resume: scrape failed parts of earlier ingests again, "
+                             "export: write stored values to --path, import: load values from --path")
+    parser.add_argument("--path", help="CSV or Parquet file to export to or import from")
+    parser.add_argument("--format", choices=[el.value for el in ExportFormat],
+                        help="file format, guessed by the --path extension by default")
+    parser.add_argument("--currency", action="append", default=[], help="currency to export, all by default")
+    parser.add_argument("--country", action="append", default=[], help="country whose currency is exported")
+    parser.add_argument("--start-date", help="first exported date in %%Y-%%m-%%d format")
+    parser.add_argument("--end-date", help="last exported date in %%Y-%%m-%%d format")
+    args = parser.parse_args()
+
+    if args.command in ("export", "import") and not args.path:
+        parser.error(f"{args.command} requires --path")
+    file_format = args.format or (ExportFormat.from_path(args.path).value if args.path else None)
 
-    app = get_app()
-    settings = APP_CONTAINER.app_settings()
-    uvicorn.run(app, host=settings.APP_HOST, port=settings.APP_PORT)
+    if args.command == "scheduler":
+        ParserAdapter.initialize()
+        if not ParserAdapter().start_scheduler(background=False):
+            parser.exit(1, "Планировщик уже запущен другим процессом\n")
+    elif args.command == "ingest":
+        ParserAdapter.initialize()
+        ParserAdapter.ingest_latest()
+    elif args.command == "resume":
+        ParserAdapter.initialize()
+        ParserAdapter.resume_failed()
+    elif args.command in ("export", "import"):
+        try:
+            if args.command == "export":
+                _, content = asyncio.run(ParserAdapter().export_values(args.currency, args.country, args.start_date,
+                                                                       args.end_date, file_format))
+                with open(args.path, "wb") as f:
+                    for chunk in content:
+                        f.write(chunk)
+            else:
+                ParserAdapter.initialize()
+                with open(args.path, "rb") as f:
+                    ParserAdapter().import_values(f, file_format)
+        except ValueError as e:
+            parser.exit(1, f"{e}\n")
+    else:
+        # Every worker process creates the app and initializes it on startup
+        settings = APP_CONTAINER.app_settings()
+        uvicorn.run("src.presentation.app:get_app", factory=True, host=settings.APP_HOST, port=settings.APP_PORT,
+                    workers=settings.WORKERS)
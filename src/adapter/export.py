@@ -0,0 +1,169 @@
+import csv
+import io
+from datetime import date
+from enum import Enum
+from itertools import islice
+from typing import IO, Callable, Iterable, Iterator
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# currency en_name, date in %Y-%m-%d format, value, relative value
+ExportRow = tuple[str, str, float, float]
+# currency name, date in %Y-%m-%d format, value
+ImportRow = tuple[str, str, float]
+
+COLUMNS = ("currency", "date", "value", "relative_value")
+IMPORT_COLUMNS = COLUMNS[:3]
+
+
+class ExportFormat(str, Enum):
+    csv = "csv"
+    parquet = "parquet"
+
+    @classmethod
+    def from_path(cls, path: str) -> "ExportFormat":
+        """
+        Guess format of the file by its extension.
+
+        :param path:
+        :return: parquet for .parquet files, csv otherwise
+        """
+        return cls.parquet if path.lower().endswith(".parquet") else cls.csv
+
+
+MEDIA_TYPES = {
+    ExportFormat.csv: "text/csv; charset=utf-8",
+    ExportFormat.parquet: "application/vnd.apache.parquet",
+}
+
+
+def write_csv(rows: Iterable[ExportRow], batch_size: int = 5000) -> Iterator[bytes]:
+    """
+    Encode rows as CSV with a header, batch by batch.
+
+    :param rows: iterable of export rows
+    :param batch_size: number of rows encoded into one chunk
+    :return: iterator of encoded chunks
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(COLUMNS)
+    rows = iter(rows)
+    while batch := list(islice(rows, batch_size)):
+        writer.writerows(batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def read_csv(file: IO[bytes]) -> Iterator[ImportRow]:
+    """
+    Decode rows of a CSV file written by write_csv, relative values are ignored.
+
+    :param file: binary file object
+    :return: iterator of import rows
+    """
+    reader = csv.DictReader(io.TextIOWrapper(file, encoding="utf-8", newline=""))
+    missing = [column for column in IMPORT_COLUMNS if column not in (reader.fieldnames or ())]
+    if missing:
+        raise ValueError(f"В файле нет столбцов {', '.join(missing)}")
+    for row in reader:
+        try:
+            yield row["currency"], date.fromisoformat(row["date"]).isoformat(), float(row["value"])
+        except (TypeError, ValueError):
+            raise ValueError(f"Некорректная строка {reader.line_num} файла")
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Writable file collecting written bytes until they are taken. The position keeps growing, so offsets
+    written by pyarrow stay valid.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def take(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def write_parquet(rows: Iterable[ExportRow], batch_size: int = 5000) -> Iterator[bytes]:
+    """
+    Encode rows as Parquet, every batch is written as a row group.
+
+    :param rows: iterable of export rows
+    :param batch_size: number of rows of one row group
+    :return: iterator of encoded chunks
+    """
+    schema = pyarrow.schema([("currency", pyarrow.string()), ("date", pyarrow.date32()),
+                             ("value", pyarrow.float64()), ("relative_value", pyarrow.float64())])
+    sink = _ChunkSink()
+    rows = iter(rows)
+    with pyarrow.parquet.ParquetWriter(sink, schema) as writer:
+        while batch := list(islice(rows, batch_size)):
+            currencies, dates, values, relative_values = zip(*batch)
+            writer.write_table(pyarrow.table([currencies, [date.fromisoformat(day) for day in dates],
+                                              values, relative_values], schema=schema))
+            yield sink.take()
+    yield sink.take()
+
+
+def read_parquet(file: IO[bytes]) -> Iterator[ImportRow]:
+    """
+    Decode rows of a Parquet file batch by batch, relative values are ignored.
+
+    :param file: binary file object
+    :return: iterator of import rows
+    """
+    parquet_file = pyarrow.parquet.ParquetFile(file)
+    missing = [column for column in IMPORT_COLUMNS if column not in parquet_file.schema_arrow.names]
+    if missing:
+        raise ValueError(f"В файле нет столбцов {', '.join(missing)}")
+    for batch in parquet_file.iter_batches(columns=list(IMPORT_COLUMNS)):
+        currencies, dates, values = (batch.column(column).to_pylist() for column in IMPORT_COLUMNS)
+        for currency, day, value in zip(currencies, dates, values):
+            yield currency, day if isinstance(day, str) else day.isoformat(), value
+
+
+WRITERS: dict[ExportFormat, Callable[[Iterable[ExportRow], int], Iterator[bytes]]] = {ExportFormat.csv: write_csv}
+READERS: dict[ExportFormat, Callable[[IO[bytes]], Iterator[ImportRow]]] = {ExportFormat.csv: read_csv}
+if pyarrow is not None:
+    WRITERS[ExportFormat.parquet] = write_parquet
+    READERS[ExportFormat.parquet] = read_parquet
+
+
+def get_format(name: str) -> ExportFormat:
+    """
+    Check that the format is known and its library is installed.
+
+    :param name: csv or parquet
+    :return: ExportFormat
+    """
+    try:
+        export_format = ExportFormat(name)
+    except ValueError:
+        raise ValueError(f"Неизвестный формат файла {name}")
+    if export_format not in WRITERS:
+        raise ValueError(f"Для формата {name} необходимо установить pyarrow")
+    return export_format
@@ -1,8 +1,18 @@
+import asyncio
 import logging
 import random
+from typing import IO, Iterator, Optional
 
 from src.container import APP_CONTAINER
-from datetime import datetime
+from src.models.job import Job, CurrencyProgress, FailureReport, SchedulerStatus, ScrapeFailure
+from src.models.country_curr import Currency
+from src.models.series import Rollup, RollupPeriod, Series, align_series
+from src.monitoring.metrics import timed
+from src.monitoring.tracing import new_trace_id, trace_id
+from src.parsers.ranges import missing_ranges
+from src.adapter.export import READERS, ExportFormat, WRITERS, get_format
+from src.adapter.resample import Aggregation, Resolution, aggregate, downsample
+from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
@@ -11,6 +21,17 @@ class ParserAdapter:
     def __init__(self):
         self.db = APP_CONTAINER.database()
 
+    @staticmethod
+    def initialize():
+        """
+        Creates DB tables and stores basic values of currencies. Only one process at a time initializes,
+        so concurrently started workers do not scrape basic values twice.
+
+        :return: None
+        """
+        with APP_CONTAINER.init_lock():
+            APP_CONTAINER.currencies()
+
     @staticmethod
     def check_start_and_end_date(start_date: str, end_date: str):
         """
@@ -30,69 +51,507 @@ class ParserAdapter:
             raise ValueError("Дата начала должна быть раньше даты конца")
         logger.debug("Dates start=%s and end=%s are valid", start_date, end_date)
 
-    def parse(self, start_date: str, end_date: str):
+    async def enqueue_parse(self, start_date: str, end_date: str) -> Job:
         """
-        Parses countries and currency values between start and end date.
+        Validates dates and enqueues parsing job between start and end date. The job is submitted in a thread,
+        so storing its status does not block the event loop.
 
         :param start_date:
         :param end_date:
+        :return: Job object to poll progress of
+        """
+        self.check_start_and_end_date(start_date, end_date)
+        job_queue = APP_CONTAINER.job_queue()
+        return await asyncio.to_thread(job_queue.submit, start_date, end_date, target=self._run_job,
+                                       on_update=self.save_job)
+
+    def save_job(self, job: Job):
+        """
+        Stores job status, so it can be polled from every worker process. The DB keeps as many jobs
+        as the queue keeps for polling.
+
+        :param job:
+        :return: None
+        """
+        self.db.save_job(job, APP_CONTAINER.job_queue().history_size)
+
+    async def get_job(self, job_id: str) -> Optional[Job]:
+        """
+        Get job of this or another worker process by its id.
+
+        :param job_id:
+        :return: Job object or None if there is no such job
+        """
+        job = APP_CONTAINER.job_queue().get(job_id)
+        if job is None:
+            job = await self.db.read(self.db.get_job, job_id)
+        return job
+
+    @staticmethod
+    def _run_job(job: Job):
+        """
+        Runs parsing job in a worker thread.
+
+        :param job:
+        :return: None
+        """
+        trace_id.set(job.id)
+        currency_parser = APP_CONTAINER.currency_parser()
+        job.currencies = {currency.en_name: CurrencyProgress() for currency in currency_parser.currencies}
+        asyncio.run(ParserAdapter().parse(job.start_date, job.end_date, progress=job))
+
+    @staticmethod
+    def ingest_latest() -> int:
+        """
+        Parses the latest SCHEDULER_LOOKBACK_DAYS days, only days that are not parsed yet are requested.
+
+        :return: number of written rows
+        """
+        trace_id.set(new_trace_id())
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=APP_CONTAINER.app_settings().SCHEDULER_LOOKBACK_DAYS)
+        logger.info("Ingesting currency values from %s", start_date.strftime("%Y-%m-%d"))
+        return asyncio.run(ParserAdapter().parse(start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")))
+
+    @staticmethod
+    def resume_failed() -> int:
+        """
+        Parses date ranges of the failure report again, data scraped before is not requested.
+
+        :return: number of written rows
+        """
+        trace_id.set(new_trace_id())
+        parser_adapter = ParserAdapter()
+        report = parser_adapter._read_failure_report()
+        if not report.failures:
+            logger.info("There are no failed scrapes to resume")
+            return 0
+        dates = [date for failure in report.failures for date in (failure.start_date, failure.end_date) if date]
+        today = datetime.now().strftime("%Y-%m-%d")
+        start_date, end_date = (min(dates), max(dates)) if dates else (today, today)
+        logger.info("Resuming %d failed scrapes from %s to %s", len(report.failures), start_date, end_date)
+        return asyncio.run(parser_adapter.parse(start_date, end_date))
+
+    def _read_failure_report(self) -> FailureReport:
+        report = self.db.get_meta("scrape_failures")
+        return FailureReport.model_validate_json(report) if report else FailureReport()
+
+    async def get_failure_report(self) -> FailureReport:
+        """
+        Get scrapes that failed and were not scraped successfully since.
+
+        :return: FailureReport object
+        """
+        report = await self.db.read(self.db.get_meta, "scrape_failures")
+        return FailureReport.model_validate_json(report) if report else FailureReport()
+
+    def save_failures(self, failures: list[ScrapeFailure]):
+        """
+        Updates the failure report with failures of the last parse. Earlier failures are kept until
+        their data is scraped.
+
+        :param failures: failures of the last parse
         :return: None
         """
+        report = self._read_failure_report()
+        if not report.failures and not failures:
+            return
+        coverage = self.db.get_coverage()
+        has_countries = self.db.has_countries(APP_CONTAINER.country_parser().currency_names)
+        # Today's rate is requested by every parse, so only earlier days are checked
+        yesterday = datetime.combine(datetime.now().date(), datetime.min.time()) - timedelta(days=1)
+        new_keys = {(failure.target, failure.start_date, failure.end_date) for failure in failures}
+        pending = []
+        for failure in report.failures:
+            if (failure.target, failure.start_date, failure.end_date) in new_keys:
+                continue
+            if failure.start_date is None:
+                still_missing = not has_countries
+            else:
+                start_date = datetime.strptime(failure.start_date, "%Y-%m-%d")
+                end_date = min(datetime.strptime(failure.end_date, "%Y-%m-%d"), yesterday)
+                still_missing = start_date <= end_date and bool(
+                    missing_ranges(start_date, end_date, coverage.get(failure.target, [])))
+            if still_missing:
+                pending.append(failure)
+        report = FailureReport(updated_at=datetime.now(), failures=pending + failures)
+        self.db.set_meta("scrape_failures", report.model_dump_json())
+
+    def start_scheduler(self, background: bool = True) -> bool:
+        """
+        Starts daily ingest of the latest currency values unless another process already runs the scheduler,
+        so only one of the worker processes ingests.
+
+        :param background: run scheduler in a daemon thread instead of blocking
+        :return: True if the scheduler is started in this process
+        """
+        scheduler_lock = APP_CONTAINER.scheduler_lock()
+        if not scheduler_lock.acquire(blocking=False):
+            logger.info("Scheduler is already running in another process")
+            return False
+        scheduler = APP_CONTAINER.scheduler()
+        if background:
+            scheduler.start(self.ingest_latest, on_status=self.save_scheduler_status)
+        else:
+            try:
+                scheduler.run_forever(self.ingest_latest, on_status=self.save_scheduler_status)
+            finally:
+                scheduler_lock.release()
+        return True
+
+    @staticmethod
+    def stop_scheduler():
+        """
+        Stops the scheduler started in background, so another process may start it.
+
+        :return: None
+        """
+        APP_CONTAINER.scheduler().stop()
+        APP_CONTAINER.scheduler_lock().release()
+
+    def save_scheduler_status(self, status: SchedulerStatus):
+        """
+        Stores scheduler status, so it is available to every process.
+
+        :param status:
+        :return: None
+        """
+        self.db.set_meta("scheduler_status", status.model_dump_json())
+
+    async def get_scheduler_status(self) -> SchedulerStatus:
+        """
+        Get status of the scheduled ingest.
+
+        :return: SchedulerStatus object
+        """
+        status = await self.db.read(self.db.get_meta, "scheduler_status")
+        return SchedulerStatus.model_validate_json(status) if status else SchedulerStatus()
+
+    async def parse(self, start_date: str, end_date: str, progress: Optional[Job] = None) -> int:
+        """
+        Parses countries and currency values between start and end date.
+
+        :param start_date:
+        :param end_date:
+        :param progress: job to report progress to
+        :return: number of written rows
+        """
         self.check_start_and_end_date(start_date, end_date)
         start_date, end_date = datetime.strptime(start_date, "%Y-%m-%d"), datetime.strptime(end_date, "%Y-%m-%d")
-        if end_date.year - start_date.year > 2:
-            raise ValueError("Некорректно указанный промежуток. Разница в годах не должна быть больше 2")
 
+        # Only one process ingests at a time, the next one only scrapes what is still missing
+        ingest_lock = APP_CONTAINER.ingest_lock()
+        if not ingest_lock.acquire(blocking=False):
+            logger.info("Waiting for ingest of another process to finish")
+            await asyncio.to_thread(ingest_lock.acquire)
+        try:
+            return await self._parse(start_date, end_date, progress)
+        finally:
+            ingest_lock.release()
+
+    async def _parse(self, start_date: datetime, end_date: datetime, progress: Optional[Job] = None) -> int:
+        # Every unit of work is committed on its own, failed ones are reported and do not stop the others
+        failures = []
+        # The countries page is revalidated by every parse, an unchanged page costs a 304 and is not parsed again
         logger.info("Parsing countries")
-        country_parser = APP_CONTAINER.country_parser()
-        countries = country_parser.scrape_countries()
-        self.db.insert_countries(countries)
+        try:
+            countries = await asyncio.to_thread(APP_CONTAINER.country_parser().scrape_countries)
+        except Exception as e:
+            logger.warning("Failed to scrape countries: %r", e)
+            failures.append(ScrapeFailure(target="countries", error=repr(e), failed_at=datetime.now()))
+        else:
+            await self.db.write(self.db.insert_countries, countries)
 
         logger.info("Parsing currency values")
         currency_parser = APP_CONTAINER.currency_parser()
-        currencies = currency_parser.scrape_currencies(start_date=start_date, end_date=end_date)
-        self.db.insert_curr_values(currencies)
+        # Today's rate may be published later, so the current day is never marked as scraped
+        yesterday = datetime.combine(datetime.now().date(), datetime.min.time()) - timedelta(days=1)
+        rows = 0
+        coverage = await self.db.read(self.db.get_coverage)
+        async for chunk, (chunk_start, chunk_end) in currency_parser.iter_chunks(start_date=start_date,
+                                                                                 end_date=end_date,
+                                                                                 progress=progress,
+                                                                                 coverage=coverage,
+                                                                                 failures=failures):
+            # Chunks keep downloading while the writer thread stores the finished one
+            await self.db.write(self.db.insert_curr_values, [chunk])
+            rows += len(chunk.values)
+            if chunk_start <= min(chunk_end, yesterday):
+                await self.db.write(self.db.add_coverage, chunk.currency.en_name, chunk_start,
+                                    min(chunk_end, yesterday))
+            if progress:
+                await self.db.write(self.save_job, progress)
+        await self.db.write(self.save_failures, failures)
+        if failures:
+            raise RuntimeError(f"Не удалось получить {len(failures)} частей данных, сохранено строк: {rows}. "
+                               f"Повторный запуск догрузит только недостающие данные")
+        return rows
+
+    async def export_values(self, currencies: list[str], countries: list[str], start_date: Optional[str] = None,
+                            end_date: Optional[str] = None,
+                            export_format: str = "csv") -> tuple[ExportFormat, Iterator[bytes]]:
+        """
+        Validates the request and returns a stream of stored values of currencies and countries' currencies.
+        Rows are read and encoded lazily, so history of any length is exported with flat memory.
+
+        :param currencies: currency en_names or ru_names
+        :param countries: countries whose currencies are exported
+        :param start_date: first date, the first available date by default
+        :param end_date: last date, today by default
+        :param export_format: csv or parquet
+        :return: tuple of export format and iterator of encoded chunks
+        """
+        export_format = get_format(export_format)
+        start_date = start_date or "1992-07-03"
+        end_date = end_date or datetime.now().strftime("%Y-%m-%d")
+        self.check_start_and_end_date(start_date, end_date)
+
+        currency_ids = await self.db.read(self.db.get_currency_ids)
+        if not currencies and not countries:
+            selected = set(currency_ids.values())
+        else:
+            selected = set()
+            for currency in currencies:
+                if currency not in currency_ids:
+                    raise ValueError(f"Нет данных для валюты {currency}")
+                selected.add(currency_ids[currency])
+            country_currencies = await self.db.read(self.db.get_country_currencies, countries) if countries else {}
+            for country in countries:
+                if country not in country_currencies:
+                    raise ValueError(f"Нет данных для страны {country}")
+                selected.add(country_currencies[country])
+        logger.info("Exporting values of %d currencies from %s to %s as %s", len(selected), start_date, end_date,
+                    export_format.value)
+        rows = self.db.iter_values(sorted(selected), start_date, end_date)
+        return export_format, WRITERS[export_format](rows, self.db.batch_size)
+
+    def import_values(self, file: IO[bytes], import_format: str = "csv") -> int:
+        """
+        Loads currency values from an exported file within one transaction, relative values are computed
+        against basic values. The file does not tell which days between its rows were scraped, so no date
+        range is marked as scraped and the next parse fills the gaps.
+
+        :param file: binary file object
+        :param import_format: csv or parquet
+        :return: number of written rows
+        """
+        rows = READERS[get_format(import_format)](file)
+        currency_ids = self.db.get_currency_ids()
+        basic_values = self.db.get_basic_values_by_id()
+
+        def values():
+            for currency, date, value in rows:
+                currency_id = currency_ids.get(currency)
+                if currency_id is None:
+                    raise ValueError(f"Нет данных для валюты {currency}")
+                yield currency_id, value, round(value - basic_values[currency_id], 4), date
+
+        logger.info("Importing currency values")
+        count = self.db.bulk_insert_curr_values(values())
+        logger.info("Imported %d currency values", count)
+        return count
 
-    def get_all_countries(self) -> list[str]:
+    async def get_all_countries(self) -> list[str]:
         """
         Get all countries.
 
         :return: list of countries in string format
         """
         logger.info("Getting all countries")
-        return self.db.get_all_countries()
+        return await self.db.read(self.db.get_all_countries)
+
+    def get_cache_stats(self) -> dict:
+        """
+        Get hit and miss metrics of the DB read cache.
+
+        :return: dictionary of metrics
+        """
+        return self.db.cache.stats()
+
+    async def get_last_modified(self) -> datetime:
+        """
+        Get the time of the last change of stored data.
+
+        :return: datetime in UTC
+        """
+        return await self.db.read(self.db.get_last_modified)
+
+    async def get_currencies(self) -> list[Currency]:
+        """
+        Get all currencies.
+
+        :return: list of Currency objects
+        """
+        logger.info("Getting all currencies")
+        return await self.db.read(self.db.get_all_currencies)
+
+    async def get_countries_with_currencies(self) -> list[tuple[str, str]]:
+        """
+        Get all countries with their currencies.
+
+        :return: list of (country, currency en_name) tuples
+        """
+        logger.info("Getting all countries with currencies")
+        return await self.db.read(self.db.get_countries_with_currencies)
 
-    def get_data_values(self, input_countries: list[str], start_date: str, end_date: str) -> dict:
+    async def get_base_values(self, currency_ids: list[int], base_date: Optional[str] = None) -> dict[int, float]:
+        """
+        Get values relative values are computed against.
+
+        :param currency_ids:
+        :param base_date: date of base values, basic values of BASIC_CURR_DATE by default
+        :return: dictionary where keys are currency ids and values are base values
+        """
+        if not base_date:
+            basic_values = await self.db.read(self.db.get_basic_values_by_id)
+            return {currency_id: basic_values[currency_id] for currency_id in currency_ids}
+        self.check_start_and_end_date(base_date, base_date)
+        base_values = await self.db.read(self.db.get_values_at, currency_ids, base_date)
+        if len(base_values) < len(currency_ids):
+            raise ValueError(f"Нет данных о курсе валюты на дату {base_date}")
+        return base_values
+
+    async def get_relative_series(self, series: dict[int, Series], base_date: Optional[str] = None) -> dict[int, Series]:
+        """
+        Compute relative values of raw series against the base date, no data is scraped.
+
+        :param series: dictionary where keys are currency ids and values are Series of raw values
+        :param base_date: date of base values, basic values of BASIC_CURR_DATE by default
+        :return: dictionary where keys are currency ids and values are Series of relative values
+        """
+        base_values = await self.get_base_values(list(series), base_date)
+        return {currency_id: currency_series.shift(-base_values[currency_id])
+                for currency_id, currency_series in series.items()}
+
+    async def get_currency_series(self, currency: str, start_date: str, end_date: str,
+                                  base_date: Optional[str] = None) -> Series:
+        """
+        Get relative values of the currency between start and end date.
+
+        :param currency: currency en_name
+        :param start_date:
+        :param end_date:
+        :param base_date: date of base values, basic values of BASIC_CURR_DATE by default
+        :return: Series object
+        """
+        self.check_start_and_end_date(start_date, end_date)
+        currency_id = (await self.db.read(self.db.get_currency_ids)).get(currency)
+        if currency_id is None:
+            raise ValueError(f"Нет данных для валюты {currency}")
+        series = await self.db.read(self.db.get_series, [currency_id], start_date, end_date)
+        return (await self.get_relative_series(series, base_date))[currency_id]
+
+    async def get_country_series(self, country: str, start_date: str, end_date: str,
+                                 base_date: Optional[str] = None) -> Series:
+        """
+        Get relative values of the country's currency between start and end date.
+
+        :param country:
+        :param start_date:
+        :param end_date:
+        :param base_date: date of base values, basic values of BASIC_CURR_DATE by default
+        :return: Series object
+        """
+        self.check_start_and_end_date(start_date, end_date)
+        country_currencies, series = await self.db.read(self.db.get_series_for_countries, [country], start_date,
+                                                        end_date)
+        if country not in country_currencies:
+            raise ValueError(f"Нет данных для страны {country}")
+        return (await self.get_relative_series(series, base_date))[country_currencies[country]]
+
+    async def get_currency_stats(self, currency: str, start_date: str, end_date: str, period: str = "month",
+                                 base_date: Optional[str] = None) -> list[Rollup]:
+        """
+        Get statistics of relative values of the currency by month or year. Buckets are read from precomputed
+        monthly rollups, so whole months containing start and end date are included.
+
+        :param currency: currency en_name
+        :param start_date:
+        :param end_date:
+        :param period: month or year
+        :param base_date: date of base values, basic values of BASIC_CURR_DATE by default
+        :return: list of Rollup objects sorted by period
+        """
+        self.check_start_and_end_date(start_date, end_date)
+        try:
+            period = RollupPeriod(period)
+        except ValueError:
+            raise ValueError(f"Неизвестный период {period}")
+        currency_id = (await self.db.read(self.db.get_currency_ids)).get(currency)
+        if currency_id is None:
+            raise ValueError(f"Нет данных для валюты {currency}")
+        base_value = (await self.get_base_values([currency_id], base_date))[currency_id]
+        rollups = (await self.db.read(self.db.get_rollups, [currency_id], start_date[:7], end_date[:7],
+                                      period))[currency_id]
+        return [rollup.shift(-base_value) for rollup in rollups]
+
+    async def get_data_values(self, input_countries: list[str], start_date: str, end_date: str,
+                              forward_fill: bool = False, resolution: str = "day", aggregation: str = "mean",
+                              max_points: Optional[int] = None, base_date: Optional[str] = None) -> dict:
         """
         Returns currency values and datetime for input countries between start and end date.
+        Values of every currency are resampled and aligned onto one date axis once and shared by its countries,
+        the axis is downsampled for all currencies at once.
 
         :param input_countries: list of countries
         :param start_date:
         :param end_date:
+        :param forward_fill: fill days without value with the last known value instead of gaps
+        :param resolution: day, week or month
+        :param aggregation: mean or ohlc aggregation of values within resolution buckets
+        :param max_points: max number of dates of the chart, CHART_MAX_POINTS by default
+        :param base_date: date of base values, basic values of BASIC_CURR_DATE by default
         :return: data in dictionary format for Chart.js
         """
         self.check_start_and_end_date(start_date, end_date)
         if not input_countries:
             raise ValueError("Укажите страны для вывода графиков")
-        curr_colors = {}
-        datasets = []
+        try:
+            resolution, aggregation = Resolution(resolution), Aggregation(aggregation)
+        except ValueError:
+            raise ValueError("Некорректно указано разрешение графика")
+        max_points = max_points or APP_CONTAINER.app_settings().CHART_MAX_POINTS
+        if max_points < 3:
+            raise ValueError("Количество точек должно быть не меньше 3")
+
         logger.info("Getting data for %d countries", len(input_countries))
+        country_currencies, series = await self.db.read(self.db.get_series_for_countries, input_countries,
+                                                        start_date, end_date)
         for country in input_countries:
-            curr_dataset = dict()
-            currency_id, date_values = self.db.get_currencies_for_country(country, start_date, end_date)
-            curr_dataset["label"] = country
-            curr_dataset["data"] = [el.value for el in date_values]
-            if currency_id in curr_colors:
-                curr_dataset["borderColor"] = curr_colors[currency_id]
-            else:
-                new_color = "#" + ''.join([random.choice('0123456789ABCDEF') for _ in range(6)])
-                curr_dataset["borderColor"] = new_color
-                curr_colors[currency_id] = new_color
-            datasets.append(curr_dataset)
-
-        data = {
-            "labels": [el.date.strftime("%Y-%m-%d") for el in date_values],
-            "datasets": datasets
-        }
+            if country not in country_currencies:
+                raise ValueError(f"Нет данных для страны {country}")
+        series = await self.get_relative_series(series, base_date)
+        with timed("assemble"):
+            keys, to_align = [], []
+            for currency_id, currency_series in series.items():
+                for field, field_series in aggregate(currency_series, resolution, aggregation).items():
+                    keys.append((currency_id, field))
+                    to_align.append(field_series)
+            labels, aligned = align_series(to_align, forward_fill)
+            # Dates are selected by the mean or close line of every currency
+            main = [i for i, (_, field) in enumerate(keys) if field in ("value", "close")]
+            labels, aligned = downsample(labels, aligned, max_points, main)
+            curr_data = dict(zip(keys, aligned))
+            curr_colors = {currency_id: "#" + ''.join([random.choice('0123456789ABCDEF') for _ in range(6)])
+                           for currency_id in series}
+
+            datasets = []
+            for country in input_countries:
+                currency_id = country_currencies[country]
+                color = curr_colors[currency_id]
+                if aggregation == Aggregation.ohlc:
+                    datasets.append({"label": f"{country} (макс.)", "data": curr_data[currency_id, "high"],
+                                     "borderColor": color, "backgroundColor": color + "33", "borderWidth": 0,
+                                     "pointRadius": 0, "fill": "+1"})
+                    datasets.append({"label": f"{country} (мин.)", "data": curr_data[currency_id, "low"],
+                                     "borderColor": color, "borderWidth": 0, "pointRadius": 0})
+                    datasets.append({"label": country, "data": curr_data[currency_id, "close"], "borderColor": color})
+                else:
+                    datasets.append({"label": country, "data": curr_data[currency_id, "value"], "borderColor": color})
+
+            data = {
+                "labels": labels,
+                "datasets": datasets
+            }
 
         return data
@@ -0,0 +1,134 @@
+from datetime import date, timedelta
+from enum import Enum
+from typing import Optional, Sequence
+
+from src.models.series import Series
+
+
+class Resolution(str, Enum):
+    day = "day"
+    week = "week"
+    month = "month"
+
+
+class Aggregation(str, Enum):
+    mean = "mean"
+    ohlc = "ohlc"
+
+
+OHLC_FIELDS = ("open", "high", "low", "close")
+
+
+def bucket_start(day: str, resolution: Resolution) -> str:
+    """
+    Get the first day of the bucket the day belongs to.
+
+    :param day: date in %Y-%m-%d format
+    :param resolution:
+    :return: first day of the week or month in %Y-%m-%d format
+    """
+    if resolution == Resolution.month:
+        return day[:8] + "01"
+    if resolution == Resolution.week:
+        day = date.fromisoformat(day)
+        return (day - timedelta(days=day.weekday())).isoformat()
+    return day
+
+
+def aggregate(series: Series, resolution: Resolution, aggregation: Aggregation) -> dict[str, Series]:
+    """
+    Aggregate daily series into buckets of the given resolution.
+
+    :param series: Series sorted by date
+    :param resolution:
+    :param aggregation: mean of the bucket or its open, high, low and close values
+    :return: dictionary with "value" Series for mean or "open", "high", "low", "close" Series for OHLC
+    """
+    fields = OHLC_FIELDS if aggregation == Aggregation.ohlc else ("value",)
+    result = {field: Series() for field in fields}
+    buckets = []
+    for day, value in zip(series.dates, series.values):
+        key = bucket_start(day, resolution)
+        if buckets and buckets[-1][0] == key:
+            buckets[-1][1].append(value)
+        else:
+            buckets.append((key, [value]))
+
+    for key, values in buckets:
+        if aggregation == Aggregation.ohlc:
+            bucket_values = (values[0], max(values), min(values), values[-1])
+        else:
+            bucket_values = (round(sum(values) / len(values), 4),)
+        for field, value in zip(fields, bucket_values):
+            result[field].dates.append(key)
+            result[field].values.append(value)
+    return result
+
+
+def lttb_indices(values: list[Sequence[Optional[float]]], threshold: int) -> list[int]:
+    """
+    Select indices of points to keep with Largest-Triangle-Three-Buckets downsampling of series sharing
+    one axis. Triangle areas of all series are summed with every series scaled by its range, so the shape
+    of every line is preserved. Points where fewer series have a value are only kept if the bucket has no other.
+
+    :param values: values of evenly spaced points of every series, missing values are None
+    :param threshold: max number of points to keep
+    :return: sorted list of indices
+    """
+    count = len(values[0]) if values else 0
+    if threshold >= count or threshold < 3:
+        return list(range(count))
+
+    scales = []
+    for el in values:
+        defined = [value for value in el if value is not None]
+        spread = max(defined) - min(defined) if defined else 0
+        scales.append(1 / spread if spread else 1)
+
+    indices = [0]
+    bucket_size = (count - 2) / (threshold - 2)
+    selected = 0
+    for i in range(threshold - 2):
+        start, end = int(i * bucket_size) + 1, int((i + 1) * bucket_size) + 1
+        next_start, next_end = end, min(int((i + 2) * bucket_size) + 1, count)
+        avg_x = (next_start + next_end - 1) / 2
+        avg_ys = []
+        for el in values:
+            defined = [value for value in el[next_start:next_end] if value is not None]
+            avg_ys.append(sum(defined) / len(defined) if defined else None)
+
+        best, max_index = None, start
+        for j in range(start, end):
+            defined, area = 0, 0.0
+            for el, avg_y, scale in zip(values, avg_ys, scales):
+                value, selected_y = el[j], el[selected]
+                if value is None:
+                    continue
+                defined += 1
+                if selected_y is not None and avg_y is not None:
+                    area += scale * abs((selected - avg_x) * (value - selected_y)
+                                        - (selected - j) * (avg_y - selected_y))
+            if best is None or (defined, area) > best:
+                best, max_index = (defined, area), j
+        indices.append(max_index)
+        selected = max_index
+    indices.append(count - 1)
+    return indices
+
+
+def downsample(dates: list[str], values: list[list[Optional[float]]], max_points: int,
+               main: Optional[list[int]] = None) -> tuple[list[str], list[list[Optional[float]]]]:
+    """
+    Downsample series aligned onto one date axis to at most max_points dates preserving their shapes.
+    Dates are selected by the main series and kept in all of them, so the series stay aligned.
+
+    :param dates: date axis
+    :param values: list of aligned values for every series
+    :param max_points: max number of dates
+    :param main: positions of series dates are selected by, all series by default
+    :return: tuple of downsampled date axis and list of downsampled values for every series
+    """
+    if len(dates) <= max_points:
+        return dates, values
+    indices = lttb_indices([values[i] for i in main] if main is not None else values, max_points)
+    return [dates[i] for i in indices], [[el[i] for i in indices] for el in values]
@@ -1,8 +1,13 @@
 from dependency_injector.containers import DeclarativeContainer
-from dependency_injector.providers import Singleton, Factory
+from dependency_injector.providers import Callable, Factory, Selector, Singleton
 
 from src.settings.config import Settings
+from src.database.locks import FileLock
+from src.database.series_store import MmapDatabase
 from src.database.sqlite import Database
+from src.jobs.queue import JobQueue
+from src.jobs.scheduler import DailyScheduler
+from src.models.country_curr import Currency
 
 from src.parsers.countries import CountryParser
 from src.parsers.currency import CurrencyParser
@@ -10,11 +15,38 @@ from src.parsers.json_curr import JsonCurrParser
 
 
 class AppContainer(DeclarativeContainer):
-    currencies = JsonCurrParser().parse_county_curr()
-    currency_parser: Singleton["CurrencyParser"] = Singleton(CurrencyParser, currencies=currencies)
-    country_parser: Singleton["CountryParser"] = Singleton(CountryParser, currencies=currencies)
     app_settings: Singleton["Settings"] = Singleton(Settings)
-    database: Factory["Database"] = Factory(Database)
+    database: Selector["Database"] = Selector(
+        app_settings.provided.DB_SERIES_BACKEND,
+        sqlite=Singleton(Database, path=app_settings.provided.DB_PATH,
+                         cache_size=app_settings.provided.DB_CACHE_SIZE,
+                         cache_ttl=app_settings.provided.DB_CACHE_TTL,
+                         cache_version_interval=app_settings.provided.DB_CACHE_VERSION_INTERVAL,
+                         read_workers=app_settings.provided.DB_READ_WORKERS),
+        mmap=Singleton(MmapDatabase, path=app_settings.provided.DB_PATH,
+                       cache_size=app_settings.provided.DB_CACHE_SIZE,
+                       cache_ttl=app_settings.provided.DB_CACHE_TTL,
+                       cache_version_interval=app_settings.provided.DB_CACHE_VERSION_INTERVAL,
+                       read_workers=app_settings.provided.DB_READ_WORKERS),
+    )
+    json_curr_parser: Singleton["JsonCurrParser"] = Singleton(JsonCurrParser, database=database)
+    currencies: Singleton[list["Currency"]] = Singleton(json_curr_parser.provided.parse_county_curr.call())
+    currency_parser: Singleton["CurrencyParser"] = Singleton(CurrencyParser, currencies=currencies,
+                                                             max_concurrency=app_settings.provided.SCRAPER_MAX_CONCURRENCY,
+                                                             rate_limit=app_settings.provided.SCRAPER_RATE_LIMIT,
+                                                             chunk_days=app_settings.provided.SCRAPER_CHUNK_DAYS)
+    country_parser: Singleton["CountryParser"] = Singleton(CountryParser, currencies=currencies)
+    init_lock: Factory["FileLock"] = Factory(FileLock, path=Callable("{}.init.lock".format,
+                                                                     app_settings.provided.DB_PATH))
+    ingest_lock: Factory["FileLock"] = Factory(FileLock, path=Callable("{}.ingest.lock".format,
+                                                                       app_settings.provided.DB_PATH))
+    # Held by the process running the scheduler for its lifetime
+    scheduler_lock: Singleton["FileLock"] = Singleton(FileLock, path=Callable("{}.scheduler.lock".format,
+                                                                              app_settings.provided.DB_PATH))
+    job_queue: Singleton["JobQueue"] = Singleton(JobQueue, max_workers=app_settings.provided.JOB_WORKERS)
+    scheduler: Singleton["DailyScheduler"] = Singleton(DailyScheduler, run_at=app_settings.provided.SCHEDULER_TIME,
+                                                       retries=app_settings.provided.SCHEDULER_RETRIES,
+                                                       backoff=app_settings.provided.SCHEDULER_BACKOFF)
 
 
 APP_CONTAINER = AppContainer()
@@ -0,0 +1,138 @@
+import functools
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ReadCache:
+    def __init__(self, max_size: int = 256, ttl: float = 300, data_version: Optional[Callable[[], Hashable]] = None,
+                 version_interval: float = 1.0):
+        """
+        Bounded LRU cache with TTL whose entries are invalidated by tags.
+
+        :param max_size: max number of entries, 0 disables the cache
+        :param ttl: time to live of an entry in seconds
+        :param data_version: function returning version of the cached data, the cache is cleared whenever
+            it changes. It catches changes made by other processes, which can not invalidate entries by tags
+        :param version_interval: min seconds between calls of data_version, so lookups do not query it every time.
+            Changes of other processes are seen with this delay, 0 checks the version on every lookup
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.data_version = data_version
+        self.version_interval = version_interval
+        self._data_version = None
+        self._version_checked_at = -math.inf
+        self._entries: OrderedDict[Hashable, tuple[float, object, frozenset[str]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = 0
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def get_or_load(self, key: Hashable, tags: Iterable[str], loader: Callable[[], object]) -> object:
+        """
+        Get value from cache or load and store it.
+
+        :param key: cache key
+        :param tags: tags to invalidate the entry by
+        :param loader: function that loads the value
+        :return: cached or loaded value
+        """
+        now = time.monotonic()
+        if self.data_version is not None and now - self._version_checked_at >= self.version_interval:
+            self._version_checked_at = now
+            data_version = self.data_version()
+            if data_version != self._data_version:
+                self.clear()
+                self._data_version = data_version
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            version = self._version
+
+        value = loader()
+        with self._lock:
+            # Data could have changed while loading, so the value is stored only if nothing was invalidated since
+            if self.max_size and version == self._version:
+                self._entries[key] = (time.monotonic() + self.ttl, value, frozenset(tags))
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def advance_data_version(self, previous: Hashable, current: Hashable):
+        """
+        Move data version forward after a write of this process, whose entries are invalidated by tags.
+        The version is kept if data was changed by someone else since it was read, so the cache is cleared.
+
+        :param previous: data version before the write
+        :param current: data version after the write
+        :return: None
+        """
+        with self._lock:
+            if self._data_version == previous:
+                self._data_version = current
+
+    def invalidate(self, tags: Iterable[str]):
+        """
+        Drop entries having any of the given tags.
+
+        :param tags:
+        :return: None
+        """
+        tags = set(tags)
+        with self._lock:
+            self._version += 1
+            keys = [key for key, entry in self._entries.items() if entry[2] & tags]
+            for key in keys:
+                del self._entries[key]
+            self.invalidations += len(keys)
+        logger.debug("Invalidated %d cache entries by %s", len(keys), tags)
+
+    def clear(self):
+        """
+        Drop all entries.
+
+        :return: None
+        """
+        with self._lock:
+            self._version += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Get cache metrics.
+
+        :return: dictionary with size, hits, misses, hit ratio, evictions and invalidations
+        """
+        with self._lock:
+            requests = self.hits + self.misses
+            return {"size": len(self._entries), "max_size": self.max_size, "hits": self.hits, "misses": self.misses,
+                    "hit_ratio": round(self.hits / requests, 4) if requests else None,
+                    "evictions": self.evictions, "invalidations": self.invalidations}
+
+
+def cached(tags: Callable[..., Iterable[str]]):
+    """
+    Cache result of the Database read method in its cache.
+
+    :param tags: function of the method arguments returning tags of the result
+    :return: decorator
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args):
+            key = (method.__name__, *(tuple(el) if isinstance(el, list) else el for el in args))
+            return self.cache.get_or_load(key, tags(*args), lambda: method(self, *args))
+        return wrapper
+    return decorator
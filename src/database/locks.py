@@ -0,0 +1,65 @@
+import logging
+import os
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+
+class FileLock:
+    def __init__(self, path: str):
+        """
+        Exclusive lock held on a file, shared by all processes and threads that use the same path.
+
+        :param path: path to the lock file, it is created if it does not exist
+        """
+        self.path = path
+        self._fd = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        """
+        Acquire the lock.
+
+        :param blocking: wait until the lock is released by its holder
+        :return: True if the lock is acquired
+        """
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+        except OSError:
+            os.close(fd)
+            if blocking:
+                raise
+            return False
+        self._fd = fd
+        logger.debug("Acquired lock %s", self.path)
+        return True
+
+    def release(self):
+        """
+        Release the lock.
+
+        :return: None
+        """
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        os.close(self._fd)
+        self._fd = None
+        logger.debug("Released lock %s", self.path)
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
@@ -0,0 +1,373 @@
+import json
+import logging
+import mmap
+import os
+import sqlite3
+import threading
+import uuid
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date
+from functools import lru_cache
+from itertools import groupby
+from typing import Iterable, Optional
+
+from src.database.cache import cached
+from src.database.sqlite import CurrValueRow, Database
+from src.models.series import Series
+from src.monitoring.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+
+
+@lru_cache(maxsize=None)
+def day_to_date(day: int) -> str:
+    return date.fromordinal(day).isoformat()
+
+
+def date_to_day(value: str) -> int:
+    return date.fromisoformat(value).toordinal()
+
+
+def _fsync_directory(path: str):
+    # Directories can not be opened on Windows, renames are durable there without it
+    if os.name == "nt":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _append_file(path: str, offset: int, data: bytes):
+    """
+    Write data at offset of the file, dropping bytes of an unfinished earlier append after it.
+
+    :param path:
+    :param offset: size of the committed part of the file
+    :param data:
+    :return: None
+    """
+    with open(path, "ab") as f:
+        f.truncate(offset)
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _map_file(path: str, length: int) -> memoryview:
+    if not length:
+        return memoryview(b"")
+    with open(path, "rb") as f:
+        return memoryview(mmap.mmap(f.fileno(), length, access=mmap.ACCESS_READ))
+
+
+class _Column:
+    def __init__(self, directory: str, currency_id: int, generation: str, count: int):
+        """
+        Committed part of the memory-mapped files of one currency. Mapped bytes are never modified,
+        so a column can be read by any thread while a newer one replaces it.
+
+        :param directory:
+        :param currency_id:
+        :param generation: name of the files, a rewrite creates a new generation
+        :param count: number of committed days
+        """
+        self.generation = generation
+        self.count = count
+        self.days_path = os.path.join(directory, f"{currency_id}.{generation}.days")
+        self.values_path = os.path.join(directory, f"{currency_id}.{generation}.values")
+        self.days = _map_file(self.days_path, count * 4).cast("i")
+        # Values are kept as raw bytes to be copied into arrays without conversion
+        self.values = _map_file(self.values_path, count * 8)
+
+
+class SeriesStore:
+    def __init__(self, directory: str):
+        """
+        Time series of currency values kept as contiguous memory-mapped arrays, one array of days
+        (date ordinals as int32) and one of float64 values per currency, both sorted by day in native byte order.
+        Files are mapped lazily, so opening the store does not read them. Appends are written after the
+        committed part of the files, rewrites go to new files, and both are published by atomically replacing
+        the manifest, so a crash never exposes partially written data.
+
+        :param directory: directory of the store files, it is created if it does not exist
+        """
+        self.directory = directory
+        self.version: Optional[str] = None
+        self._columns: dict[int, _Column] = dict()
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.load()
+
+    def load(self):
+        """
+        Read the manifest and map columns changed since the last load, e.g. by another process.
+
+        :return: None
+        """
+        with self._lock:
+            self._load()
+
+    def _load(self):
+        try:
+            with open(os.path.join(self.directory, MANIFEST)) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            manifest = {"version": None, "series": {}}
+        columns = dict()
+        for currency_id, (generation, count) in manifest["series"].items():
+            currency_id = int(currency_id)
+            column = self._columns.get(currency_id)
+            if column is None or (column.generation, column.count) != (generation, count):
+                column = _Column(self.directory, currency_id, generation, count)
+            columns[currency_id] = column
+        self._columns = columns
+        self.version = manifest["version"]
+
+    def _commit(self, version: str):
+        manifest = {"version": version,
+                    "series": {str(currency_id): [column.generation, column.count]
+                               for currency_id, column in self._columns.items()}}
+        path = os.path.join(self.directory, MANIFEST)
+        with open(path + ".tmp", "w") as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+        _fsync_directory(self.directory)
+        self.version = version
+
+    def _write_column(self, currency_id: int, days: array, values: array) -> _Column:
+        generation = uuid.uuid4().hex[:12]
+        column_days = os.path.join(self.directory, f"{currency_id}.{generation}.days")
+        column_values = os.path.join(self.directory, f"{currency_id}.{generation}.values")
+        _append_file(column_days, 0, days.tobytes())
+        _append_file(column_values, 0, values.tobytes())
+        return _Column(self.directory, currency_id, generation, len(days))
+
+    @staticmethod
+    def _remove_column(column: _Column):
+        # Other processes may still read the old files, they stay readable until unmapped on POSIX
+        for path in (column.days_path, column.values_path):
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.debug("Could not remove %s: %s", path, e)
+
+    def update(self, changes: dict[int, tuple[int, int, array, array]], version: str):
+        """
+        Replace days between start and end day of currencies and publish the result as the version.
+        New days after the last stored one are appended in place, other changes rewrite the currency's files.
+
+        :param changes: dictionary where keys are currency ids and values are (start day, end day, days, values)
+            tuples, days and values are all stored ones between start and end day sorted by day
+        :param version: version of the source data that includes the changes
+        :return: None
+        """
+        with self._lock:
+            self._load()
+            replaced = []
+            for currency_id, (start_day, end_day, days, values) in changes.items():
+                column = self._columns.get(currency_id)
+                if column is None:
+                    self._columns[currency_id] = self._write_column(currency_id, days, values)
+                    continue
+                low, high = bisect_left(column.days, start_day), bisect_right(column.days, end_day)
+                overlap = column.count - low
+                if high == column.count and len(days) >= overlap and column.days[low:] == days[:overlap] \
+                        and column.values[low * 8:].cast("d") == values[:overlap]:
+                    _append_file(column.days_path, column.count * 4, days[overlap:].tobytes())
+                    _append_file(column.values_path, column.count * 8, values[overlap:].tobytes())
+                    self._columns[currency_id] = _Column(self.directory, currency_id, column.generation,
+                                                         column.count + len(days) - overlap)
+                else:
+                    new_days, new_values = array("i"), array("d")
+                    new_days.frombytes(column.days[:low].tobytes())
+                    new_days.extend(days)
+                    new_days.frombytes(column.days[high:].tobytes())
+                    new_values.frombytes(column.values[:low * 8])
+                    new_values.extend(values)
+                    new_values.frombytes(column.values[high * 8:])
+                    self._columns[currency_id] = self._write_column(currency_id, new_days, new_values)
+                    replaced.append(column)
+            self._commit(version)
+        for column in replaced:
+            self._remove_column(column)
+
+    def rebuild(self, series: Iterable[tuple[int, array, array]], version: str):
+        """
+        Replace all stored series.
+
+        :param series: iterable of (currency id, days, values) tuples
+        :param version: version of the source data
+        :return: None
+        """
+        with self._lock:
+            self._load()
+            replaced = list(self._columns.values())
+            self._columns = {currency_id: self._write_column(currency_id, days, values)
+                             for currency_id, days, values in series}
+            self._commit(version)
+            used = {os.path.basename(path) for column in self._columns.values()
+                    for path in (column.days_path, column.values_path)}
+        for column in replaced:
+            self._remove_column(column)
+        # Files of rewrites interrupted by a crash were never published
+        for name in os.listdir(self.directory):
+            if name.endswith((".days", ".values")) and name not in used:
+                os.remove(os.path.join(self.directory, name))
+
+    def get_series(self, currency_id: int, start_day: int, end_day: int) -> Series:
+        """
+        Get values of the currency between start and end day found by binary search.
+
+        :param currency_id:
+        :param start_day: date ordinal
+        :param end_day: date ordinal
+        :return: Series sorted by date
+        """
+        column = self._columns.get(currency_id)
+        if column is None:
+            return Series()
+        low, high = bisect_left(column.days, start_day), bisect_right(column.days, end_day)
+        values = array("d")
+        values.frombytes(column.values[low * 8:high * 8])
+        return Series(dates=[day_to_date(day) for day in column.days[low:high]], values=values)
+
+    def get_value_at(self, currency_id: int, day: int) -> Optional[float]:
+        """
+        Get value of the currency at the day or at the closest earlier day with a value.
+
+        :param currency_id:
+        :param day: date ordinal
+        :return: value or None if there are no values up to the day
+        """
+        column = self._columns.get(currency_id)
+        if column is None:
+            return None
+        position = bisect_right(column.days, day)
+        return column.values[(position - 1) * 8:position * 8].cast("d")[0] if position else None
+
+
+class MmapDatabase(Database):
+    def __init__(self, path: str = 'database.db', series_path: Optional[str] = None, **kwargs):
+        """
+        SQLite database whose currency series are also kept in a memory-mapped SeriesStore, range reads are
+        served from the store. SQLite stays the source of truth: the store is updated within the transaction
+        writing currency values and tagged with the values_modified value, reads fall back to SQLite whenever the
+        tag does not match, and a mismatching store is rebuilt on start.
+
+        :param path: path to the database file
+        :param series_path: directory of the series store, next to the database file by default
+        :param kwargs: arguments of Database
+        """
+        super().__init__(path, **kwargs)
+        self.store = SeriesStore(series_path or f"{path}.series")
+        self._sync_store()
+
+    def _sync_store(self):
+        """
+        Rebuild the series store from SQLite if it does not match stored data.
+
+        :return: None
+        """
+        with self.writer() as con:
+            # The write lock keeps other processes from changing values while the store is compared and rebuilt
+            con.execute("BEGIN IMMEDIATE")
+            version = con.execute("SELECT value FROM meta WHERE key = 'values_modified'").fetchone()[0]
+            self.store.load()
+            if self.store.version == version:
+                return
+            logger.info("Rebuilding series store from DB")
+            cursor = con.execute("SELECT cur_id, datetime, value FROM curr_value ORDER BY cur_id, datetime")
+            self.store.rebuild(((currency_id, *self._to_arrays(rows))
+                                for currency_id, rows in groupby(cursor, key=lambda row: row[0])), version)
+
+    @staticmethod
+    def _to_arrays(rows: Iterable[tuple[int, str, float]]) -> tuple[array, array]:
+        days, values = array("i"), array("d")
+        for _, day, value in rows:
+            days.append(date_to_day(day))
+            values.append(value)
+        return days, values
+
+    def _values_written(self, con: sqlite3.Connection, months: set[tuple[int, str]]):
+        """
+        Update monthly rollups and replace the written range of every currency in the series store
+
+        :param con: connection with an open transaction
+        :param months: set of (cur_id, month in %Y-%m format) tuples
+        :return: None
+        """
+        super()._values_written(con, months)
+        version = con.execute("SELECT value FROM meta WHERE key = 'values_modified'").fetchone()[0]
+        changes = dict()
+        for currency_id in {currency_id for currency_id, _ in months}:
+            currency_months = [month for cur_id, month in months if cur_id == currency_id]
+            start_date, end_date = f"{min(currency_months)}-01", f"{max(currency_months)}-31"
+            cursor = con.execute("SELECT cur_id, datetime, value FROM curr_value WHERE cur_id = ? "
+                                 "AND datetime BETWEEN ? AND ? ORDER BY datetime", (currency_id, start_date, end_date))
+            # Day 31 may not exist, so the range ends before the first day of the next month
+            last_year, last_month = map(int, max(currency_months).split("-"))
+            end_day = date(last_year + last_month // 12, last_month % 12 + 1, 1).toordinal() - 1
+            changes[currency_id] = (date_to_day(start_date), end_day, *self._to_arrays(cursor))
+        self.store.update(changes, version)
+
+    def bulk_insert_curr_values(self, rows: Iterable[CurrValueRow]) -> int:
+        """
+        Insert currency value rows into DB and the series store within a single transaction
+
+        :param rows: iterable of (cur_id, value, relative_value, datetime in %Y-%m-%d format) tuples
+        :return: number of rows written
+        """
+        try:
+            return super().bulk_insert_curr_values(rows)
+        except Exception:
+            # The store could have been updated by a transaction that was rolled back
+            self._sync_store()
+            raise
+
+    def _store_is_current(self) -> bool:
+        version = self.get_meta("values_modified")
+        if self.store.version != version:
+            self.store.load()
+        return self.store.version == version
+
+    def get_series(self, currency_ids: list[int], start_date: str, end_date: str) -> dict[int, Series]:
+        """
+        Get raw values and dates of given currencies between start and end date from the series store
+
+        :param currency_ids:
+        :param start_date: date in %Y-%m-%d format
+        :param end_date: date in %Y-%m-%d format
+        :return: dictionary where keys are currency ids and values are Series sorted by date
+        """
+        if not self._store_is_current():
+            return super().get_series(currency_ids, start_date, end_date)
+        return self._get_stored_series(currency_ids, start_date, end_date)
+
+    @cached(lambda currency_ids, start_date, end_date: {f"curr_value:{currency_id}" for currency_id in currency_ids})
+    @timed("db_read")
+    def _get_stored_series(self, currency_ids: list[int], start_date: str, end_date: str) -> dict[int, Series]:
+        logger.debug("Getting series from series store for %d currencies", len(currency_ids))
+        start_day, end_day = date_to_day(start_date), date_to_day(end_date)
+        return {currency_id: self.store.get_series(currency_id, start_day, end_day) for currency_id in currency_ids}
+
+    def get_values_at(self, currency_ids: list[int], base_date: str) -> dict[int, float]:
+        """
+        Get values of given currencies at the date or at the closest earlier date from the series store
+
+        :param currency_ids:
+        :param base_date: date in %Y-%m-%d format
+        :return: dictionary where keys are currency ids and values are currency values,
+            currencies without values up to the date are missing
+        """
+        if not self._store_is_current():
+            return super().get_values_at(currency_ids, base_date)
+        day = date_to_day(base_date)
+        values = {currency_id: self.store.get_value_at(currency_id, day) for currency_id in currency_ids}
+        return {currency_id: value for currency_id, value in values.items() if value is not None}
@@ -1,16 +1,153 @@
+import asyncio
+import functools
 import logging
+import math
 import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Callable, Iterable, Iterator, Optional, TypeVar
 
-from src.models.country_curr import Currency, CurrencyValues, DateValue
+from src.database.cache import ReadCache, cached
+from src.models.country_curr import Currency, CurrencyValues
+from src.models.job import Job
+from src.models.series import Rollup, RollupPeriod, Series
+from src.monitoring.metrics import timed
+from src.parsers.ranges import DateRange, merge_ranges
 
 logger = logging.getLogger(__name__)
 
 
+CurrValueRow = tuple[int, float, float, str]
+T = TypeVar("T")
+
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",
+)
+
+# Monthly statistics of raw values, "last" is the value of the latest day of the month
+ROLLUP_MONTHLY = """INSERT OR REPLACE INTO curr_value_monthly
+                    (cur_id, month, count, sum, sum_sq, min, max, last_date, last_value)
+                    SELECT bucket.*, last.value FROM (
+                        SELECT cur_id, substr(datetime, 1, 7) AS month, COUNT(*), SUM(value), SUM(value * value),
+                               MIN(value), MAX(value), MAX(datetime) AS last_date
+                        FROM curr_value WHERE {where} GROUP BY cur_id, month
+                    ) AS bucket
+                    JOIN curr_value AS last ON last.cur_id = bucket.cur_id AND last.datetime = bucket.last_date"""
+# Monthly statistics of the months listed in the temporary rollup_month table. The listed months drive index range
+# scans, so values are read in the order of the groups and are not sorted
+ROLLUP_MONTHS = """INSERT OR REPLACE INTO curr_value_monthly
+                   (cur_id, month, count, sum, sum_sq, min, max, last_date, last_value)
+                   SELECT bucket.*, last.value FROM (
+                       SELECT rollup_month.cur_id, rollup_month.month, COUNT(*), SUM(value), SUM(value * value),
+                              MIN(value), MAX(value), MAX(datetime) AS last_date
+                       FROM rollup_month JOIN curr_value ON curr_value.cur_id = rollup_month.cur_id
+                       AND datetime BETWEEN rollup_month.month || '-01' AND rollup_month.month || '-31'
+                       GROUP BY rollup_month.cur_id, rollup_month.month
+                   ) AS bucket
+                   JOIN curr_value AS last ON last.cur_id = bucket.cur_id AND last.datetime = bucket.last_date"""
+
+
 class Database:
-    def __init__(self):
-        self.conn = sqlite3.connect('database.db')
+    def __init__(self, path: str = 'database.db', batch_size: int = 5000, cache_size: int = 256,
+                 cache_ttl: float = 300, cache_version_interval: float = 1.0, read_workers: int = 4,
+                 timeout: float = 30):
+        """
+        SQLite database with a single writer connection, read-only connections in a pool of reader threads
+        and a read cache invalidated by writes.
+
+        :param path: path to the database file
+        :param batch_size: number of rows written by one executemany call
+        :param cache_size: max number of cached read results, 0 disables the cache
+        :param cache_ttl: time to live of cached read results in seconds
+        :param cache_version_interval: min seconds between checks for writes of other processes
+        :param read_workers: number of reader threads serving awaitable reads
+        :param timeout: seconds to wait for a lock held by another process
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.timeout = timeout
+        # Other processes may write to the same file, so cached reads are dropped whenever data is modified
+        self.cache = ReadCache(max_size=cache_size, ttl=cache_ttl, data_version=self._get_modified_value,
+                               version_interval=cache_version_interval)
+        self._local = threading.local()
+        self._writer = self._connect(check_same_thread=False)
+        self._write_lock = threading.Lock()
+        self._read_executor = ThreadPoolExecutor(max_workers=read_workers, thread_name_prefix="db-read")
+        self._write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-write")
         self._create_tables()
 
+    def _connect(self, **kwargs) -> sqlite3.Connection:
+        logger.debug("Opening DB connection to %s", self.path)
+        conn = sqlite3.connect(self.path, timeout=self.timeout, **kwargs)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """
+        Read-only connection of the current thread, opened on first use.
+
+        :return: sqlite3 connection
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            conn.execute("PRAGMA query_only = ON")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """
+        The writer connection within a transaction. Writes of all threads are serialized, while readers keep
+        reading the last committed data.
+
+        :return: sqlite3 connection
+        """
+        with self._write_lock, self._writer as con:
+            yield con
+
+    def close(self):
+        """
+        Close the writer connection, the read-only connection of the current thread and worker threads.
+
+        :return: None
+        """
+        self._read_executor.shutdown()
+        self._write_executor.shutdown()
+        self._writer.close()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    async def read(self, method: Callable[..., T], *args) -> T:
+        """
+        Run read method in the reader pool without blocking the event loop.
+
+        :param method: bound read method of the database
+        :param args: method arguments
+        :return: method result
+        """
+        return await asyncio.get_running_loop().run_in_executor(self._read_executor, functools.partial(method, *args))
+
+    async def write(self, method: Callable[..., T], *args) -> T:
+        """
+        Run write method in the writer thread without blocking the event loop.
+
+        :param method: bound write method of the database
+        :param args: method arguments
+        :return: method result
+        """
+        return await asyncio.get_running_loop().run_in_executor(self._write_executor, functools.partial(method, *args))
+
     def _create_tables(self):
         """
         Create the database tables if they do not exist yet.
@@ -18,7 +155,7 @@ class Database:
         :return: None
         """
         logger.debug("Creating DB tables")
-        with self.conn as con:
+        with self.writer() as con:
             con.execute("""CREATE TABLE IF NOT EXISTS currencies(
                             id INTEGER PRIMARY KEY AUTOINCREMENT,
                             ru_name VARCHAR(50) NOT NULL,
@@ -27,6 +164,9 @@ class Database:
                             basic_value REAL NOT NULL,
                             UNIQUE (ru_name, en_name, cur_code)
                         )""")
+            currency_columns = [el[1] for el in con.execute("PRAGMA table_info(currencies)")]
+            if "basic_date" not in currency_columns:
+                con.execute("ALTER TABLE currencies ADD COLUMN basic_date TEXT")
             con.execute("""CREATE TABLE IF NOT EXISTS countries(
                             name VARCHAR(50) NOT NULL,
                             cur_id INTEGER NOT NULL,
@@ -41,22 +181,120 @@ class Database:
                             FOREIGN KEY (cur_id)  REFERENCES currencies (id),
                             UNIQUE (cur_id, datetime)
                         )""")
+            con.execute("""CREATE TABLE IF NOT EXISTS coverage(
+                            cur_id INTEGER NOT NULL,
+                            start_date TEXT NOT NULL,
+                            end_date TEXT NOT NULL,
+                            FOREIGN KEY (cur_id)  REFERENCES currencies (id),
+                            UNIQUE (cur_id, start_date)
+                        )""")
+            con.execute("""CREATE TABLE IF NOT EXISTS meta(
+                            key TEXT PRIMARY KEY,
+                            value TEXT NOT NULL
+                        )""")
+            con.execute("""CREATE TABLE IF NOT EXISTS jobs(
+                            id TEXT PRIMARY KEY,
+                            created_at TEXT NOT NULL,
+                            job TEXT NOT NULL
+                        )""")
+            con.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('last_modified', ?)",
+                        (datetime.now(timezone.utc).isoformat(),))
+            # Changes only when currency values are written, unlike last_modified covering all stored data
+            con.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('values_modified', ?)",
+                        (datetime.now(timezone.utc).isoformat(),))
+            con.execute("""CREATE INDEX IF NOT EXISTS curr_value_cur_id_datetime
+                           ON curr_value (cur_id, datetime, value, relative_value)""")
+            rollup_exists = con.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' "
+                                        "AND name = 'curr_value_monthly'").fetchone()
+            con.execute("""CREATE TABLE IF NOT EXISTS curr_value_monthly(
+                            cur_id INTEGER NOT NULL,
+                            month TEXT NOT NULL,
+                            count INTEGER NOT NULL,
+                            sum REAL NOT NULL,
+                            sum_sq REAL NOT NULL,
+                            min REAL NOT NULL,
+                            max REAL NOT NULL,
+                            last_date TEXT NOT NULL,
+                            last_value REAL NOT NULL,
+                            FOREIGN KEY (cur_id)  REFERENCES currencies (id),
+                            PRIMARY KEY (cur_id, month)
+                        )""")
+            if not rollup_exists:
+                logger.debug("Building monthly rollups from stored currency values")
+                con.execute(ROLLUP_MONTHLY.format(where="1"))
+            # Temporary tables exist only for the writer connection, months to update are listed here
+            con.execute("""CREATE TEMP TABLE IF NOT EXISTS rollup_month(
+                            cur_id INTEGER NOT NULL,
+                            month TEXT NOT NULL,
+                            PRIMARY KEY (cur_id, month)
+                        ) WITHOUT ROWID""")
 
-    def insert_currencies(self, currencies: list[Currency]):
+    @timed("db_write")
+    def insert_currencies(self, currencies: list[Currency], basic_date: Optional[str] = None):
         """
-        Insert currencies into DB or update currency code or basic value
+        Insert currencies into DB or update currency code, basic value or its date
 
         :param currencies:
+        :param basic_date: date of basic values in %Y-%m-%d format
         :return: None
         """
         logger.debug("Inserting currencies in DB")
-        with self.conn as con:
+        with self.writer() as con:
+            changes = con.total_changes
             for currency in currencies:
-                con.execute("INSERT INTO currencies (ru_name, en_name, cur_code, basic_value) VALUES (?, ?, ?, ?)"
-                            "ON CONFLICT DO UPDATE SET cur_code = ?, basic_value = ? WHERE cur_code IS DISTINCT FROM ? OR basic_value IS DISTINCT FROM ?",
-                            (currency.ru_name, currency.en_name, currency.cur_code, currency.value, currency.cur_code,
-                             currency.value, currency.cur_code, currency.value,))
+                con.execute("INSERT INTO currencies (ru_name, en_name, cur_code, basic_value, basic_date) VALUES (?, ?, ?, ?, ?)"
+                            "ON CONFLICT DO UPDATE SET cur_code = ?, basic_value = ?, basic_date = ? WHERE cur_code IS DISTINCT FROM ? OR basic_value IS DISTINCT FROM ? OR basic_date IS DISTINCT FROM ?",
+                            (currency.ru_name, currency.en_name, currency.cur_code, currency.value, basic_date,
+                             currency.cur_code, currency.value, basic_date, currency.cur_code, currency.value,
+                             basic_date,))
+            changed = self._touch(con, changes)
+            if changed:
+                self._rebase_relative_values(con)
+        if changed:
+            self.cache.invalidate({"currencies"})
+
+    @staticmethod
+    def _rebase_relative_values(con: sqlite3.Connection):
+        """
+        Recompute stored relative values against current basic values in one statement
 
+        :param con: connection with an open transaction
+        :return: None
+        """
+        logger.debug("Rebasing stored relative values in DB")
+        con.execute("UPDATE curr_value SET relative_value = round(value - "
+                    "(SELECT basic_value FROM currencies WHERE currencies.id = curr_value.cur_id), 4)")
+
+    def get_basic_values(self, basic_date: str) -> dict[int, float]:
+        """
+        Get basic values of currencies stored for the given date
+
+        :param basic_date: date of basic values in %Y-%m-%d format
+        :return: dictionary where keys are currency codes and values are basic values
+        """
+        logger.debug("Getting basic values for %s from DB", basic_date)
+        with self.conn as con:
+            cursor = con.cursor()
+            cursor.execute("SELECT cur_code, basic_value FROM currencies WHERE basic_date = ?", (basic_date,))
+            return dict(cursor.fetchall())
+
+    @cached(lambda: {"currencies"})
+    def get_currency_ids(self) -> dict[str, int]:
+        """
+        Get ids of all currencies by both their ru_name and en_name
+
+        :return: dictionary where keys are currency names and values are currency ids
+        """
+        logger.debug("Getting currency ids from DB")
+        with self.conn as con:
+            cursor = con.cursor()
+            cursor.execute("SELECT id, ru_name, en_name FROM currencies")
+            currency_ids = dict()
+            for cur_id, ru_name, en_name in cursor.fetchall():
+                currency_ids[ru_name] = currency_ids[en_name] = cur_id
+            return currency_ids
+
+    @timed("db_write")
     def insert_countries(self, countries_by_curr: dict[str, list[str]]):
         """
         Insert countries into DB or update country's currency
@@ -65,15 +303,17 @@ class Database:
         :return: None
         """
         logger.debug("Inserting countries in DB")
-        with self.conn as con:
-            for curr_name, countries in countries_by_curr.items():
-                cursor = con.cursor()
-                cursor.execute("SELECT id FROM currencies WHERE ru_name = ?", (curr_name,))
-                cur_id = cursor.fetchone()[0]
-                for country in countries:
-                    con.execute("INSERT INTO countries (name, cur_id) VALUES (?, ?)"
-                                "ON CONFLICT DO UPDATE SET cur_id = ? WHERE cur_id IS DISTINCT FROM ?",
-                                (country, cur_id, cur_id, cur_id))
+        currency_ids = self.get_currency_ids()
+        rows = [(country, currency_ids[curr_name]) for curr_name, countries in countries_by_curr.items()
+                for country in countries]
+        with self.writer() as con:
+            changes = con.total_changes
+            con.executemany("INSERT INTO countries (name, cur_id) VALUES (?, ?)"
+                            "ON CONFLICT DO UPDATE SET cur_id = excluded.cur_id WHERE cur_id IS DISTINCT FROM excluded.cur_id",
+                            rows)
+            changed = self._touch(con, changes)
+        if changed:
+            self.cache.invalidate({"countries"})
 
     def insert_curr_values(self, currency_values: list[CurrencyValues]):
         """
@@ -82,19 +322,233 @@ class Database:
         :param currency_values:
         :return: None
         """
+        currency_ids = self.get_currency_ids()
+        self.bulk_insert_curr_values((currency_ids[currency_value.currency.en_name], date_value.value,
+                                      relative_value.value, date_value.date.strftime('%Y-%m-%d'))
+                                     for currency_value in currency_values
+                                     for date_value, relative_value in zip(currency_value.values,
+                                                                           currency_value.relative_values))
+
+    @timed("db_write")
+    def bulk_insert_curr_values(self, rows: Iterable[CurrValueRow]) -> int:
+        """
+        Insert currency value rows into DB in batches within a single transaction
+
+        :param rows: iterable of (cur_id, value, relative_value, datetime in %Y-%m-%d format) tuples
+        :return: number of rows written
+        """
         logger.debug("Inserting currency values in DB")
+        rows = iter(rows)
+        count = 0
+        months = set()
+        with self.writer() as con:
+            changes = con.total_changes
+            while batch := list(islice(rows, self.batch_size)):
+                months.update((row[0], row[3][:7]) for row in batch)
+                con.executemany("INSERT INTO curr_value (cur_id, value, relative_value, datetime) VALUES (?, ?, ?, ?)"
+                                "ON CONFLICT DO UPDATE SET value = excluded.value, relative_value = excluded.relative_value "
+                                "WHERE value IS DISTINCT FROM excluded.value OR relative_value IS DISTINCT FROM excluded.relative_value",
+                                batch)
+                count += len(batch)
+            changed = self._touch(con, changes)
+            if changed:
+                self._values_written(con, months)
+        if changed:
+            self.cache.invalidate({f"curr_value:{currency_id}" for currency_id, _ in months})
+        return count
+
+    def _values_written(self, con: sqlite3.Connection, months: set[tuple[int, str]]):
+        """
+        Update data derived from currency values of the written months and the values modification time
+        within the write transaction
+
+        :param con: connection with an open transaction
+        :param months: set of (cur_id, month in %Y-%m format) tuples
+        :return: None
+        """
+        con.execute("UPDATE meta SET value = ? WHERE key = 'values_modified'",
+                    (datetime.now(timezone.utc).isoformat(),))
+        self._update_rollups(con, months)
+
+    @staticmethod
+    def _update_rollups(con: sqlite3.Connection, months: set[tuple[int, str]]):
+        """
+        Recompute monthly rollups of the given months from currency values in one statement once all values
+        are written. Only the written months are read, so the cost does not depend on the size of the stored history
+
+        :param con: writer connection with an open transaction
+        :param months: set of (cur_id, month in %Y-%m format) tuples
+        :return: None
+        """
+        logger.debug("Updating %d monthly rollups in DB", len(months))
+        con.execute("DELETE FROM rollup_month")
+        con.executemany("INSERT INTO rollup_month (cur_id, month) VALUES (?, ?)", months)
+        con.execute(ROLLUP_MONTHS)
+
+    def _touch(self, con: sqlite3.Connection, changes: int) -> bool:
+        """
+        Update the last modification time of data if anything was changed within the transaction
+
+        :param con: connection with an open transaction
+        :param changes: value of total_changes at the start of the transaction
+        :return: True if anything was changed
+        """
+        if con.total_changes == changes:
+            return False
+        previous = con.execute("SELECT value FROM meta WHERE key = 'last_modified'").fetchone()[0]
+        current = datetime.now(timezone.utc).isoformat()
+        con.execute("UPDATE meta SET value = ? WHERE key = 'last_modified'", (current,))
+        self.cache.advance_data_version(previous, current)
+        return True
+
+    def _get_modified_value(self) -> str:
+        with self.conn as con:
+            cursor = con.cursor()
+            cursor.execute("SELECT value FROM meta WHERE key = 'last_modified'")
+            return cursor.fetchone()[0]
+
+    def get_last_modified(self) -> datetime:
+        """
+        Get the time of the last change of currencies, countries or currency values
+
+        :return: datetime in UTC
+        """
+        return datetime.fromisoformat(self._get_modified_value())
+
+    def get_coverage(self) -> dict[str, list[DateRange]]:
+        """
+        Get date ranges that were already scraped for every currency
+
+        :return: dictionary where keys are currency en_names and values are lists of scraped date ranges
+        """
+        logger.debug("Getting coverage from DB")
+        with self.conn as con:
+            cursor = con.cursor()
+            cursor.execute("SELECT currencies.en_name, coverage.start_date, coverage.end_date FROM coverage "
+                           "JOIN currencies ON currencies.id = coverage.cur_id ORDER BY coverage.start_date")
+            coverage = dict()
+            for en_name, start_date, end_date in cursor.fetchall():
+                coverage.setdefault(en_name, []).append((datetime.strptime(start_date, "%Y-%m-%d"),
+                                                         datetime.strptime(end_date, "%Y-%m-%d")))
+            return coverage
+
+    def add_coverage(self, en_name: str, start_date: datetime, end_date: datetime):
+        """
+        Mark date range as scraped for the currency, merging it with already scraped ranges
+
+        :param en_name: currency en_name
+        :param start_date:
+        :param end_date:
+        :return: None
+        """
+        logger.debug("Adding coverage %s - %s for %s in DB", start_date, end_date, en_name)
+        cur_id = self.get_currency_ids()[en_name]
+        with self.writer() as con:
+            cursor = con.cursor()
+            cursor.execute("SELECT start_date, end_date FROM coverage WHERE cur_id = ?", (cur_id,))
+            ranges = [(datetime.strptime(start, "%Y-%m-%d"), datetime.strptime(end, "%Y-%m-%d"))
+                      for start, end in cursor.fetchall()]
+            ranges = merge_ranges(ranges + [(start_date, end_date)])
+            con.execute("DELETE FROM coverage WHERE cur_id = ?", (cur_id,))
+            con.executemany("INSERT INTO coverage (cur_id, start_date, end_date) VALUES (?, ?, ?)",
+                            [(cur_id, start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")) for start, end in ranges])
+
+    def has_countries(self, currency_names: set[str]) -> bool:
+        """
+        Check whether countries are stored for every given currency
+
+        :param currency_names: set of currency ru_names
+        :return: True if every currency has at least one country
+        """
+        with self.conn as con:
+            cursor = con.cursor()
+            cursor.execute("SELECT DISTINCT currencies.ru_name FROM countries "
+                           "JOIN currencies ON currencies.id = countries.cur_id")
+            return currency_names <= {el[0] for el in cursor.fetchall()}
+
+    def set_meta(self, key: str, value: str):
+        """
+        Store service value in DB
+
+        :param key:
+        :param value:
+        :return: None
+        """
+        with self.writer() as con:
+            con.execute("INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT DO UPDATE SET value = excluded.value",
+                        (key, value))
+
+    def get_meta(self, key: str) -> Optional[str]:
+        """
+        Get service value from DB
+
+        :param key:
+        :return: stored value or None
+        """
         with self.conn as con:
-            for currency_value in currency_values:
-                cursor = con.cursor()
-                cursor.execute("SELECT id FROM currencies WHERE en_name = ?", (currency_value.currency.en_name,))
-                cur_id = cursor.fetchone()[0]
-                for date_value, relative_value in zip(currency_value.values, currency_value.relative_values):
-                    cur_datetime = date_value.date.strftime('%Y-%m-%d')
-                    con.execute("INSERT INTO curr_value (cur_id, value, relative_value, datetime) VALUES (?, ?, ?, ?)"
-                                "ON CONFLICT DO UPDATE SET value = ?, relative_value = ? WHERE value IS DISTINCT FROM ? OR relative_value IS DISTINCT FROM ?",
-                                (cur_id, date_value.value, relative_value.value, cur_datetime, date_value.value,
-                                 relative_value.value, date_value.value, relative_value.value))
+            cursor = con.cursor()
+            cursor.execute("SELECT value FROM meta WHERE key = ?", (key,))
+            row = cursor.fetchone()
+            return row[0] if row else None
+
+    def save_job(self, job: Job, history_size: int):
+        """
+        Store job status, only history_size most recently created jobs are kept
+
+        :param job:
+        :param history_size: number of stored jobs
+        :return: None
+        """
+        with self.writer() as con:
+            con.execute("INSERT INTO jobs (id, created_at, job) VALUES (?, ?, ?) "
+                        "ON CONFLICT DO UPDATE SET job = excluded.job",
+                        (job.id, job.created_at.isoformat(), job.model_dump_json()))
+            con.execute("DELETE FROM jobs WHERE id NOT IN (SELECT id FROM jobs ORDER BY created_at DESC LIMIT ?)",
+                        (history_size,))
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        """
+        Get stored job status
+
+        :param job_id:
+        :return: Job object or None if there is no such job
+        """
+        with self.conn as con:
+            row = con.execute("SELECT job FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            return Job.model_validate_json(row[0]) if row else None
+
+    @cached(lambda: {"currencies"})
+    @timed("db_read")
+    def get_all_currencies(self) -> list[Currency]:
+        """
+        Get all currencies from DB
 
+        :return: list of Currency objects with basic values
+        """
+        logger.debug("Getting all currencies from DB")
+        with self.conn as con:
+            cursor = con.cursor()
+            cursor.execute("SELECT ru_name, en_name, cur_code, basic_value FROM currencies ORDER BY id")
+            return [Currency(ru_name=ru_name, en_name=en_name, cur_code=cur_code, value=value)
+                    for ru_name, en_name, cur_code, value in cursor.fetchall()]
+
+    @cached(lambda: {"countries", "currencies"})
+    @timed("db_read")
+    def get_countries_with_currencies(self) -> list[tuple[str, str]]:
+        """
+        Get names of all countries with en_names of their currencies from DB
+
+        :return: list of (country, currency en_name) tuples
+        """
+        logger.debug("Getting countries with currencies from DB")
+        with self.conn as con:
+            cursor = con.cursor()
+            cursor.execute("SELECT countries.name, currencies.en_name FROM countries "
+                           "JOIN currencies ON currencies.id = countries.cur_id ORDER BY countries.name")
+            return cursor.fetchall()
+
+    @cached(lambda: {"countries"})
+    @timed("db_read")
     def get_all_countries(self) -> list[str]:
         """
         Get names of all countries from DB
@@ -109,28 +563,160 @@ class Database:
             countries = [el[0] for el in countries]
             return countries
 
-    def get_currencies_for_country(self, country: str, start_date, end_date) -> (int, list[DateValue]):
+    @cached(lambda countries: {"countries"})
+    @timed("db_read")
+    def get_country_currencies(self, countries: list[str]) -> dict[str, int]:
         """
-        Get list of relative values and datetimes for given country and date between start and end date
+        Get currency ids of given countries
 
-        :param country:
-        :param start_date:
-        :param end_date:
-        :return: tuple of currency id and list of DateValue objects
+        :param countries:
+        :return: dictionary where keys are countries and values are currency ids
         """
-        logger.debug("Getting currency values from DB for %s", country)
+        logger.debug("Getting currencies from DB for %d countries", len(countries))
         with self.conn as con:
             cursor = con.cursor()
-            cursor.execute("SELECT cur_id FROM countries WHERE name = ?", (country,))
-            currency_id = cursor.fetchone()[0]
+            cursor.execute(f"SELECT name, cur_id FROM countries WHERE name IN ({', '.join('?' * len(countries))})",
+                           countries)
+            return dict(cursor.fetchall())
+
+    @cached(lambda: {"currencies"})
+    @timed("db_read")
+    def get_basic_values_by_id(self) -> dict[int, float]:
+        """
+        Get basic values of all currencies
 
-            cursor.execute("SELECT relative_value, datetime FROM curr_value WHERE cur_id = ? AND datetime BETWEEN ? AND ?",
-                           (currency_id, start_date, end_date))
-            db_data = cursor.fetchall()
+        :return: dictionary where keys are currency ids and values are basic values
+        """
+        logger.debug("Getting basic values by currency id from DB")
+        with self.conn as con:
+            cursor = con.cursor()
+            cursor.execute("SELECT id, basic_value FROM currencies")
+            return dict(cursor.fetchall())
 
-            date_values = []
-            for el in db_data:
-                date_value = DateValue(value=el[0], date=el[1])
-                date_values.append(date_value)
+    @cached(lambda currency_ids, base_date: {f"curr_value:{currency_id}" for currency_id in currency_ids})
+    @timed("db_read")
+    def get_values_at(self, currency_ids: list[int], base_date: str) -> dict[int, float]:
+        """
+        Get values of given currencies at the date or at the closest earlier date with a published rate
 
-            return currency_id, date_values
+        :param currency_ids:
+        :param base_date: date in %Y-%m-%d format
+        :return: dictionary where keys are currency ids and values are currency values,
+            currencies without values up to the date are missing
+        """
+        logger.debug("Getting values at %s from DB for %d currencies", base_date, len(currency_ids))
+        values = dict()
+        with self.conn as con:
+            cursor = con.cursor()
+            for currency_id in currency_ids:
+                cursor.execute("SELECT value FROM curr_value WHERE cur_id = ? AND datetime <= ? "
+                               "ORDER BY datetime DESC LIMIT 1", (currency_id, base_date))
+                row = cursor.fetchone()
+                if row is not None:
+                    values[currency_id] = row[0]
+        return values
+
+    @cached(lambda currency_ids, start_date, end_date: {f"curr_value:{currency_id}" for currency_id in currency_ids})
+    @timed("db_read")
+    def get_series(self, currency_ids: list[int], start_date: str, end_date: str) -> dict[int, Series]:
+        """
+        Get raw values and dates of given currencies between start and end date in one indexed query
+
+        :param currency_ids:
+        :param start_date: date in %Y-%m-%d format
+        :param end_date: date in %Y-%m-%d format
+        :return: dictionary where keys are currency ids and values are Series sorted by date
+        """
+        logger.debug("Getting series from DB for %d currencies", len(currency_ids))
+        series = {currency_id: Series() for currency_id in currency_ids}
+        with self.conn as con:
+            cursor = con.cursor()
+            cursor.execute("SELECT cur_id, datetime, value FROM curr_value "
+                           f"WHERE cur_id IN ({', '.join('?' * len(currency_ids))}) AND datetime BETWEEN ? AND ? "
+                           "ORDER BY cur_id, datetime", (*currency_ids, start_date, end_date))
+            for currency_id, date, value in cursor:
+                currency_series = series[currency_id]
+                currency_series.dates.append(date)
+                currency_series.values.append(value)
+        return series
+
+    def iter_values(self, currency_ids: list[int], start_date: str,
+                    end_date: str) -> Iterator[tuple[str, str, float, float]]:
+        """
+        Stream stored values of given currencies between start and end date batch by batch, so memory does
+        not grow with the length of the history. Rows are read from one snapshot on a connection of its own,
+        the iteration may be resumed from any thread
+
+        :param currency_ids:
+        :param start_date: date in %Y-%m-%d format
+        :param end_date: date in %Y-%m-%d format
+        :return: iterator of (currency en_name, date, value, relative value) tuples sorted by currency and date
+        """
+        logger.debug("Streaming values from DB for %d currencies", len(currency_ids))
+        conn = self._connect(check_same_thread=False)
+        try:
+            conn.execute("PRAGMA query_only = ON")
+            cursor = conn.execute("SELECT currencies.en_name, curr_value.datetime, curr_value.value, "
+                                  "curr_value.relative_value FROM curr_value "
+                                  "JOIN currencies ON currencies.id = curr_value.cur_id "
+                                  f"WHERE cur_id IN ({', '.join('?' * len(currency_ids))}) "
+                                  "AND datetime BETWEEN ? AND ? ORDER BY cur_id, datetime",
+                                  (*currency_ids, start_date, end_date))
+            while batch := cursor.fetchmany(self.batch_size):
+                yield from batch
+        finally:
+            conn.close()
+
+    @cached(lambda currency_ids, *args: {f"curr_value:{currency_id}" for currency_id in currency_ids})
+    @timed("db_read")
+    def get_rollups(self, currency_ids: list[int], start_month: str, end_month: str,
+                    period: RollupPeriod = RollupPeriod.month) -> dict[int, list[Rollup]]:
+        """
+        Get statistics of raw values of given currencies by month or year from the monthly rollups
+
+        :param currency_ids:
+        :param start_month: first month in %Y-%m format
+        :param end_month: last month in %Y-%m format
+        :param period: size of the bucket
+        :return: dictionary where keys are currency ids and values are lists of Rollup objects sorted by period
+        """
+        logger.debug("Getting %s rollups from DB for %d currencies", period.value, len(currency_ids))
+        rollups = {currency_id: [] for currency_id in currency_ids}
+        with self.conn as con:
+            cursor = con.cursor()
+            cursor.execute("SELECT cur_id, month, count, sum, sum_sq, min, max, last_value FROM curr_value_monthly "
+                           f"WHERE cur_id IN ({', '.join('?' * len(currency_ids))}) AND month BETWEEN ? AND ? "
+                           "ORDER BY cur_id, month", (*currency_ids, start_month, end_month))
+            buckets = dict()
+            for currency_id, month, count, total, total_sq, min_value, max_value, last in cursor:
+                key = (currency_id, month if period == RollupPeriod.month else month[:4])
+                bucket = buckets.get(key)
+                if bucket is None:
+                    buckets[key] = [count, total, total_sq, min_value, max_value, last]
+                else:
+                    bucket[0] += count
+                    bucket[1] += total
+                    bucket[2] += total_sq
+                    bucket[3] = min(bucket[3], min_value)
+                    bucket[4] = max(bucket[4], max_value)
+                    bucket[5] = last
+        for (currency_id, period_name), (count, total, total_sq, min_value, max_value, last) in buckets.items():
+            mean = total / count
+            rollups[currency_id].append(Rollup(period=period_name, count=count, mean=mean, min=min_value,
+                                               max=max_value, last=last,
+                                               stddev=math.sqrt(max(total_sq / count - mean * mean, 0))))
+        return rollups
+
+    def get_series_for_countries(self, countries: list[str], start_date: str,
+                                 end_date: str) -> tuple[dict[str, int], dict[int, Series]]:
+        """
+        Get raw values and dates for given countries between start and end date.
+        Countries with the same currency share one Series
+
+        :param countries:
+        :param start_date: date in %Y-%m-%d format
+        :param end_date: date in %Y-%m-%d format
+        :return: tuple of country to currency id mapping and Series by currency id
+        """
+        country_currencies = self.get_country_currencies(countries)
+        return country_currencies, self.get_series(sorted(set(country_currencies.values())), start_date, end_date)
@@ -0,0 +1,108 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Optional
+
+from src.models.job import Job, JobStatus
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+    def __init__(self, max_workers: int = 1, history_size: int = 100):
+        """
+        Queue of scrape jobs executed by a pool of worker threads.
+
+        :param max_workers: number of worker threads
+        :param history_size: number of finished jobs kept for polling
+        """
+        self.history_size = history_size
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scrape-job")
+        self._jobs: dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, start_date: str, end_date: str, target: Callable[[Job], None],
+               on_update: Optional[Callable[[Job], None]] = None) -> Job:
+        """
+        Enqueue a job for the date range or return an active job that already covers it.
+        A queued job whose range overlaps the new one is extended instead of enqueueing a new job.
+
+        :param start_date: date in %Y-%m-%d format
+        :param end_date: date in %Y-%m-%d format
+        :param target: function that runs the job
+        :param on_update: function called with the job when its status changes
+        :return: Job object
+        """
+        with self._lock:
+            for job in self._jobs.values():
+                if job.is_active and job.start_date <= start_date and end_date <= job.end_date:
+                    logger.info("Range %s - %s is already covered by job %s", start_date, end_date, job.id)
+                    return job
+            for job in self._jobs.values():
+                if job.status == JobStatus.queued and start_date <= job.end_date and job.start_date <= end_date:
+                    job.start_date, job.end_date = min(job.start_date, start_date), max(job.end_date, end_date)
+                    logger.info("Merged range %s - %s into queued job %s", start_date, end_date, job.id)
+                    return job
+
+            job = Job(id=uuid.uuid4().hex, start_date=start_date, end_date=end_date, created_at=datetime.now())
+            self._jobs[job.id] = job
+            self._trim_history()
+        logger.info("Enqueued job %s for %s - %s", job.id, start_date, end_date)
+        self._report(job, on_update)
+        self._executor.submit(self._run, job, target, on_update)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """
+        Get job by its id.
+
+        :param job_id:
+        :return: Job object or None if there is no such job
+        """
+        return self._jobs.get(job_id)
+
+    def _run(self, job: Job, target: Callable[[Job], None], on_update: Optional[Callable[[Job], None]] = None):
+        """
+        Run the job and record its status and timings.
+
+        :param job:
+        :param target: function that runs the job
+        :param on_update: function called with the job when its status changes
+        :return: None
+        """
+        with self._lock:
+            job.status = JobStatus.running
+            job.started_at = datetime.now()
+        self._report(job, on_update)
+        started = time.monotonic()
+        try:
+            target(job)
+            job.status = JobStatus.done
+        except Exception as e:
+            logger.exception("Job %s failed", job.id)
+            job.error = str(e)
+            job.status = JobStatus.failed
+        job.finished_at = datetime.now()
+        job.duration = round(time.monotonic() - started, 3)
+        self._report(job, on_update)
+
+    @staticmethod
+    def _report(job: Job, on_update: Optional[Callable[[Job], None]]):
+        if on_update is not None:
+            try:
+                on_update(job)
+            except Exception:
+                logger.exception("Failed to report status of job %s", job.id)
+
+    def _trim_history(self):
+        """
+        Drop the oldest finished jobs when there are more than history_size of them.
+
+        :return: None
+        """
+        finished = [job_id for job_id, job in self._jobs.items() if not job.is_active]
+        for job_id in finished[:max(0, len(finished) - self.history_size)]:
+            del self._jobs[job_id]
@@ -0,0 +1,116 @@
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from src.models.job import JobStatus, SchedulerStatus
+
+logger = logging.getLogger(__name__)
+
+
+class DailyScheduler:
+    def __init__(self, run_at: str = "10:00", retries: int = 5, backoff: float = 60, max_backoff: float = 3600):
+        """
+        Runs a task every day at the given time, retrying failures with jittered exponential backoff.
+
+        :param run_at: local time of the daily run in %H:%M format
+        :param retries: number of retries after a failed attempt
+        :param backoff: base delay before the first retry in seconds
+        :param max_backoff: max delay between retries in seconds
+        """
+        self.run_at = datetime.strptime(run_at, "%H:%M").time()
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.status = SchedulerStatus()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def next_run_time(self, now: datetime) -> datetime:
+        """
+        Get time of the next daily run.
+
+        :param now:
+        :return: datetime of the next run
+        """
+        run_time = datetime.combine(now.date(), self.run_at)
+        return run_time if run_time > now else run_time + timedelta(days=1)
+
+    def start(self, target: Callable[[], int], on_status: Optional[Callable[[SchedulerStatus], None]] = None):
+        """
+        Run the scheduler in a daemon thread.
+
+        :param target: task returning the number of written rows
+        :param on_status: function called with the status whenever it changes
+        :return: None
+        """
+        self._thread = threading.Thread(target=self.run_forever, args=(target, on_status), name="scheduler",
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop the scheduler and wait for the thread to finish.
+
+        :return: None
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def run_forever(self, target: Callable[[], int], on_status: Optional[Callable[[SchedulerStatus], None]] = None):
+        """
+        Run the task every day until the scheduler is stopped.
+
+        :param target: task returning the number of written rows
+        :param on_status: function called with the status whenever it changes
+        :return: None
+        """
+        while not self._stop.is_set():
+            self.status.next_run = self.next_run_time(datetime.now())
+            self._report(on_status)
+            logger.info("Next scheduled ingest at %s", self.status.next_run)
+            if self._stop.wait((self.status.next_run - datetime.now()).total_seconds()):
+                break
+            self.run_once(target, on_status)
+
+    def run_once(self, target: Callable[[], int],
+                 on_status: Optional[Callable[[SchedulerStatus], None]] = None) -> bool:
+        """
+        Run the task now with retries.
+
+        :param target: task returning the number of written rows
+        :param on_status: function called with the status whenever it changes
+        :return: True if the task succeeded
+        """
+        self.status.last_run = datetime.now()
+        self.status.last_status = JobStatus.running
+        self.status.last_error = None
+        self.status.attempts = 0
+        started = time.monotonic()
+        for attempt in range(self.retries + 1):
+            self.status.attempts = attempt + 1
+            self._report(on_status)
+            try:
+                self.status.rows_written = target()
+                self.status.last_status = JobStatus.done
+                break
+            except Exception as e:
+                logger.exception("Scheduled ingest attempt %d failed", attempt + 1)
+                self.status.last_error = repr(e)
+                self.status.last_status = JobStatus.failed
+                delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+                if attempt == self.retries or self._stop.wait(delay):
+                    break
+        self.status.duration = round(time.monotonic() - started, 3)
+        self._report(on_status)
+        return self.status.last_status == JobStatus.done
+
+    def _report(self, on_status: Optional[Callable[[SchedulerStatus], None]]):
+        if on_status is not None:
+            try:
+                on_status(self.status)
+            except Exception:
+                logger.exception("Failed to report scheduler status")
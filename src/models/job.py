@@ -0,0 +1,98 @@
+import time
+from datetime import datetime
+from enum import Enum
+from typing import Optional
+
+from pydantic import BaseModel, PrivateAttr
+
+
+class JobStatus(str, Enum):
+    queued = "queued"
+    running = "running"
+    done = "done"
+    failed = "failed"
+
+
+class CurrencyProgress(BaseModel):
+    status: JobStatus = JobStatus.queued
+    rows: int = 0
+    chunks: int = 0
+    chunks_done: int = 0
+    duration: Optional[float] = None
+    error: Optional[str] = None
+    _started: float = PrivateAttr(default_factory=time.monotonic)
+
+
+class Job(BaseModel):
+    id: str
+    start_date: str
+    end_date: str
+    status: JobStatus = JobStatus.queued
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    duration: Optional[float] = None
+    error: Optional[str] = None
+    currencies: dict[str, CurrencyProgress] = {}
+
+    @property
+    def is_active(self) -> bool:
+        return self.status in (JobStatus.queued, JobStatus.running)
+
+    def currency_started(self, name: str, chunks: int = 1):
+        """
+        Mark scraping of the currency as started.
+
+        :param name: currency name
+        :param chunks: number of chunks to scrape
+        :return: None
+        """
+        progress = self.currencies.setdefault(name, CurrencyProgress())
+        progress.status = JobStatus.running if chunks else JobStatus.done
+        progress.chunks = chunks
+        progress._started = time.monotonic()
+        if not chunks:
+            progress.duration = 0
+
+    def chunk_finished(self, name: str, rows: int, error: Optional[Exception] = None):
+        """
+        Mark one chunk of the currency as scraped.
+
+        :param name: currency name
+        :param rows: number of parsed rows
+        :param error: exception raised while scraping, if any
+        :return: None
+        """
+        progress = self.currencies.setdefault(name, CurrencyProgress(chunks=1))
+        progress.rows += rows
+        progress.chunks_done += 1
+        if error:
+            progress.status = JobStatus.failed
+            progress.error = repr(error)
+        if error or progress.chunks_done >= progress.chunks:
+            progress.duration = round(time.monotonic() - progress._started, 3)
+            if progress.status != JobStatus.failed:
+                progress.status = JobStatus.done
+
+
+class ScrapeFailure(BaseModel):
+    target: str
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    error: str
+    failed_at: datetime
+
+
+class FailureReport(BaseModel):
+    updated_at: Optional[datetime] = None
+    failures: list[ScrapeFailure] = []
+
+
+class SchedulerStatus(BaseModel):
+    next_run: Optional[datetime] = None
+    last_run: Optional[datetime] = None
+    last_status: Optional[JobStatus] = None
+    last_error: Optional[str] = None
+    attempts: int = 0
+    rows_written: int = 0
+    duration: Optional[float] = None
@@ -0,0 +1,74 @@
+from array import array
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Optional
+
+
+@dataclass
+class Series:
+    dates: list[str] = field(default_factory=list)
+    values: array = field(default_factory=lambda: array('d'))
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def shift(self, offset: float) -> "Series":
+        """
+        Get series with offset added to every value, values are rounded like the scraped relative values.
+
+        :param offset:
+        :return: new Series object sharing the dates
+        """
+        return Series(dates=self.dates, values=array('d', [round(value + offset, 4) for value in self.values]))
+
+
+class RollupPeriod(str, Enum):
+    month = "month"
+    year = "year"
+
+
+@dataclass
+class Rollup:
+    period: str
+    count: int
+    mean: float
+    min: float
+    max: float
+    last: float
+    stddev: float
+
+    def shift(self, offset: float) -> "Rollup":
+        """
+        Get the same statistics for values shifted by offset, the standard deviation does not change.
+
+        :param offset: value added to every value of the bucket
+        :return: new Rollup object
+        """
+        return Rollup(period=self.period, count=self.count, mean=self.mean + offset, min=self.min + offset,
+                      max=self.max + offset, last=self.last + offset, stddev=self.stddev)
+
+
+def align_series(series: list[Series], forward_fill: bool = False) -> tuple[list[str], list[list[Optional[float]]]]:
+    """
+    Align series onto one sorted union date axis.
+
+    :param series: list of Series sorted by date
+    :param forward_fill: fill missing days with the last known value instead of leaving gaps
+    :return: tuple of date axis and list of aligned values for every series, missing values are None
+    """
+    dates = sorted(set().union(*(el.dates for el in series)))
+    positions = {date: i for i, date in enumerate(dates)}
+    aligned = []
+    for el in series:
+        values = [None] * len(dates)
+        for date, value in zip(el.dates, el.values):
+            values[positions[date]] = value
+        if forward_fill:
+            last = None
+            for i, value in enumerate(values):
+                if value is None:
+                    values[i] = last
+                else:
+                    last = value
+        aligned.append(values)
+    return dates, aligned
@@ -0,0 +1,154 @@
+import bisect
+import functools
+import threading
+import time
+from typing import Callable, Iterable
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    labels = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        labels.append(extra)
+    return "{" + ",".join(labels) + "}" if labels else ""
+
+
+def _format_value(value: float) -> str:
+    return "+Inf" if value == float("inf") else repr(float(value))
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, label_names: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        """
+        Thread safe histogram of observed values in the Prometheus exposition format.
+
+        :param name: metric name
+        :param documentation: help text of the metric
+        :param label_names: names of labels
+        :param buckets: upper bounds of buckets in ascending order
+        """
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series: dict[tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        """
+        Record observed value.
+
+        :param value:
+        :param label_values: values of labels in the order of label names
+        :return: None
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # counts of every bucket and +Inf, sum of values
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def collect(self) -> list[str]:
+        """
+        Get lines of the metric in the Prometheus text format.
+
+        :return: list of lines
+        """
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(label_values, list(counts), total) for label_values, (counts, total) in self._series.items()]
+        for label_values, counts, total in sorted(series):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _format_labels(self.label_names, label_values, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, label_values)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, documentation: str, label_names: Iterable[str], collect: Callable[[], dict]):
+        """
+        Metric whose values are read from a function on every scrape.
+
+        :param name: metric name
+        :param documentation: help text of the metric
+        :param label_names: names of labels
+        :param collect: function returning dictionary where keys are tuples of label values and values are numbers
+        """
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._collect = collect
+
+    def collect(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        for label_values, value in sorted(self._collect().items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, label_values)} {value}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        """
+        Collection of metrics exposed on the /metrics endpoint.
+        """
+        self._metrics = []
+
+    def register(self, metric):
+        """
+        Add metric to the registry.
+
+        :param metric: Histogram or Gauge object
+        :return: the same metric
+        """
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """
+        Render all metrics in the Prometheus text format.
+
+        :return: text of the /metrics response
+        """
+        return "\n".join(line for metric in self._metrics for line in metric.collect()) + "\n"
+
+
+registry = MetricsRegistry()
+stage_seconds = registry.register(Histogram("currency_parser_stage_seconds", "Duration of hot path stages",
+                                            ["stage"]))
+request_seconds = registry.register(Histogram("currency_parser_http_request_seconds",
+                                              "Duration of handled HTTP requests", ["method", "route", "status"]))
+
+
+class timed:
+    def __init__(self, stage: str):
+        """
+        Record duration of the block or the function into the stage histogram.
+
+        :param stage: http_fetch, html_parse, db_write, db_read, assemble or render
+        """
+        self.stage = stage
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(self.stage):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        stage_seconds.observe(time.perf_counter() - self._started, self.stage)
+        return False
@@ -0,0 +1,21 @@
+import logging
+import uuid
+from contextvars import ContextVar
+
+trace_id: ContextVar[str] = ContextVar("trace_id", default="-")
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+class TraceIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        """
+        Add trace id of the current request or job to the log record.
+
+        :param record:
+        :return: True, records are never dropped
+        """
+        record.trace_id = trace_id.get()
+        return True
@@ -1,16 +1,20 @@
+import hashlib
 import logging
 
-import requests
-from bs4 import BeautifulSoup
 from src.models.country_curr import Currency
+from src.monitoring.metrics import timed
+from src.parsers.http import fetch
+from src.parsers.tables import extract_table
+from src.settings.config import settings
 
 logger = logging.getLogger(__name__)
 
 
 class CountryParser:
     def __init__(self, currencies: list[Currency]):
-        self.url = "https://www.iban.ru/currency-codes"
+        self.url = settings.IBAN_URL
         self.currency_names = set([el.ru_name for el in currencies])
+        self._parsed = (None, None)
 
     def scrape_countries(self) -> dict[str, list[str]]:
         """
@@ -18,22 +22,39 @@ class CountryParser:
 
         :return: dictionary where keys are currencies and values are lists of countries.
         """
-        response = requests.get(self.url)
-        logger.debug("Getting response from %s", self.url)
-        response.raise_for_status()
+        return fetch(self.url, max_age=settings.HTTP_CACHE_MAX_AGE_COUNTRIES, parse=self._parse_page)
 
-        soup = BeautifulSoup(response.content, 'html.parser')
-        currency_table = soup.find('table', class_='table-bordered')
+    def _parse_page(self, content: bytes) -> dict[str, list[str]]:
+        """
+        Parse the iban page unless it is the same as the last parsed one.
+
+        :param content: page content
+        :return: dictionary where keys are currencies and values are lists of countries.
+        """
+        digest = hashlib.sha1(content).digest()
+        if self._parsed[0] != digest:
+            self._parsed = (digest, self._parse_table(content))
+        else:
+            logger.debug("Countries table is not changed")
+        return self._parsed[1]
+
+    @timed("html_parse")
+    def _parse_table(self, content: bytes) -> dict[str, list[str]]:
+        """
+        Parse currency codes table of the iban page.
+
+        :param content: page content
+        :return: dictionary where keys are currencies and values are lists of countries.
+        """
+        rows = extract_table(content, 'table-bordered', backend=settings.HTML_PARSER_BACKEND)
+        if rows is None:
+            raise ValueError("There is no currency codes table on the page")
 
         countries_by_curr = dict()
-        rows = currency_table.find_all('tr')[1:]
         logger.debug("Found table with %d rows", len(rows))
-        for row in rows:
-            columns = row.find_all('td')
-
-            currency_name = columns[1].text.strip()
+        for columns in rows:
+            currency_name = columns[1]
             if currency_name in self.currency_names:
-                country = columns[0].text.strip()
-                countries_by_curr[currency_name] = countries_by_curr.get(currency_name, []) + [country]
+                countries_by_curr.setdefault(currency_name, []).append(columns[0])
         return countries_by_curr
 
@@ -1,34 +1,113 @@
+import asyncio
 import logging
+import math
+from typing import AsyncIterator, Optional
 
-import requests
-from bs4 import BeautifulSoup
 from src.models.country_curr import Currency, DateValue, CurrencyValues
+from src.models.job import Job, ScrapeFailure
+from src.monitoring.metrics import timed
+from src.parsers.http import AsyncFetcher, fetch
+from src.parsers.ranges import DateRange, missing_ranges, split_range
+from src.parsers.tables import extract_table
+from src.settings.config import settings
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
 
 class CurrencyParser:
-    def __init__(self, currencies: list[Currency]):
+    def __init__(self, currencies: list[Currency], max_concurrency: int = 8, rate_limit: float = 0,
+                 chunk_days: int = 365):
         self.currencies = currencies
+        self.chunk_days = chunk_days
+        self.max_concurrency = max_concurrency
+        self.rate_limit = rate_limit
 
-    def scrape_currencies(self, start_date: datetime, end_date: datetime) -> list[CurrencyValues]:
+    async def iter_chunks(self, start_date: datetime, end_date: datetime, progress: Optional[Job] = None,
+                          coverage: Optional[dict[str, list[DateRange]]] = None,
+                          failures: Optional[list[ScrapeFailure]] = None
+                          ) -> AsyncIterator[tuple[CurrencyValues, DateRange]]:
         """
-        Run parser for every currency with date between start_date and end_date.
+        Scrape every currency in page-sized chunks concurrently and yield chunks as soon as they are parsed.
 
         :param start_date:
         :param end_date:
-        :return: list of CurrencyValues objects
+        :param progress: job to report per-currency progress to
+        :param coverage: already scraped date ranges by currency en_name
+        :param failures: list to record failed chunks to while scraping the rest,
+            the first failure is raised if it is not given
+        :return: async iterator of CurrencyValues objects with their date ranges in order of completion
         """
-        curr_values_all = []
+        plan = self.plan_chunks(start_date, end_date, coverage)
+        logger.debug("Planned %d chunks", len(plan))
         for currency in self.currencies:
-            curr_values = CurrencyValues(currency=currency)
-            date_values = self.parse(currency.cur_code, start_date, end_date)
-            curr_values.values += date_values
-            curr_values.relative_values += [DateValue(value=round(elem.value - currency.value, 4), date=elem.date)
-                                            for elem in date_values]
-            curr_values_all.append(curr_values)
-        return curr_values_all
+            if progress:
+                progress.currency_started(currency.en_name, sum(1 for el in plan if el[0] is currency))
+
+        async with AsyncFetcher(max_concurrency=self.max_concurrency, rate_limit=self.rate_limit) as fetcher:
+            tasks = [asyncio.ensure_future(self._scrape_chunk(fetcher, currency, chunk, progress, failures))
+                     for currency, chunk in plan]
+            try:
+                for task in asyncio.as_completed(tasks):
+                    result = await task
+                    if result is not None:
+                        yield result
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    def plan_chunks(self, start_date: datetime, end_date: datetime,
+                    coverage: Optional[dict[str, list[DateRange]]] = None) -> list[tuple[Currency, DateRange]]:
+        """
+        Split missing date ranges of every currency into page-sized chunks.
+
+        :param start_date:
+        :param end_date:
+        :param coverage: already scraped date ranges by currency en_name
+        :return: list of currencies with date ranges to scrape
+        """
+        coverage = coverage or {}
+        plan = []
+        for currency in self.currencies:
+            for start, end in missing_ranges(start_date, end_date, coverage.get(currency.en_name, [])):
+                plan += [(currency, chunk) for chunk in split_range(start, end, self.chunk_days)]
+        return plan
+
+    async def _scrape_chunk(self, fetcher: AsyncFetcher, currency: Currency, chunk: DateRange,
+                            progress: Optional[Job] = None, failures: Optional[list[ScrapeFailure]] = None
+                            ) -> Optional[tuple[CurrencyValues, DateRange]]:
+        """
+        Download and parse values of one currency for the date range.
+
+        :param fetcher: AsyncFetcher to download page with
+        :param currency:
+        :param chunk: date range to scrape
+        :param progress: job to report progress to
+        :param failures: list to record the failure to instead of raising it
+        :return: CurrencyValues object with the date range or None if the failure is recorded
+        """
+        try:
+            date_values = await fetcher.get(self._get_link(currency.cur_code, *chunk), max_age=self._max_age(chunk[1]),
+                                            parse=self._parse_table)
+        except Exception as e:
+            if progress:
+                progress.chunk_finished(currency.en_name, 0, e)
+            if failures is None:
+                raise
+            logger.warning("Failed to scrape %s from %s to %s: %r", currency.en_name, chunk[0].date(),
+                           chunk[1].date(), e)
+            failures.append(ScrapeFailure(target=currency.en_name, start_date=chunk[0].strftime("%Y-%m-%d"),
+                                          end_date=chunk[1].strftime("%Y-%m-%d"), error=repr(e),
+                                          failed_at=datetime.now()))
+            return None
+        if progress:
+            progress.chunk_finished(currency.en_name, len(date_values))
+        curr_values = CurrencyValues(currency=currency)
+        curr_values.values += date_values
+        curr_values.relative_values += [DateValue(value=round(elem.value - currency.value, 4), date=elem.date)
+                                        for elem in date_values]
+        return curr_values, chunk
 
     @staticmethod
     def _get_link(cur_code, start_date: datetime, end_date: datetime) -> str:
@@ -42,7 +121,7 @@ class CurrencyParser:
         """
         s_day, s_month, s_year = start_date.day, start_date.month, start_date.year
         e_day, e_month, e_year = end_date.day, end_date.month, end_date.year
-        url = (f"https://www.finmarket.ru/currency/rates/?id=10148&pv=1&cur={cur_code}&"
+        url = (f"{settings.FINMARKET_URL}?id=10148&pv=1&cur={cur_code}&"
                f"bd={s_day}&bm={s_month}&by={s_year}&ed={e_day}&em={e_month}&ey={e_year}&x=11&y=8#archive")
         return url
 
@@ -56,22 +135,47 @@ class CurrencyParser:
         :param end_date:
         :return: list of DateValue objects
         """
-        date_values = []
-
         url = CurrencyParser._get_link(cur_code, start_date, end_date)
-        response = requests.get(url)
-        logger.debug("Getting response from %s", url)
-        response.raise_for_status()
+        return fetch(url, max_age=CurrencyParser._max_age(end_date), parse=CurrencyParser._parse_table)
 
-        soup = BeautifulSoup(response.content, 'html.parser')
-        currency_table = soup.find('table', class_='karramba')
+    @staticmethod
+    def _max_age(end_date: datetime) -> float:
+        """
+        Get how long the rates page stays fresh. Pages that end before today never change.
+
+        :param end_date: end date of the page
+        :return: seconds
+        """
+        if end_date.date() < datetime.now().date():
+            return math.inf
+        return settings.HTTP_CACHE_MAX_AGE_RATES
 
-        rows = currency_table.find_all('tr')[1:]
+    @staticmethod
+    @timed("html_parse")
+    def _parse_table(content: bytes) -> list[DateValue]:
+        """
+        Parse rates table of the finmarket page.
+
+        :param content: page content
+        :return: list of DateValue objects
+        """
+        rows = extract_table(content, 'karramba', backend=settings.HTML_PARSER_BACKEND)
+        if rows is None:
+            raise ValueError("There is no rates table on the page")
         logger.debug("Found table with %d rows", len(rows))
-        for row in rows:
-            columns = row.find_all('td')
-            currency_date = datetime.strptime(columns[0].text.strip(), "%d.%m.%Y")
-            currency_value = float(columns[2].text.strip().replace(",", "."))
-            date_value = DateValue(date=currency_date, value=currency_value)
-            date_values.append(date_value)
-        return date_values
+        return [DateValue.model_construct(date=currency_date, value=currency_value)
+                for currency_date, currency_value in CurrencyParser._decode_rows(rows)]
+
+    @staticmethod
+    def _decode_rows(rows: list[list[str]]) -> list[tuple[datetime, float]]:
+        """
+        Decode date and rate columns of the rates table.
+
+        :param rows: cell texts of the table rows
+        :return: list of (date, value) tuples
+        """
+        decoded = []
+        for columns in rows:
+            day, month, year = columns[0].split(".")
+            decoded.append((datetime(int(year), int(month), int(day)), float(columns[2].replace(",", "."))))
+        return decoded
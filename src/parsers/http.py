@@ -0,0 +1,249 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Callable, Optional
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+
+from src.monitoring.metrics import timed
+from src.parsers.http_cache import T, http_cache
+from src.settings.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Statuses of overloaded or failing upstream, other errors are not retried
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, threshold: int = 5, cooldown: float = 30):
+        """
+        Suspends requests to a host after consecutive failures. After the cooldown one trial request is let
+        through, its success closes the circuit and its failure opens it again.
+
+        :param threshold: number of consecutive failures opening the circuit, 0 disables the breaker
+        :param cooldown: seconds requests to the host stay suspended
+        """
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures: dict[str, int] = {}
+        self._opened_at: dict[str, float] = {}
+        self._trials: set[str] = set()
+        self._lock = threading.Lock()
+
+    def check(self, host: str) -> bool:
+        """
+        Raise CircuitOpenError if requests to the host are suspended.
+
+        :param host: host name
+        :return: True if the request is the trial request of the host, it must end with success, failure or release
+        """
+        with self._lock:
+            opened_at = self._opened_at.get(host)
+            if opened_at is None:
+                return False
+            if time.monotonic() - opened_at < self.cooldown or host in self._trials:
+                raise CircuitOpenError(f"Requests to {host} are suspended after {self._failures[host]} failures")
+            self._trials.add(host)
+        logger.info("Sending trial request to %s", host)
+        return True
+
+    def release(self, host: str):
+        """
+        End the trial request of the host without a result, so the next request is let through as a trial.
+
+        :param host: host name
+        :return: None
+        """
+        with self._lock:
+            self._trials.discard(host)
+
+    def success(self, host: str):
+        """
+        Record a response of the host, closing its circuit.
+
+        :param host: host name
+        :return: None
+        """
+        with self._lock:
+            self._failures.pop(host, None)
+            self._trials.discard(host)
+            if self._opened_at.pop(host, None) is not None:
+                logger.info("Circuit of %s is closed", host)
+
+    def failure(self, host: str):
+        """
+        Record a failed request to the host, opening its circuit after threshold consecutive failures.
+
+        :param host: host name
+        :return: None
+        """
+        with self._lock:
+            self._trials.discard(host)
+            failures = self._failures[host] = self._failures.get(host, 0) + 1
+            if self.threshold and failures >= self.threshold:
+                if host not in self._opened_at:
+                    logger.warning("Circuit of %s is open after %d failures", host, failures)
+                self._opened_at[host] = time.monotonic()
+
+
+circuit_breaker = CircuitBreaker(settings.SCRAPER_BREAKER_THRESHOLD, settings.SCRAPER_BREAKER_COOLDOWN)
+
+
+def backoff_delay(attempt: int) -> float:
+    """
+    Get delay before the retry with full jitter, so concurrent requests do not retry at once.
+
+    :param attempt: number of the failed attempt starting from 0
+    :return: seconds
+    """
+    return random.uniform(0, min(settings.SCRAPER_MAX_BACKOFF, settings.SCRAPER_BACKOFF * 2 ** attempt))
+
+
+class HostRateLimiter:
+    def __init__(self, rate_limit: float):
+        """
+        Limits the number of requests per second sent to every host.
+
+        :param rate_limit: max requests per second for a single host, 0 disables the limit
+        """
+        self.interval = 1 / rate_limit if rate_limit > 0 else 0
+        self._next_slot: dict[str, float] = {}
+        self._lock = asyncio.Lock()
+
+    async def wait(self, host: str):
+        """
+        Wait until a request to the given host is allowed.
+
+        :param host: host name
+        :return: None
+        """
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class AsyncFetcher:
+    def __init__(self, max_concurrency: int = 8, rate_limit: float = 0):
+        """
+        Async HTTP client with pooled keep-alive connections, concurrency limit and per-host rate limit.
+
+        :param max_concurrency: max number of requests in flight
+        :param rate_limit: max requests per second for a single host, 0 disables the limit
+        """
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._rate_limiter = HostRateLimiter(rate_limit)
+        self._client = None
+
+    async def __aenter__(self) -> "AsyncFetcher":
+        limits = httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency)
+        timeout = httpx.Timeout(settings.SCRAPER_READ_TIMEOUT, connect=settings.SCRAPER_CONNECT_TIMEOUT)
+        self._client = httpx.AsyncClient(limits=limits, timeout=timeout, follow_redirects=True)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._client.aclose()
+        self._client = None
+
+    async def get(self, url: str, max_age: float = 0, parse: Optional[Callable[[bytes], T]] = None) -> T:
+        """
+        Download the page with the given url or take it from the HTTP cache. Timeouts, connection errors
+        and overload statuses are retried with backoff unless the circuit of the host is open.
+
+        :param url: page url
+        :param max_age: seconds the downloaded page stays fresh in the cache, math.inf for pages that never change
+        :param parse: function parsing the page, the page is cached only if it succeeds
+        :return: parsed page or response body if parse is not given
+        """
+        content = http_cache.get_fresh(url, parse)
+        if content is not None:
+            return content
+        host = urlsplit(url).netloc
+        for attempt in range(settings.SCRAPER_RETRIES + 1):
+            trial = False
+            try:
+                async with self._semaphore:
+                    # Checked once the request is about to be sent, so queued requests fail fast after opening
+                    trial = circuit_breaker.check(host)
+                    await self._rate_limiter.wait(host)
+                    logger.debug("Getting response from %s", url)
+                    with timed("http_fetch"):
+                        response = await self._client.get(url, headers=http_cache.get_validators(url))
+            except httpx.TransportError as e:
+                error = e
+            except BaseException:
+                # A cancelled or unexpectedly failed trial must not keep the circuit suspended forever
+                if trial:
+                    circuit_breaker.release(host)
+                raise
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    circuit_breaker.success(host)
+                    # 304 is an answer to the conditional request, not an error
+                    if response.status_code >= 400:
+                        response.raise_for_status()
+                    return http_cache.update(url, response.status_code, response.headers, response.content,
+                                             max_age, parse)
+                error = httpx.HTTPStatusError(f"{response.status_code} for {url}", request=response.request,
+                                              response=response)
+            circuit_breaker.failure(host)
+            if attempt == settings.SCRAPER_RETRIES:
+                raise error
+            delay = backoff_delay(attempt)
+            logger.info("Retrying %s in %.1f s after %r", url, delay, error)
+            await asyncio.sleep(delay)
+
+
+def fetch(url: str, max_age: float = 0, parse: Optional[Callable[[bytes], T]] = None) -> T:
+    """
+    Download the page with the given url or take it from the HTTP cache.
+
+    :param url: page url
+    :param max_age: seconds the downloaded page stays fresh in the cache, math.inf for pages that never change
+    :param parse: function parsing the page, the page is cached only if it succeeds
+    :return: parsed page or response body if parse is not given
+    """
+    content = http_cache.get_fresh(url, parse)
+    if content is not None:
+        return content
+    host = urlsplit(url).netloc
+    for attempt in range(settings.SCRAPER_RETRIES + 1):
+        trial = circuit_breaker.check(host)
+        logger.debug("Getting response from %s", url)
+        try:
+            with timed("http_fetch"):
+                response = requests.get(url, headers=http_cache.get_validators(url),
+                                        timeout=(settings.SCRAPER_CONNECT_TIMEOUT, settings.SCRAPER_READ_TIMEOUT))
+        except requests.RequestException as e:
+            error = e
+        except BaseException:
+            if trial:
+                circuit_breaker.release(host)
+            raise
+        else:
+            if response.status_code not in RETRY_STATUSES:
+                circuit_breaker.success(host)
+                response.raise_for_status()
+                return http_cache.update(url, response.status_code, response.headers, response.content, max_age,
+                                         parse)
+            error = requests.HTTPError(f"{response.status_code} for {url}", response=response)
+        circuit_breaker.failure(host)
+        if attempt == settings.SCRAPER_RETRIES:
+            raise error
+        delay = backoff_delay(attempt)
+        logger.info("Retrying %s in %.1f s after %r", url, delay, error)
+        time.sleep(delay)
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import logging
+import math
+import os
+import time
+from typing import Callable, Optional, TypeVar
+
+from src.settings.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class HttpCache:
+    def __init__(self, directory: str, enabled: bool = True):
+        """
+        On-disk cache of downloaded pages keyed by url that supports conditional requests.
+
+        :param directory: directory to store pages in
+        :param enabled: False makes every lookup miss and every store a no-op
+        """
+        self.directory = directory
+        self.enabled = enabled
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(url.encode()).hexdigest())
+
+    def _read_meta(self, url: str) -> Optional[dict]:
+        if not self.enabled:
+            return None
+        try:
+            with open(self._path(url) + ".json") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _read_body(self, url: str) -> Optional[bytes]:
+        try:
+            with open(self._path(url) + ".body", "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write(self, path: str, data: bytes):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def discard(self, url: str):
+        """
+        Remove cached page, so it is downloaded without validators next time.
+
+        :param url: page url
+        :return: None
+        """
+        for suffix in (".json", ".body"):
+            try:
+                os.remove(self._path(url) + suffix)
+            except OSError:
+                pass
+
+    def get_fresh(self, url: str, parse: Optional[Callable[[bytes], T]] = None) -> Optional[T]:
+        """
+        Get cached page if it has not expired yet. A page that fails to parse is discarded.
+
+        :param url: page url
+        :param parse: function parsing the page
+        :return: parsed page, page content if parse is not given, or None
+        """
+        meta = self._read_meta(url)
+        if meta is None or (meta["expires_at"] is not None and meta["expires_at"] <= time.time()):
+            return None
+        content = self._read_body(url)
+        if content is None or parse is None:
+            return content
+        try:
+            result = parse(content)
+        except Exception as e:
+            logger.warning("Discarding cached response for %s: %r", url, e)
+            self.discard(url)
+            return None
+        logger.debug("Using cached response for %s", url)
+        return result
+
+    def get_validators(self, url: str) -> dict[str, str]:
+        """
+        Get headers of a conditional request for the cached page.
+
+        :param url: page url
+        :return: dictionary with If-None-Match and If-Modified-Since headers if they are known
+        """
+        meta = self._read_meta(url)
+        headers = dict()
+        if meta is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def update(self, url: str, status_code: int, headers, content: bytes, max_age: float,
+               parse: Optional[Callable[[bytes], T]] = None) -> T:
+        """
+        Store downloaded page or refresh the cached one on 304 response. The page is stored only after it is
+        parsed, so error pages without data are downloaded again instead of being served from the cache.
+
+        :param url: page url
+        :param status_code: response status code
+        :param headers: response headers
+        :param content: response body
+        :param max_age: seconds the page stays fresh, math.inf for pages that never change
+        :param parse: function parsing the page, it raises if the page must not be cached
+        :return: parsed page or page content if parse is not given
+        """
+        if status_code == 304:
+            cached = self._read_body(url)
+            if cached is None:
+                raise ValueError(f"Got 304 for {url} without cached page")
+            logger.debug("Cached response for %s is not modified", url)
+            content = cached
+        try:
+            result = parse(content) if parse is not None else content
+        except Exception:
+            if status_code == 304:
+                self.discard(url)
+            raise
+        if not self.enabled:
+            return result
+
+        os.makedirs(self.directory, exist_ok=True)
+        meta = {"url": url, "etag": headers.get("etag"), "last_modified": headers.get("last-modified"),
+                "expires_at": None if math.isinf(max_age) else time.time() + max_age}
+        if status_code != 304:
+            self._write(self._path(url) + ".body", content)
+        self._write(self._path(url) + ".json", json.dumps(meta).encode())
+        return result
+
+
+http_cache = HttpCache(settings.HTTP_CACHE_DIR, enabled=settings.HTTP_CACHE_ENABLED)
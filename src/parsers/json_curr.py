@@ -1,7 +1,10 @@
 import json
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from typing import Optional
 
+from src.database.sqlite import Database
 from src.models.country_curr import Currency
 from src.settings.config import settings
 from src.parsers.currency import CurrencyParser
@@ -10,23 +13,35 @@ logger = logging.getLogger(__name__)
 
 
 class JsonCurrParser:
-    def __init__(self):
+    def __init__(self, database: Optional[Database] = None):
         self.filename = settings.CURR_CONFIG
         self.basic_curr_date = settings.BASIC_CURR_DATE
+        self.max_concurrency = settings.SCRAPER_MAX_CONCURRENCY
+        self.database = database
 
     def parse_county_curr(self) -> list[Currency]:
         """
         Parse the JSON file and return a list of Currency objects.
+        Basic values are taken from DB if they are stored for the basic date, missing ones are scraped
+        concurrently and stored.
 
         :return: list of Currency objects
         """
-        res_currencies = []
         with open(self.filename, "r") as f:
             logger.info("Parsing JSON file")
             country_curr = json.load(f)
-            for elem in country_curr:
-                elem_value = self.parse_basic_curr(elem['cur_code'])
-                res_currencies.append(Currency(**elem, value=elem_value))
+
+        basic_date = datetime.strptime(self.basic_curr_date, "%d.%m.%Y").strftime("%Y-%m-%d")
+        basic_values = self.database.get_basic_values(basic_date) if self.database else {}
+        missing_codes = [elem['cur_code'] for elem in country_curr if elem['cur_code'] not in basic_values]
+        if missing_codes:
+            logger.info("Parsing basic currency for %d currency codes", len(missing_codes))
+            with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+                basic_values.update(zip(missing_codes, executor.map(self.parse_basic_curr, missing_codes)))
+
+        res_currencies = [Currency(**elem, value=basic_values[elem['cur_code']]) for elem in country_curr]
+        if missing_codes and self.database:
+            self.database.insert_currencies(res_currencies, basic_date=basic_date)
         return res_currencies
 
     def parse_basic_curr(self, cur_code: int) -> float:
@@ -43,4 +58,3 @@ class JsonCurrParser:
         if not date_values:
             raise ValueError("There is no data on given basic currency date %s", self.basic_curr_date)
         return date_values[0].value
-
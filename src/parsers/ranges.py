@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+
+DateRange = tuple[datetime, datetime]
+
+ONE_DAY = timedelta(days=1)
+
+
+def merge_ranges(ranges: list[DateRange]) -> list[DateRange]:
+    """
+    Merge overlapping and adjacent date ranges.
+
+    :param ranges: list of inclusive (start, end) ranges
+    :return: sorted list of disjoint ranges
+    """
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + ONE_DAY:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def missing_ranges(start_date: datetime, end_date: datetime, covered: list[DateRange]) -> list[DateRange]:
+    """
+    Get sub-ranges of [start_date, end_date] that are not covered by given ranges.
+
+    :param start_date:
+    :param end_date:
+    :param covered: list of inclusive (start, end) ranges that are already covered
+    :return: sorted list of missing ranges
+    """
+    missing = []
+    current = start_date
+    for start, end in merge_ranges(covered):
+        if end < current:
+            continue
+        if start > end_date:
+            break
+        if start > current:
+            missing.append((current, start - ONE_DAY))
+        current = end + ONE_DAY
+    if current <= end_date:
+        missing.append((current, end_date))
+    return missing
+
+
+def split_range(start_date: datetime, end_date: datetime, chunk_days: int) -> list[DateRange]:
+    """
+    Split date range into consecutive chunks of at most chunk_days days.
+
+    :param start_date:
+    :param end_date:
+    :param chunk_days: max number of days in a chunk
+    :return: sorted list of chunks covering [start_date, end_date]
+    """
+    chunks = []
+    current = start_date
+    while current <= end_date:
+        chunk_end = min(current + timedelta(days=chunk_days - 1), end_date)
+        chunks.append((current, chunk_end))
+        current = chunk_end + ONE_DAY
+    return chunks
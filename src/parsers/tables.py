@@ -0,0 +1,102 @@
+import html
+import re
+from typing import Callable, Optional
+
+from bs4 import BeautifulSoup
+
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+Rows = list[list[str]]
+
+TABLE_RE = re.compile(rb"<table\b[^>]*?\bclass\s*=\s*(?:\"([^\"]*)\"|'([^']*)')[^>]*>", re.IGNORECASE)
+TABLE_END_RE = re.compile(rb"</table\s*>", re.IGNORECASE)
+ROW_RE = re.compile(rb"<tr\b", re.IGNORECASE)
+CELL_RE = re.compile(rb"<td\b[^>]*>(.*?)</td\s*>", re.IGNORECASE | re.DOTALL)
+TAG_RE = re.compile(rb"<[^>]*>")
+CHARSET_RE = re.compile(rb"charset\s*=\s*[\"']?([\w-]+)", re.IGNORECASE)
+
+
+def extract_table_bs4(content: bytes, table_class: str) -> Optional[Rows]:
+    """
+    Extract cell texts of the first table with the given class using BeautifulSoup.
+
+    :param content: page content
+    :param table_class: class of the table
+    :return: list of rows without the header row, each row is a list of stripped td texts,
+             or None if there is no such table
+    """
+    soup = BeautifulSoup(content, 'html.parser')
+    table = soup.find('table', class_=table_class)
+    if table is None:
+        return None
+    return [[column.text.strip() for column in row.find_all('td')] for row in table.find_all('tr')[1:]]
+
+
+def extract_table_lxml(content: bytes, table_class: str) -> Optional[Rows]:
+    """
+    Extract cell texts of the first table with the given class using lxml.
+
+    :param content: page content
+    :param table_class: class of the table
+    :return: list of rows without the header row, each row is a list of stripped td texts,
+             or None if there is no such table
+    """
+    tables = lxml.html.fromstring(content).xpath(
+        f"//table[contains(concat(' ', normalize-space(@class), ' '), ' {table_class} ')]")
+    if not tables:
+        return None
+    return [[column.text_content().strip() for column in row.xpath("./td")] for row in tables[0].xpath(".//tr")[1:]]
+
+
+def extract_table_stream(content: bytes, table_class: str) -> Optional[Rows]:
+    """
+    Extract cell texts of the first table with the given class by scanning only that table's markup.
+    Nested tables are not supported.
+
+    :param content: page content
+    :param table_class: class of the table
+    :return: list of rows without the header row, each row is a list of stripped td texts,
+             or None if there is no such table
+    """
+    charset = CHARSET_RE.search(content, 0, 4096)
+    encoding = charset.group(1).decode() if charset else "utf-8"
+    class_bytes = table_class.encode()
+    for table in TABLE_RE.finditer(content):
+        if class_bytes in (table.group(1) or table.group(2)).split():
+            break
+    else:
+        return None
+    table_end = TABLE_END_RE.search(content, table.end())
+    table_content = content[table.end():table_end.start() if table_end else len(content)]
+
+    rows = []
+    for row in ROW_RE.split(table_content)[2:]:
+        rows.append([html.unescape(TAG_RE.sub(b"", cell).decode(encoding, errors="replace")).strip()
+                     for cell in CELL_RE.findall(row)])
+    return rows
+
+
+BACKENDS: dict[str, Callable[[bytes, str], Optional[Rows]]] = {
+    "bs4": extract_table_bs4,
+    "stream": extract_table_stream,
+}
+if lxml is not None:
+    BACKENDS["lxml"] = extract_table_lxml
+
+
+def extract_table(content: bytes, table_class: str, backend: str = "stream") -> Optional[Rows]:
+    """
+    Extract cell texts of the first table with the given class using the given backend.
+
+    :param content: page content
+    :param table_class: class of the table
+    :param backend: bs4, stream or lxml if it is installed
+    :return: list of rows without the header row, each row is a list of stripped td texts,
+             or None if there is no such table
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown HTML parser backend {backend}, available: {', '.join(BACKENDS)}")
+    return BACKENDS[backend](content, table_class)
@@ -1,11 +1,55 @@
-from fastapi import FastAPI
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.exceptions import RequestValidationError
+from src.adapter.parsers import ParserAdapter
+from src.container import APP_CONTAINER
+from src.monitoring.metrics import request_seconds
+from src.monitoring.tracing import new_trace_id, trace_id
 from src.presentation.router import router, validation_exception_handler
+from src.settings import logging_config
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await asyncio.to_thread(ParserAdapter.initialize)
+    # Every worker tries to start the scheduler, only the first one to take its lock runs it
+    if APP_CONTAINER.app_settings().SCHEDULER_ENABLED and ParserAdapter().start_scheduler():
+        yield
+        ParserAdapter.stop_scheduler()
+    else:
+        yield
+
+
+async def trace_requests(request: Request, call_next):
+    """
+    Assign trace id to the request and record its duration by route.
+
+    :param request:
+    :param call_next: next handler
+    :return: response with X-Request-ID header
+    """
+    token = trace_id.set(request.headers.get("x-request-id") or new_trace_id())
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Request-ID"] = trace_id.get()
+        return response
+    finally:
+        route = request.scope.get("route")
+        request_seconds.observe(time.perf_counter() - started, request.method,
+                                route.path if route is not None else "unmatched", str(status))
+        trace_id.reset(token)
 
 
 def get_app() -> FastAPI:
-    app = FastAPI()
+    app = FastAPI(lifespan=lifespan)
     app.include_router(router)
     app.add_exception_handler(RequestValidationError, validation_exception_handler)
+    app.middleware("http")(trace_requests)
 
     return app
@@ -1,40 +1,64 @@
+import hashlib
+import inspect
 import logging
-
-from fastapi.exceptions import HTTPException
-from fastapi import APIRouter, Form, Request
-from fastapi.responses import HTMLResponse
+from datetime import datetime
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Awaitable, Callable, Optional, Union
+
+from fastapi.exception_handlers import request_validation_exception_handler
+from fastapi.exceptions import HTTPException, RequestValidationError
+from fastapi import APIRouter, Form, Query, Request
+from fastapi.responses import HTMLResponse, ORJSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.templating import Jinja2Templates
 
+from src.adapter.export import MEDIA_TYPES
 from src.adapter.parsers import ParserAdapter
+from src.models.job import FailureReport, Job, SchedulerStatus
+from src.monitoring.metrics import Gauge, registry, timed
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
-templates = Jinja2Templates(directory='templates')
 
 
-async def validation_exception_handler(request: Request, exc: HTTPException) -> templates.TemplateResponse:
+class TimedTemplates(Jinja2Templates):
+    def TemplateResponse(self, *args, **kwargs):
+        # The template is rendered when the response is created
+        with timed("render"):
+            return super().TemplateResponse(*args, **kwargs)
+
+
+templates = TimedTemplates(directory='templates')
+registry.register(Gauge("currency_parser_db_cache", "Metrics of the DB read cache", ["metric"],
+                        lambda: {(name,): value for name, value in ParserAdapter().get_cache_stats().items()
+                                 if value is not None}))
+
+
+async def validation_exception_handler(request: Request, exc: RequestValidationError) -> Response:
     url = request.url.path
     logger.info("Ошибка валидации данных по url %s", url)
     if url == "/chart":
         parser_adapter = ParserAdapter()
-        countries = parser_adapter.get_all_countries()
+        countries = await parser_adapter.get_all_countries()
         return templates.TemplateResponse('index.html', {'request': request, 'countries': countries,
                                                          'error': "Некорректный запрос"})
     elif url == "/parser":
         return templates.TemplateResponse('parser.html', {'request': request,
                                                           'error': "Некорректный запрос"})
+    # JSON API answers with the default 422 response
+    return await request_validation_exception_handler(request, exc)
 
 
 @router.post('/parser', response_class=HTMLResponse)
 async def parse(request: Request, start_date: str = Form(), end_date: str = Form()):
     try:
         parser_adapter = ParserAdapter()
-        parser_adapter.parse(start_date=start_date, end_date=end_date)
-        logger.info("Спаршены данные с %s по %s", start_date, end_date)
+        job = await parser_adapter.enqueue_parse(start_date=start_date, end_date=end_date)
+        logger.info("Поставлен в очередь парсинг данных с %s по %s, задача %s", start_date, end_date, job.id)
 
         return templates.TemplateResponse('parser.html',
-                                          {'request': request, 'success': 'Данные были спарсены успешно'})
+                                          {'request': request, 'job_id': job.id,
+                                           'success': 'Парсинг данных поставлен в очередь'})
     except ValueError as e:
         logger.info("Ошибка парсинга данных с %s по %s", start_date, end_date)
         return templates.TemplateResponse('parser.html', {'request': request, 'error': str(e)})
@@ -45,15 +69,37 @@ async def parser_page(request: Request):
     return templates.TemplateResponse('parser.html', {'request': request})
 
 
+@router.get('/jobs/{job_id}', response_model=Job)
+async def get_job(job_id: str):
+    job = await ParserAdapter().get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+    return job
+
+
+@router.get('/failures', response_model=FailureReport)
+async def failure_report():
+    return await ParserAdapter().get_failure_report()
+
+
+@router.get('/scheduler', response_model=SchedulerStatus)
+async def scheduler_status():
+    return await ParserAdapter().get_scheduler_status()
+
+
 @router.post('/chart', response_class=HTMLResponse)
-async def chart(request: Request, start_date: str = Form(), end_date: str = Form()):
+async def chart(request: Request, start_date: str = Form(), end_date: str = Form(), forward_fill: bool = Form(False),
+                resolution: str = Form("day"), aggregation: str = Form("mean"),
+                max_points: Optional[int] = Form(None), base_date: Optional[str] = Form(None)):
     form_data = await request.form()
     input_countries = form_data.getlist('input_country')
 
     parser_adapter = ParserAdapter()
-    countries = parser_adapter.get_all_countries()
+    countries = await parser_adapter.get_all_countries()
     try:
-        data = parser_adapter.get_data_values(input_countries, start_date, end_date)
+        data = await parser_adapter.get_data_values(input_countries, start_date, end_date, forward_fill=forward_fill,
+                                                    resolution=resolution, aggregation=aggregation,
+                                                    max_points=max_points, base_date=base_date)
     except ValueError as e:
         logger.info("Ошибка построения графика для данных с %s по %s", start_date, end_date)
         return templates.TemplateResponse('index.html', {'request': request, 'countries': countries, 'error': str(e)})
@@ -68,7 +114,131 @@ async def chart(request: Request, start_date: str = Form(), end_date: str = Form
 @router.get('/', response_class=HTMLResponse)
 async def main(request: Request):
     parser_adapter = ParserAdapter()
-    countries = parser_adapter.get_all_countries()
+    countries = await parser_adapter.get_all_countries()
     return templates.TemplateResponse('index.html',
                                       {'request': request,
                                        'countries': countries})
+
+
+async def conditional_json(request: Request, last_modified: datetime,
+                           content: Callable[[], Union[object, Awaitable[object]]]) -> Response:
+    """
+    Build JSON response with ETag and Last-Modified headers or an empty 304 response
+    if the client already has the current version.
+
+    :param request:
+    :param last_modified: time of the last change of stored data
+    :param content: function or coroutine function that builds response content
+    :return: Response object
+    """
+    etag = '"' + hashlib.sha1(f"{last_modified.isoformat()} {request.url}".encode()).hexdigest() + '"'
+    last_modified = last_modified.replace(microsecond=0)
+    headers = {"ETag": etag, "Last-Modified": format_datetime(last_modified, usegmt=True), "Cache-Control": "no-cache"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_none_match is not None:
+        not_modified = etag in [el.strip().removeprefix("W/") for el in if_none_match.split(",")]
+    elif if_modified_since is not None:
+        try:
+            not_modified = last_modified <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            not_modified = False
+    else:
+        not_modified = False
+
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+    content = content()
+    if inspect.isawaitable(content):
+        content = await content
+    return ORJSONResponse(content, headers=headers)
+
+
+def series_content(series_name: str, series) -> dict:
+    return {"name": series_name, "dates": series.dates, "values": series.values.tolist()}
+
+
+@router.get('/metrics', response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@router.get('/api/cache')
+async def api_cache_stats():
+    return ParserAdapter().get_cache_stats()
+
+
+@router.get('/api/countries')
+async def api_countries(request: Request):
+    parser_adapter = ParserAdapter()
+
+    async def content():
+        return [{"name": name, "currency": currency}
+                for name, currency in await parser_adapter.get_countries_with_currencies()]
+    return await conditional_json(request, await parser_adapter.get_last_modified(), content)
+
+
+@router.get('/api/currencies')
+async def api_currencies(request: Request):
+    parser_adapter = ParserAdapter()
+
+    async def content():
+        return [currency.model_dump() for currency in await parser_adapter.get_currencies()]
+    return await conditional_json(request, await parser_adapter.get_last_modified(), content)
+
+
+@router.get('/api/series/currency/{currency}')
+async def api_currency_series(request: Request, currency: str, start_date: str, end_date: str,
+                              base_date: Optional[str] = None):
+    parser_adapter = ParserAdapter()
+
+    async def content():
+        try:
+            series = await parser_adapter.get_currency_series(currency, start_date, end_date, base_date)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return series_content(currency, series)
+    return await conditional_json(request, await parser_adapter.get_last_modified(), content)
+
+
+@router.get('/api/series/country/{country}')
+async def api_country_series(request: Request, country: str, start_date: str, end_date: str,
+                             base_date: Optional[str] = None):
+    parser_adapter = ParserAdapter()
+
+    async def content():
+        try:
+            series = await parser_adapter.get_country_series(country, start_date, end_date, base_date)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return series_content(country, series)
+    return await conditional_json(request, await parser_adapter.get_last_modified(), content)
+
+
+@router.get('/api/stats/currency/{currency}')
+async def api_currency_stats(request: Request, currency: str, start_date: str, end_date: str, period: str = "month",
+                             base_date: Optional[str] = None):
+    parser_adapter = ParserAdapter()
+
+    async def content():
+        try:
+            rollups = await parser_adapter.get_currency_stats(currency, start_date, end_date, period, base_date)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return {"name": currency, "period": period, "stats": rollups}
+    return await conditional_json(request, await parser_adapter.get_last_modified(), content)
+
+
+@router.get('/api/export')
+async def api_export(currency: list[str] = Query([]), country: list[str] = Query([]),
+                     start_date: Optional[str] = None, end_date: Optional[str] = None, format: str = "csv"):
+    parser_adapter = ParserAdapter()
+    try:
+        export_format, content = await parser_adapter.export_values(currency, country, start_date, end_date, format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # The sync iterator is consumed in the threadpool, rows are read while the response is being sent
+    return StreamingResponse(content, media_type=MEDIA_TYPES[export_format],
+                             headers={"Content-Disposition":
+                                      f'attachment; filename="currency_values.{export_format.value}"'})
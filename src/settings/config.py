@@ -6,8 +6,41 @@ class Settings(BaseSettings):
 
     APP_HOST: str = "localhost"
     APP_PORT: int = 8000
+    LOG_LEVEL: str = "DEBUG"
     CURR_CONFIG: str
     BASIC_CURR_DATE: str
 
+    FINMARKET_URL: str = "https://www.finmarket.ru/currency/rates/"
+    IBAN_URL: str = "https://www.iban.ru/currency-codes"
+    SCRAPER_MAX_CONCURRENCY: int = 8
+    SCRAPER_RATE_LIMIT: float = 4.0
+    SCRAPER_CHUNK_DAYS: int = 365
+    SCRAPER_CONNECT_TIMEOUT: float = 5
+    SCRAPER_READ_TIMEOUT: float = 30
+    SCRAPER_RETRIES: int = 3
+    SCRAPER_BACKOFF: float = 0.5
+    SCRAPER_MAX_BACKOFF: float = 30
+    SCRAPER_BREAKER_THRESHOLD: int = 5
+    SCRAPER_BREAKER_COOLDOWN: float = 30
+    HTML_PARSER_BACKEND: str = "stream"
+    HTTP_CACHE_ENABLED: bool = True
+    HTTP_CACHE_DIR: str = ".http_cache"
+    HTTP_CACHE_MAX_AGE_RATES: float = 0
+    HTTP_CACHE_MAX_AGE_COUNTRIES: float = 0
+    JOB_WORKERS: int = 1
+    CHART_MAX_POINTS: int = 1000
+    WORKERS: int = 1
+    DB_PATH: str = "database.db"
+    DB_CACHE_SIZE: int = 256
+    DB_CACHE_TTL: float = 300
+    DB_CACHE_VERSION_INTERVAL: float = 1.0
+    DB_READ_WORKERS: int = 4
+    DB_SERIES_BACKEND: str = "sqlite"
+    SCHEDULER_ENABLED: bool = False
+    SCHEDULER_TIME: str = "10:00"
+    SCHEDULER_LOOKBACK_DAYS: int = 7
+    SCHEDULER_RETRIES: int = 5
+    SCHEDULER_BACKOFF: float = 60
+
 
 settings = Settings()
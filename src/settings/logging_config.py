@@ -1,11 +1,18 @@
 import logging.config
 
+from src.settings.config import settings
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
+    "filters": {
+        "trace_id": {
+            "()": "src.monitoring.tracing.TraceIdFilter",
+        }
+    },
     "formatters": {
         "standard": {
-            "format": "%(asctime)s \t %(levelname)s \t %(message)s \t %(funcName)s"
+            "format": "%(asctime)s \t %(levelname)s \t %(trace_id)s \t %(message)s \t %(funcName)s"
         }
     },
     "handlers": {
@@ -13,9 +20,15 @@ LOGGING = {
             "class": "logging.StreamHandler",
             "stream": "ext://sys.stdout",
             "formatter": "standard",
+            "filters": ["trace_id"],
         }
     },
-    "loggers": {"": {"handlers": ["stdout"], "level": "DEBUG"}},
+    "loggers": {
+        "": {"handlers": ["stdout"], "level": settings.LOG_LEVEL},
+        # Connection and form field level tracing of every request is too verbose even for debugging
+        "httpcore": {"level": "INFO"},
+        "multipart": {"level": "INFO"},
+    },
 }
 
 
@@ -0,0 +1,78 @@
+from typing import Callable
+
+import httpx
+import pytest
+from dependency_injector.providers import Object
+
+from benchmarks.upstream import render
+from src.container import APP_CONTAINER
+from src.database.sqlite import Database
+from src.models.country_curr import Currency
+from src.parsers import http
+from src.parsers.http import CircuitBreaker
+from src.parsers.http_cache import HttpCache
+
+CURRENCIES = [Currency(ru_name="Доллар США", en_name="USD", cur_code=840, value=70.0),
+              Currency(ru_name="Евро", en_name="EUR", cur_code=978, value=80.0)]
+COUNTRIES = {"USD": ["США", "Эквадор"], "EUR": ["Германия"]}
+
+
+def value_rows(db: Database, currency: str, values: dict[str, float]) -> list[tuple[int, float, float, str]]:
+    cur_id = db.get_currency_ids()[currency]
+    basic_value = next(el.value for el in CURRENCIES if el.en_name == currency)
+    return [(cur_id, value, round(value - basic_value, 4), day) for day, value in values.items()]
+
+
+@pytest.fixture
+def db(tmp_path) -> Database:
+    database = Database(str(tmp_path / "test.db"), batch_size=2)
+    database.insert_currencies(CURRENCIES, "2022-04-22")
+    database.insert_countries(COUNTRIES)
+    database.bulk_insert_curr_values(value_rows(database, "USD", {"2024-01-30": 90.0, "2024-01-31": 91.0,
+                                                                  "2024-02-01": 92.0}))
+    database.bulk_insert_curr_values(value_rows(database, "EUR", {"2024-01-31": 98.0, "2024-02-02": 99.0}))
+    yield database
+    database.close()
+
+
+@pytest.fixture
+def app_db(db) -> Database:
+    APP_CONTAINER.database.override(Object(db))
+    yield db
+    APP_CONTAINER.database.reset_override()
+
+
+def mock_upstream(monkeypatch, tmp_path, handler: Callable[[httpx.Request], httpx.Response]):
+    """
+    Answer requests of AsyncFetcher with the handler instead of the network, with a fresh circuit breaker
+    and HTTP cache.
+
+    :param handler: function returning the response to the request
+    :return: None
+    """
+    client_class = httpx.AsyncClient
+    monkeypatch.setattr(httpx, "AsyncClient",
+                        lambda **kwargs: client_class(transport=httpx.MockTransport(handler), **kwargs))
+    monkeypatch.setattr(http, "circuit_breaker", CircuitBreaker())
+    monkeypatch.setattr(http, "http_cache", HttpCache(str(tmp_path / "http_cache")))
+
+
+def upstream_page(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, content=render(request.url.path, request.url.query.decode(), "currencies.json", 2))
+
+
+@pytest.fixture
+def upstream(monkeypatch, tmp_path) -> list[httpx.URL]:
+    """
+    Answer requests of AsyncFetcher with pages of benchmarks.fixtures instead of the network.
+
+    :return: list of requested urls
+    """
+    requested = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requested.append(request.url)
+        return upstream_page(request)
+
+    mock_upstream(monkeypatch, tmp_path, handler)
+    return requested
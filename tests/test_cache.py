@@ -0,0 +1,113 @@
+import pytest
+
+from src.database import cache as cache_module
+from src.database.cache import ReadCache
+from src.database.sqlite import Database
+from tests.conftest import value_rows
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(cache_module, "time", clock)
+    return clock
+
+
+def test_data_version_is_checked_once_per_interval(clock):
+    versions = []
+    version = 1
+
+    def data_version():
+        versions.append(version)
+        return version
+
+    cache = ReadCache(ttl=60, data_version=data_version, version_interval=1)
+    assert cache.get_or_load("key", {"tag"}, lambda: "old") == "old"
+    version = 2
+    clock.now += 0.5
+    assert cache.get_or_load("key", {"tag"}, lambda: "new") == "old"
+    assert cache.get_or_load("other", {"tag"}, lambda: "other") == "other"
+    assert versions == [1]
+
+    clock.now += 0.5
+    assert cache.get_or_load("key", {"tag"}, lambda: "new") == "new"
+    assert versions == [1, 2]
+
+
+def test_zero_interval_checks_every_lookup(clock):
+    versions = []
+    cache = ReadCache(data_version=lambda: versions.append(1) or len(versions), version_interval=0)
+    for _ in range(3):
+        cache.get_or_load("key", set(), lambda: None)
+    assert versions == [1, 1, 1]
+
+
+def test_write_of_other_process_is_seen_after_interval(clock, db):
+    currency_ids = sorted(db.get_currency_ids().values())
+    assert len(db.get_series(currency_ids, "2024-01-01", "2024-12-31")[currency_ids[0]]) == 3
+
+    other = Database(db.path)
+    other.bulk_insert_curr_values([(currency_ids[0], 1.0, 1.0, "2024-03-01")])
+    other.close()
+    assert len(db.get_series(currency_ids, "2024-01-01", "2024-12-31")[currency_ids[0]]) == 3
+    clock.now += db.cache.version_interval
+    assert len(db.get_series(currency_ids, "2024-01-01", "2024-12-31")[currency_ids[0]]) == 4
+
+
+def test_entries_are_invalidated_by_tags(clock):
+    cache = ReadCache()
+    cache.get_or_load("usd", {"curr_value:1"}, lambda: "usd")
+    cache.get_or_load("countries", {"countries", "currencies"}, lambda: "countries")
+    cache.invalidate({"currencies"})
+    assert cache.get_or_load("countries", set(), lambda: "reloaded") == "reloaded"
+    assert cache.get_or_load("usd", set(), lambda: "reloaded") == "usd"
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = ReadCache(max_size=2)
+    cache.get_or_load("a", set(), lambda: "a")
+    cache.get_or_load("b", set(), lambda: "b")
+    cache.get_or_load("a", set(), lambda: "a2")
+    cache.get_or_load("c", set(), lambda: "c")
+    assert cache.get_or_load("a", set(), lambda: "a3") == "a"
+    assert cache.get_or_load("b", set(), lambda: "b2") == "b2"
+    assert cache.stats()["evictions"] == 2
+
+
+def test_expired_entry_is_reloaded(clock):
+    cache = ReadCache(ttl=10)
+    cache.get_or_load("key", set(), lambda: "old")
+    clock.now += 10
+    assert cache.get_or_load("key", set(), lambda: "new") == "new"
+
+
+def test_value_loaded_during_invalidation_is_not_stored(clock):
+    cache = ReadCache()
+
+    def load():
+        cache.invalidate({"tag"})
+        return "stale"
+
+    assert cache.get_or_load("key", {"tag"}, load) == "stale"
+    assert cache.get_or_load("key", {"tag"}, lambda: "fresh") == "fresh"
+
+
+def test_database_writes_invalidate_cached_reads(db):
+    ids = db.get_currency_ids()
+    assert set(db.get_all_countries()) == {"США", "Эквадор", "Германия"}
+    db.insert_countries({"EUR": ["Франция"]})
+    assert "Франция" in db.get_all_countries()
+
+    series = db.get_series([ids["USD"], ids["EUR"]], "2024-01-01", "2024-12-31")
+    db.bulk_insert_curr_values(value_rows(db, "EUR", {"2024-03-01": 100.0}))
+    assert db.get_series([ids["USD"], ids["EUR"]], "2024-01-01", "2024-12-31")[ids["EUR"]].dates[-1] == "2024-03-01"
+    assert db.get_series([ids["USD"]], "2024-01-01", "2024-12-31")[ids["USD"]] == series[ids["USD"]]
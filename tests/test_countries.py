@@ -0,0 +1,72 @@
+import asyncio
+import hashlib
+
+import httpx
+import pytest
+import requests
+from dependency_injector.providers import Object
+from requests.structures import CaseInsensitiveDict
+
+from benchmarks.fixtures import iban_page
+from benchmarks.upstream import IBAN_PATH
+from src.adapter.parsers import ParserAdapter
+from src.container import APP_CONTAINER
+from src.database.locks import FileLock
+from src.parsers import http
+from src.parsers.countries import CountryParser
+from src.parsers.currency import CurrencyParser
+from tests.conftest import CURRENCIES, mock_upstream, upstream_page
+
+
+@pytest.fixture
+def iban(app_db, monkeypatch, tmp_path) -> dict:
+    """
+    Answer requests of the countries page with a page of the given number of countries per currency,
+    conditional requests of an unchanged page are answered with 304.
+
+    :return: dictionary with countries_per_currency to serve and statuses of answered requests
+    """
+    mock_upstream(monkeypatch, tmp_path, upstream_page)
+    state = {"countries_per_currency": 1, "statuses": []}
+
+    def get(url: str, headers: dict, **kwargs) -> requests.Response:
+        assert httpx.URL(url).path == IBAN_PATH
+        content = iban_page("currencies.json", state["countries_per_currency"])
+        etag = '"' + hashlib.sha1(content).hexdigest() + '"'
+        response = requests.Response()
+        response.status_code = 304 if headers.get("If-None-Match") == etag else 200
+        response.headers = CaseInsensitiveDict({"ETag": etag})
+        response._content = content if response.status_code == 200 else b""
+        state["statuses"].append(response.status_code)
+        return response
+
+    monkeypatch.setattr(http.requests, "get", get)
+    APP_CONTAINER.country_parser.override(Object(CountryParser(CURRENCIES)))
+    APP_CONTAINER.currency_parser.override(Object(CurrencyParser(CURRENCIES)))
+    APP_CONTAINER.ingest_lock.override(Object(FileLock(str(tmp_path / "ingest.lock"))))
+    yield state
+    for provider in (APP_CONTAINER.country_parser, APP_CONTAINER.currency_parser, APP_CONTAINER.ingest_lock):
+        provider.reset_override()
+
+
+def test_countries_are_revalidated_by_every_parse(iban, monkeypatch):
+    parsed = []
+    parse_table = CountryParser._parse_table
+
+    def count_parses(self, content: bytes) -> dict[str, list[str]]:
+        parsed.append(content)
+        return parse_table(self, content)
+    monkeypatch.setattr(CountryParser, "_parse_table", count_parses)
+
+    def countries() -> set[str]:
+        parser_adapter = ParserAdapter()
+        asyncio.run(parser_adapter.parse("2024-01-01", "2024-01-31"))
+        return set(asyncio.run(parser_adapter.get_all_countries()))
+
+    assert "Страна 0-0 & острова" in countries()
+    assert "Страна 0-1 & острова" not in countries()
+    assert iban["statuses"] == [200, 304] and len(parsed) == 1
+
+    iban["countries_per_currency"] = 2
+    assert "Страна 0-1 & острова" in countries()
+    assert iban["statuses"][-1] == 200 and len(parsed) == 2
@@ -0,0 +1,33 @@
+import asyncio
+from datetime import datetime
+
+from benchmarks.fixtures import rate
+from src.parsers.currency import CurrencyParser
+from tests.conftest import CURRENCIES
+from tests.test_ranges import date_range, day
+
+
+async def collect(parser: CurrencyParser, *args, **kwargs) -> list:
+    return [chunk async for chunk in parser.iter_chunks(*args, **kwargs)]
+
+
+def test_plan_splits_missing_ranges_into_chunks():
+    parser = CurrencyParser(CURRENCIES, chunk_days=10)
+    coverage = {"USD": [date_range("2024-01-05", "2024-01-20")]}
+    plan = parser.plan_chunks(day("2024-01-01"), day("2024-01-25"), coverage)
+    assert [(currency.en_name, chunk) for currency, chunk in plan] == [
+        ("USD", date_range("2024-01-01", "2024-01-04")), ("USD", date_range("2024-01-21", "2024-01-25")),
+        ("EUR", date_range("2024-01-01", "2024-01-10")), ("EUR", date_range("2024-01-11", "2024-01-20")),
+        ("EUR", date_range("2024-01-21", "2024-01-25"))]
+
+
+def test_long_range_is_scraped_in_chunks(upstream):
+    parser = CurrencyParser(CURRENCIES, max_concurrency=4, chunk_days=365)
+    chunks = asyncio.run(collect(parser, day("2021-01-01"), day("2023-12-31")))
+    assert len(upstream) == len(chunks) == 6
+    for currency in CURRENCIES:
+        values = sorted((value for chunk, _ in chunks if chunk.currency == currency for value in chunk.values),
+                        key=lambda el: el.date)
+        assert values[0].date == datetime(2021, 1, 1) and values[-1].date == datetime(2023, 12, 29)
+        assert len(values) == len({el.date for el in values})
+        assert all(el.value == rate(currency.cur_code, el.date) for el in values)
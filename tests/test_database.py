@@ -0,0 +1,73 @@
+import asyncio
+import sqlite3
+import threading
+
+import pytest
+
+from tests.conftest import value_rows
+
+
+def stored_values(db) -> list[tuple]:
+    conn = sqlite3.connect(db.path)
+    rows = conn.execute("SELECT cur_id, value, relative_value, datetime FROM curr_value ORDER BY cur_id, datetime")
+    rows = rows.fetchall()
+    conn.close()
+    return rows
+
+
+def test_bulk_insert_writes_all_batches(db):
+    usd = db.get_currency_ids()["USD"]
+    rows = value_rows(db, "USD", {f"2023-03-{day:02d}": float(day) for day in range(1, 8)})
+    assert db.bulk_insert_curr_values(iter(rows)) == 7
+    assert [row for row in stored_values(db) if row[3].startswith("2023")] == rows
+    assert all(row[0] == usd for row in rows)
+
+
+def test_bulk_insert_updates_changed_values_only(db):
+    last_modified = db.get_last_modified()
+    db.bulk_insert_curr_values(value_rows(db, "USD", {"2024-01-30": 90.0, "2024-01-31": 91.0}))
+    assert db.get_last_modified() == last_modified
+
+    db.bulk_insert_curr_values(value_rows(db, "USD", {"2024-01-31": 91.5}))
+    assert db.get_last_modified() > last_modified
+    usd = db.get_currency_ids()["USD"]
+    assert (usd, 91.5, 21.5, "2024-01-31") in stored_values(db)
+
+
+def test_series_of_countries_share_currency(db):
+    country_currencies, series = db.get_series_for_countries(["США", "Эквадор", "Германия"], "2024-01-31",
+                                                             "2024-12-31")
+    ids = db.get_currency_ids()
+    assert country_currencies == {"США": ids["USD"], "Эквадор": ids["USD"], "Германия": ids["EUR"]}
+    assert set(series) == {ids["USD"], ids["EUR"]}
+    assert series[ids["USD"]].dates == ["2024-01-31", "2024-02-01"]
+    assert list(series[ids["EUR"]].values) == [98.0, 99.0]
+
+
+def test_series_without_values_in_range_is_empty(db):
+    usd = db.get_currency_ids()["USD"]
+    assert len(db.get_series([usd], "2020-01-01", "2020-12-31")[usd]) == 0
+
+
+def test_reads_and_writes_run_off_event_loop(db):
+    async def run():
+        read_thread = await db.read(lambda: threading.current_thread().name)
+        write_thread = await db.write(lambda: threading.current_thread().name)
+        return read_thread, write_thread
+    read_thread, write_thread = asyncio.run(run())
+    assert read_thread.startswith("db-read")
+    assert write_thread.startswith("db-write")
+
+
+def test_reader_connection_is_read_only(db):
+    with pytest.raises(sqlite3.OperationalError):
+        db.conn.execute("DELETE FROM curr_value")
+
+
+def test_readers_see_last_committed_data_during_write(db):
+    cur_id = db.get_currency_ids()["USD"]
+    count = "SELECT COUNT(*) FROM curr_value WHERE cur_id = ?"
+    with db.writer() as con:
+        con.execute("DELETE FROM curr_value WHERE cur_id = ?", (cur_id,))
+        assert db.conn.execute(count, (cur_id,)).fetchone()[0] == 3
+    assert db.conn.execute(count, (cur_id,)).fetchone()[0] == 0
@@ -0,0 +1,67 @@
+import io
+
+import pytest
+from dependency_injector.providers import Object
+from fastapi.testclient import TestClient
+
+from src.adapter.export import ExportFormat, get_format, read_csv, read_parquet, write_csv, write_parquet
+from src.adapter.parsers import ParserAdapter
+from src.container import APP_CONTAINER
+from src.database.sqlite import Database
+from src.presentation.app import get_app
+from tests.conftest import CURRENCIES
+
+EXPORTED = [("USD", "2024-01-30", 90.0), ("USD", "2024-01-31", 91.0), ("USD", "2024-02-01", 92.0),
+            ("EUR", "2024-01-31", 98.0), ("EUR", "2024-02-02", 99.0)]
+
+
+@pytest.mark.parametrize("path, expected", [("values.csv", ExportFormat.csv), ("VALUES.PARQUET", ExportFormat.parquet),
+                                            ("values.txt", ExportFormat.csv)])
+def test_format_is_guessed_by_extension(path, expected):
+    assert ExportFormat.from_path(path) == expected
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError, match="Неизвестный формат"):
+        get_format("xlsx")
+
+
+def test_csv_is_written_in_batches():
+    rows = [("USD", f"2024-01-0{day}", 90.0 + day, 20.0 + day) for day in range(1, 6)]
+    chunks = list(write_csv(rows, batch_size=2))
+    assert len(chunks) == 3
+    assert list(read_csv(io.BytesIO(b"".join(chunks)))) == [row[:3] for row in rows]
+
+
+def test_csv_without_columns_is_rejected():
+    with pytest.raises(ValueError, match="нет столбцов value"):
+        list(read_csv(io.BytesIO(b"currency,date\nUSD,2024-01-01\n")))
+
+
+def test_export_import_round_trip(app_db, tmp_path):
+    response = TestClient(get_app()).get("/api/export?start_date=2024-01-01&end_date=2024-02-29")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    exported = response.content
+    assert list(read_csv(io.BytesIO(exported))) == EXPORTED
+
+    database = Database(str(tmp_path / "import.db"), batch_size=2)
+    database.insert_currencies(CURRENCIES, "2022-04-22")
+    APP_CONTAINER.database.override(Object(database))
+    try:
+        assert ParserAdapter().import_values(io.BytesIO(exported)) == len(EXPORTED)
+    finally:
+        APP_CONTAINER.database.override(Object(app_db))
+    usd = database.get_series([database.get_currency_ids()["USD"]], "2024-01-01", "2024-02-29")
+    assert list(usd.popitem()[1].values) == [90.0, 91.0, 92.0]
+    # Days between imported rows may be missing, so they are scraped again
+    assert database.get_coverage() == {}
+    database.close()
+
+
+def test_parquet_round_trip():
+    pytest.importorskip("pyarrow")
+    # Relative values are not imported
+    rows = [row + (0.0,) for row in EXPORTED]
+    content = b"".join(write_parquet(rows, batch_size=2))
+    assert list(read_parquet(io.BytesIO(content))) == EXPORTED
@@ -0,0 +1,83 @@
+import asyncio
+from datetime import datetime
+
+import httpx
+import pytest
+from dependency_injector.providers import Object
+
+from src.adapter.parsers import ParserAdapter
+from src.container import APP_CONTAINER
+from src.models.job import ScrapeFailure
+from src.parsers.countries import CountryParser
+from src.parsers.currency import CurrencyParser
+from tests.conftest import CURRENCIES, mock_upstream, upstream_page
+from tests.test_currency_parser import collect
+from tests.test_ranges import day
+
+
+def failure(target: str, start_date: str, end_date: str) -> ScrapeFailure:
+    return ScrapeFailure(target=target, start_date=start_date, end_date=end_date, error="ReadTimeout()",
+                         failed_at=datetime.now())
+
+
+@pytest.fixture
+def eur_unavailable(monkeypatch, tmp_path):
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(404) if request.url.params["cur"] == "978" else upstream_page(request)
+
+    mock_upstream(monkeypatch, tmp_path, handler)
+
+
+def test_failed_chunks_are_recorded(eur_unavailable):
+    parser = CurrencyParser(CURRENCIES, chunk_days=365)
+    failures = []
+    chunks = asyncio.run(collect(parser, day("2022-01-01"), day("2023-12-31"), failures=failures))
+    assert {chunk.currency.en_name for chunk, _ in chunks} == {"USD"}
+    assert sorted((el.target, el.start_date, el.end_date) for el in failures) == [
+        ("EUR", "2022-01-01", "2022-12-31"), ("EUR", "2023-01-01", "2023-12-31")]
+
+
+def test_first_failure_is_raised_without_list(eur_unavailable):
+    parser = CurrencyParser(CURRENCIES, chunk_days=365)
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(collect(parser, day("2022-01-01"), day("2023-12-31")))
+
+
+@pytest.fixture
+def country_parser():
+    APP_CONTAINER.country_parser.override(Object(CountryParser(CURRENCIES)))
+    yield
+    APP_CONTAINER.country_parser.reset_override()
+
+
+def test_failure_report_keeps_missing_ranges(app_db, country_parser):
+    parser_adapter = ParserAdapter()
+    parser_adapter.save_failures([failure("USD", "2024-01-01", "2024-01-31"),
+                                  failure("EUR", "2024-01-01", "2024-01-31")])
+    assert len(asyncio.run(parser_adapter.get_failure_report()).failures) == 2
+
+    # A failure of the next parse replaces the earlier one, scraped ranges are dropped
+    app_db.add_coverage("USD", day("2024-01-01"), day("2024-01-31"))
+    parser_adapter.save_failures([failure("EUR", "2024-01-01", "2024-01-31")])
+    report = asyncio.run(parser_adapter.get_failure_report())
+    assert [(el.target, el.start_date) for el in report.failures] == [("EUR", "2024-01-01")]
+
+    app_db.add_coverage("EUR", day("2024-01-01"), day("2024-01-31"))
+    parser_adapter.save_failures([])
+    assert not asyncio.run(parser_adapter.get_failure_report()).failures
+
+
+def test_page_without_rates_is_requested_again(monkeypatch, tmp_path):
+    requested = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requested.append(request.url)
+        return httpx.Response(200, content=b"<html>Technical maintenance</html>")
+
+    mock_upstream(monkeypatch, tmp_path, handler)
+    parser = CurrencyParser(CURRENCIES[:1], chunk_days=365)
+    for _ in range(3):
+        failures = []
+        assert not asyncio.run(collect(parser, day("2022-01-01"), day("2022-12-31"), failures=failures))
+        assert "no rates table" in failures[0].error
+    assert len(requested) == 3
@@ -0,0 +1,143 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from src.parsers import http
+from src.parsers.http import AsyncFetcher, CircuitBreaker, CircuitOpenError, HostRateLimiter
+from src.parsers.http_cache import HttpCache
+from src.settings.config import settings
+
+URL = "https://upstream.test/rates"
+HOST = "upstream.test"
+
+
+@pytest.fixture
+def breaker(monkeypatch, tmp_path) -> CircuitBreaker:
+    breaker = CircuitBreaker(threshold=2, cooldown=0)
+    monkeypatch.setattr(http, "circuit_breaker", breaker)
+    monkeypatch.setattr(http, "http_cache", HttpCache(str(tmp_path)))
+    monkeypatch.setattr(settings, "SCRAPER_RETRIES", 0)
+    return breaker
+
+
+def open_circuit(breaker: CircuitBreaker):
+    for _ in range(breaker.threshold):
+        breaker.failure(HOST)
+
+
+async def get(handler, url: str = URL) -> bytes:
+    async with AsyncFetcher() as fetcher:
+        fetcher._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        return await fetcher.get(url)
+
+
+def test_breaker_opens_after_threshold():
+    breaker = CircuitBreaker(threshold=2, cooldown=60)
+    breaker.failure(HOST)
+    assert breaker.check(HOST) is False
+    breaker.failure(HOST)
+    with pytest.raises(CircuitOpenError):
+        breaker.check(HOST)
+
+
+def test_breaker_lets_one_trial_through(breaker):
+    open_circuit(breaker)
+    assert breaker.check(HOST) is True
+    with pytest.raises(CircuitOpenError):
+        breaker.check(HOST)
+    breaker.success(HOST)
+    assert breaker.check(HOST) is False
+
+
+def test_released_trial_lets_next_trial_through(breaker):
+    open_circuit(breaker)
+    assert breaker.check(HOST) is True
+    breaker.release(HOST)
+    assert breaker.check(HOST) is True
+
+
+def test_cancelled_trial_request_releases_circuit(breaker):
+    open_circuit(breaker)
+
+    async def run():
+        started = asyncio.Event()
+
+        async def handler(request):
+            started.set()
+            await asyncio.sleep(60)
+
+        task = asyncio.create_task(get(handler))
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert breaker.check(HOST) is True
+
+
+def test_trial_request_with_unexpected_error_releases_circuit(breaker):
+    open_circuit(breaker)
+
+    def handler(request):
+        raise RuntimeError("broken response")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(get(handler))
+    assert breaker.check(HOST) is True
+
+
+def test_successful_trial_closes_circuit(breaker):
+    open_circuit(breaker)
+    assert asyncio.run(get(lambda request: httpx.Response(200, content=b"rates"))) == b"rates"
+    assert breaker.check(HOST) is False
+
+
+def test_retry_status_is_a_failure(breaker):
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(get(lambda request: httpx.Response(503)))
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(get(lambda request: httpx.Response(503)))
+    assert breaker._opened_at.keys() == {HOST}
+
+
+def test_not_modified_response_uses_cached_body(breaker):
+    http.http_cache.update(URL, 200, httpx.Headers({"ETag": '"v1"'}), b"cached rates", 0)
+
+    def handler(request):
+        assert request.headers["If-None-Match"] == '"v1"'
+        return httpx.Response(304)
+
+    assert asyncio.run(get(handler)) == b"cached rates"
+
+
+def test_fetcher_limits_requests_in_flight(breaker):
+    in_flight, peak = 0, 0
+
+    async def handler(request):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return httpx.Response(200, content=request.url.path.encode())
+
+    async def run():
+        async with AsyncFetcher(max_concurrency=3) as fetcher:
+            fetcher._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            return await asyncio.gather(*(fetcher.get(f"{URL}/{i}") for i in range(12)))
+
+    assert asyncio.run(run()) == [f"/rates/{i}".encode() for i in range(12)]
+    assert peak == 3
+
+
+def test_rate_limiter_spaces_requests_to_one_host():
+    async def run():
+        limiter = HostRateLimiter(rate_limit=50)
+        started = time.monotonic()
+        await asyncio.gather(*(limiter.wait(HOST) for _ in range(4)), limiter.wait("other.test"))
+        return time.monotonic() - started
+
+    assert asyncio.run(run()) >= 3 / 50
@@ -0,0 +1,67 @@
+import math
+
+import httpx
+import pytest
+
+from src.parsers.http_cache import HttpCache
+
+URL = "https://upstream.test/rates"
+
+
+def test_validators_of_cached_page(tmp_path):
+    cache = HttpCache(str(tmp_path))
+    assert cache.get_validators(URL) == {}
+    headers = httpx.Headers({"ETag": '"v1"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"})
+    assert cache.update(URL, 200, headers, b"page", 0) == b"page"
+    assert cache.get_validators(URL) == {"If-None-Match": '"v1"',
+                                         "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"}
+
+
+def test_fresh_pages_are_served_from_cache(tmp_path):
+    cache = HttpCache(str(tmp_path))
+    cache.update(URL, 200, httpx.Headers(), b"revalidated", 0)
+    assert cache.get_fresh(URL) is None
+    cache.update(URL, 200, httpx.Headers(), b"past rates", math.inf)
+    assert cache.get_fresh(URL) == b"past rates"
+
+
+def test_not_modified_response_returns_cached_body(tmp_path):
+    cache = HttpCache(str(tmp_path))
+    cache.update(URL, 200, httpx.Headers({"ETag": '"v1"'}), b"page", 0)
+    assert cache.update(URL, 304, httpx.Headers({"ETag": '"v1"'}), b"", 60) == b"page"
+    assert cache.get_fresh(URL) == b"page"
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    cache = HttpCache(str(tmp_path), enabled=False)
+    assert cache.update(URL, 200, httpx.Headers({"ETag": '"v1"'}), b"page", math.inf) == b"page"
+    assert cache.get_fresh(URL) is None
+    assert cache.get_validators(URL) == {}
+
+
+def parse_rates(content: bytes) -> str:
+    if b"rates" not in content:
+        raise ValueError("There is no rates table on the page")
+    return content.decode()
+
+
+def test_page_failing_to_parse_is_not_cached(tmp_path):
+    cache = HttpCache(str(tmp_path))
+    with pytest.raises(ValueError):
+        cache.update(URL, 200, httpx.Headers({"ETag": '"v1"'}), b"maintenance", math.inf, parse_rates)
+    assert cache.get_fresh(URL) is None
+    assert cache.get_validators(URL) == {}
+    assert cache.update(URL, 200, httpx.Headers(), b"past rates", math.inf, parse_rates) == "past rates"
+    assert cache.get_fresh(URL, parse_rates) == "past rates"
+
+
+def test_cached_page_failing_to_parse_is_discarded(tmp_path):
+    cache = HttpCache(str(tmp_path))
+    cache.update(URL, 200, httpx.Headers({"ETag": '"v1"'}), b"maintenance", math.inf)
+    assert cache.get_fresh(URL, parse_rates) is None
+    assert cache.get_validators(URL) == {}
+
+    cache.update(URL, 200, httpx.Headers({"ETag": '"v1"'}), b"maintenance", 0)
+    with pytest.raises(ValueError):
+        cache.update(URL, 304, httpx.Headers({"ETag": '"v1"'}), b"", 0, parse_rates)
+    assert cache.get_validators(URL) == {}
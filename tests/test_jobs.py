@@ -0,0 +1,105 @@
+import asyncio
+import threading
+from datetime import datetime
+
+import pytest
+from dependency_injector.providers import Object
+
+from src.adapter.parsers import ParserAdapter
+from src.container import APP_CONTAINER
+from src.jobs.queue import JobQueue
+from src.models.job import Job, JobStatus
+
+
+@pytest.fixture
+def job_queue(app_db, monkeypatch) -> JobQueue:
+    job_queue = JobQueue()
+    APP_CONTAINER.job_queue.override(Object(job_queue))
+    # Jobs do not scrape anything
+    monkeypatch.setattr(ParserAdapter, "_run_job", staticmethod(lambda job: None))
+    yield job_queue
+    job_queue._executor.shutdown()
+    APP_CONTAINER.job_queue.reset_override()
+
+
+def test_enqueue_parse_stores_job_off_event_loop(job_queue, app_db, monkeypatch):
+    threads = []
+    save_job = ParserAdapter.save_job
+
+    def record_thread(self, job):
+        threads.append(threading.current_thread())
+        save_job(self, job)
+    monkeypatch.setattr(ParserAdapter, "save_job", record_thread)
+
+    async def enqueue():
+        return threading.current_thread(), await ParserAdapter().enqueue_parse("2024-01-01", "2024-01-31")
+
+    loop_thread, job = asyncio.run(enqueue())
+    job_queue._executor.shutdown()
+    assert threads and loop_thread not in threads
+    assert asyncio.run(ParserAdapter().get_job(job.id)).status == "done"
+    assert app_db.get_job(job.id).status == JobStatus.done
+
+
+def test_stored_jobs_are_limited_to_history_size(db):
+    jobs = [Job(id=str(i), start_date="2024-01-01", end_date="2024-01-31", created_at=datetime(2024, 1, 1, 0, i))
+            for i in range(5)]
+    for job in jobs:
+        db.save_job(job, history_size=3)
+    jobs[4].status = JobStatus.done
+    db.save_job(jobs[4], history_size=3)
+    assert [db.get_job(job.id) for job in jobs[:2]] == [None, None]
+    assert [db.get_job(job.id) for job in jobs[2:]] == jobs[2:]
+    assert db.conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] == 3
+
+
+def test_enqueue_parse_validates_dates(job_queue):
+    with pytest.raises(ValueError):
+        asyncio.run(ParserAdapter().enqueue_parse("2024-02-01", "2024-01-01"))
+
+
+def test_queue_reuses_and_merges_jobs():
+    job_queue = JobQueue()
+    started, release = threading.Event(), threading.Event()
+
+    def block(job):
+        started.set()
+        release.wait(5)
+
+    running = job_queue.submit("2024-01-01", "2024-01-31", target=block)
+    started.wait(5)
+    assert job_queue.submit("2024-01-10", "2024-01-20", target=block) is running
+    queued = job_queue.submit("2024-02-01", "2024-02-10", target=block)
+    assert queued is not running
+    assert job_queue.submit("2024-02-05", "2024-02-20", target=block) is queued
+    assert (queued.start_date, queued.end_date) == ("2024-02-01", "2024-02-20")
+    release.set()
+    job_queue._executor.shutdown()
+    assert running.status == queued.status == JobStatus.done
+    assert running.duration is not None
+
+
+def test_failed_job_records_error():
+    job_queue = JobQueue()
+
+    def fail(job):
+        raise ValueError("upstream is down")
+
+    job = job_queue.submit("2024-01-01", "2024-01-31", target=fail)
+    job_queue._executor.shutdown()
+    assert job.status == JobStatus.failed
+    assert job.error == "upstream is down"
+
+
+def test_job_progress_by_currency():
+    job = Job(id="job", start_date="2024-01-01", end_date="2024-01-31", created_at=datetime.now())
+    job.currency_started("USD", chunks=2)
+    job.currency_started("EUR", chunks=0)
+    job.chunk_finished("USD", 10)
+    assert job.currencies["USD"].status == JobStatus.running
+    job.chunk_finished("USD", 5)
+    assert (job.currencies["USD"].status, job.currencies["USD"].rows) == (JobStatus.done, 15)
+    assert job.currencies["EUR"].status == JobStatus.done
+    job.currency_started("GBP")
+    job.chunk_finished("GBP", 0, ValueError("no table"))
+    assert job.currencies["GBP"].status == JobStatus.failed
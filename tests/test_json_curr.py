@@ -0,0 +1,40 @@
+import json
+
+from src.database.sqlite import Database
+from src.parsers.json_curr import JsonCurrParser
+from src.settings.config import settings
+
+
+def test_basic_values_are_scraped_once(tmp_path, monkeypatch):
+    scraped = []
+
+    def parse_basic_curr(self, cur_code):
+        scraped.append(cur_code)
+        return cur_code / 10
+    monkeypatch.setattr(JsonCurrParser, "parse_basic_curr", parse_basic_curr)
+    with open(settings.CURR_CONFIG) as f:
+        codes = [el["cur_code"] for el in json.load(f)]
+
+    db = Database(str(tmp_path / "test.db"))
+    currencies = JsonCurrParser(db).parse_county_curr()
+    assert sorted(scraped) == sorted(codes)
+    assert [currency.value for currency in currencies] == [code / 10 for code in codes]
+
+    scraped.clear()
+    assert JsonCurrParser(db).parse_county_curr() == currencies
+    assert scraped == []
+    db.close()
+
+
+def test_missing_basic_values_are_scraped(tmp_path, monkeypatch):
+    monkeypatch.setattr(JsonCurrParser, "parse_basic_curr", lambda self, cur_code: 1.0)
+    db = Database(str(tmp_path / "test.db"))
+    currencies = JsonCurrParser(db).parse_county_curr()
+    with db.writer() as con:
+        con.execute("UPDATE currencies SET basic_date = NULL WHERE cur_code = ?", (currencies[0].cur_code,))
+
+    scraped = []
+    monkeypatch.setattr(JsonCurrParser, "parse_basic_curr", lambda self, cur_code: scraped.append(cur_code) or 1.0)
+    JsonCurrParser(db).parse_county_curr()
+    assert scraped == [currencies[0].cur_code]
+    db.close()
@@ -0,0 +1,28 @@
+import threading
+
+from src.database.locks import FileLock
+
+
+def test_blocking_acquire_waits_for_release(tmp_path):
+    path = str(tmp_path / "ingest.lock")
+    holder = FileLock(path)
+    assert holder.acquire()
+    acquired = threading.Event()
+
+    def wait_for_lock():
+        with FileLock(path):
+            acquired.set()
+    waiter = threading.Thread(target=wait_for_lock)
+    waiter.start()
+    assert not acquired.wait(0.1)
+    holder.release()
+    waiter.join(5)
+    assert acquired.is_set()
+
+
+def test_released_lock_can_be_acquired_again(tmp_path):
+    lock = FileLock(str(tmp_path / "init.lock"))
+    with lock:
+        assert not FileLock(lock.path).acquire(blocking=False)
+    assert lock.acquire(blocking=False)
+    lock.release()
@@ -0,0 +1,39 @@
+from fastapi.testclient import TestClient
+
+from src.monitoring.metrics import Gauge, Histogram, MetricsRegistry
+from src.presentation.app import get_app
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_seconds", "Test durations", ["stage"], buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 2):
+        histogram.observe(value, "db_read")
+    assert histogram.collect() == [
+        "# HELP test_seconds Test durations",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{stage="db_read",le="0.1"} 2',
+        'test_seconds_bucket{stage="db_read",le="1.0"} 3',
+        'test_seconds_bucket{stage="db_read",le="+Inf"} 4',
+        'test_seconds_sum{stage="db_read"} 2.65',
+        'test_seconds_count{stage="db_read"} 4',
+    ]
+
+
+def test_registry_renders_all_metrics():
+    registry = MetricsRegistry()
+    registry.register(Histogram("test_seconds", "Test durations"))
+    registry.register(Gauge("test_entries", "Test entries", ["cache"], lambda: {("values",): 3}))
+    text = registry.render()
+    assert text.endswith('test_entries{cache="values"} 3\n')
+    assert "# TYPE test_seconds histogram\n" in text
+
+
+def test_metrics_endpoint_counts_requests(app_db):
+    client = TestClient(get_app())
+    client.get("/api/countries")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'currency_parser_http_request_seconds_count{method="GET",route="/api/countries",status="200"}' \
+           in response.text
+    assert 'currency_parser_stage_seconds_count{stage="db_read"}' in response.text
@@ -0,0 +1,49 @@
+from datetime import datetime
+
+from src.parsers.ranges import merge_ranges, missing_ranges, split_range
+
+
+def day(value: str) -> datetime:
+    return datetime.strptime(value, "%Y-%m-%d")
+
+
+def date_range(start: str, end: str) -> tuple[datetime, datetime]:
+    return day(start), day(end)
+
+
+def test_merge_overlapping_and_adjacent_ranges():
+    ranges = [date_range("2024-03-01", "2024-03-10"), date_range("2024-01-01", "2024-01-31"),
+              date_range("2024-02-01", "2024-02-10"), date_range("2024-03-05", "2024-03-06")]
+    assert merge_ranges(ranges) == [date_range("2024-01-01", "2024-02-10"), date_range("2024-03-01", "2024-03-10")]
+
+
+def test_missing_ranges_between_covered_ones():
+    covered = [date_range("2024-01-05", "2024-01-10"), date_range("2024-01-20", "2024-02-10")]
+    assert missing_ranges(day("2024-01-01"), day("2024-01-31"), covered) == [
+        date_range("2024-01-01", "2024-01-04"), date_range("2024-01-11", "2024-01-19")]
+
+
+def test_nothing_is_missing_in_covered_range():
+    covered = [date_range("2023-12-01", "2024-01-15"), date_range("2024-01-16", "2024-02-01")]
+    assert missing_ranges(day("2024-01-01"), day("2024-01-31"), covered) == []
+
+
+def test_everything_is_missing_without_coverage():
+    assert missing_ranges(day("2024-01-01"), day("2024-01-31"), []) == [date_range("2024-01-01", "2024-01-31")]
+    covered = [date_range("2023-01-01", "2023-12-31"), date_range("2024-02-01", "2024-02-02")]
+    assert missing_ranges(day("2024-01-01"), day("2024-01-31"), covered) == [date_range("2024-01-01", "2024-01-31")]
+
+
+def test_stored_coverage_is_merged(db):
+    db.add_coverage("USD", *date_range("2024-01-01", "2024-01-10"))
+    db.add_coverage("USD", *date_range("2024-01-11", "2024-01-20"))
+    db.add_coverage("USD", *date_range("2024-03-01", "2024-03-31"))
+    assert db.get_coverage() == {"USD": [date_range("2024-01-01", "2024-01-20"),
+                                         date_range("2024-03-01", "2024-03-31")]}
+
+
+def test_split_range_into_chunks():
+    assert split_range(day("2024-01-01"), day("2024-01-25"), 10) == [
+        date_range("2024-01-01", "2024-01-10"), date_range("2024-01-11", "2024-01-20"),
+        date_range("2024-01-21", "2024-01-25")]
+    assert split_range(day("2024-01-01"), day("2024-01-01"), 10) == [date_range("2024-01-01", "2024-01-01")]
@@ -0,0 +1,94 @@
+import asyncio
+import math
+from array import array
+from datetime import date, timedelta
+
+from src.adapter.parsers import ParserAdapter
+from src.adapter.resample import Aggregation, Resolution, aggregate, bucket_start, downsample, lttb_indices
+from src.models.series import Series, align_series
+from tests.conftest import value_rows
+
+
+def daily_series(values: list[float], start: str = "2024-01-01") -> Series:
+    first = date.fromisoformat(start)
+    return Series(dates=[(first + timedelta(days=i)).isoformat() for i in range(len(values))],
+                  values=array("d", values))
+
+
+def test_bucket_start():
+    assert bucket_start("2024-02-15", Resolution.month) == "2024-02-01"
+    assert bucket_start("2024-02-15", Resolution.week) == "2024-02-12"
+    assert bucket_start("2024-02-15", Resolution.day) == "2024-02-15"
+
+
+def test_weekly_mean_and_ohlc():
+    # 2024-01-01 is a Monday, so the days fall into two weeks
+    series = daily_series([1, 2, 3, 4, 5, 6, 7, 10, 8])
+    mean = aggregate(series, Resolution.week, Aggregation.mean)
+    assert mean["value"].dates == ["2024-01-01", "2024-01-08"]
+    assert list(mean["value"].values) == [4.0, 9.0]
+
+    ohlc = aggregate(series, Resolution.week, Aggregation.ohlc)
+    assert [list(ohlc[field].values) for field in ("open", "high", "low", "close")] == [
+        [1, 10], [7, 10], [1, 8], [7, 8]]
+
+
+def test_lttb_keeps_ends_and_extremes():
+    values = array("d", [math.sin(i / 10) for i in range(1000)])
+    values[500] = 5.0
+    indices = lttb_indices([values], 50)
+    assert len(indices) == 50
+    assert indices[0] == 0 and indices[-1] == 999
+    assert indices == sorted(set(indices))
+    assert 500 in indices
+
+
+def test_lttb_keeps_short_series():
+    assert lttb_indices([array("d", [1, 2, 3])], 10) == [0, 1, 2]
+    assert lttb_indices([array("d", [1, 2, 3, 4])], 2) == [0, 1, 2, 3]
+    assert lttb_indices([], 10) == []
+
+
+def test_lttb_keeps_extremes_of_every_series():
+    first = [math.sin(i / 10) for i in range(1000)]
+    second = [1000 + math.cos(i / 10) for i in range(1000)]
+    first[300], second[700] = 5.0, 1010.0
+    indices = lttb_indices([first, second], 50)
+    assert len(indices) == 50
+    assert 300 in indices and 700 in indices
+
+
+def test_lttb_avoids_missing_values():
+    first = [float(i % 13) for i in range(1000)]
+    second = [None if i % 5 == 0 else float(i % 7) for i in range(1000)]
+    indices = lttb_indices([first, second], 100)
+    assert all(second[i] is not None for i in indices[1:])
+
+
+def test_downsample_keeps_series_aligned():
+    series = aggregate(daily_series([float(i % 17) for i in range(400)]), Resolution.day, Aggregation.ohlc)
+    dates, aligned = align_series(list(series.values()))
+    sampled_dates, sampled = downsample(dates, aligned, 40, main=[3])
+    assert len(sampled_dates) == 40
+    assert all(len(el) == 40 for el in sampled)
+    positions = [dates.index(day) for day in sampled_dates]
+    assert sampled == [[el[i] for i in positions] for el in aligned]
+
+
+def test_short_and_empty_axis_is_kept():
+    assert downsample(["2024-01-01"], [[1.0]], 10) == (["2024-01-01"], [[1.0]])
+    assert downsample([], [[], []], 10) == ([], [[], []])
+
+
+def test_chart_of_several_currencies_has_shared_axis(app_db):
+    # EUR has no rate every 7th day, so the currencies have different dates
+    days = [(date(2000, 1, 1) + timedelta(days=i)).isoformat() for i in range(9000)]
+    app_db.bulk_insert_curr_values(
+        value_rows(app_db, "USD", {day: 70 + math.sin(i / 30) for i, day in enumerate(days)})
+        + value_rows(app_db, "EUR", {day: 80 + math.cos(i / 20) for i, day in enumerate(days) if i % 7 != 3}))
+    data = asyncio.run(ParserAdapter().get_data_values(["США", "Германия"], days[0], days[-1], max_points=1000))
+    assert len(data["labels"]) <= 1000
+    assert data["labels"][0] == days[0] and data["labels"][-1] == days[-1]
+    for dataset in data["datasets"]:
+        assert len(dataset["data"]) == len(data["labels"])
+        assert None not in dataset["data"]
@@ -0,0 +1,58 @@
+import math
+import sqlite3
+
+import pytest
+
+from src.database.sqlite import ROLLUP_MONTHLY
+from src.models.series import RollupPeriod
+from tests.conftest import value_rows
+
+
+def expected_rollup(values: list[float]) -> tuple:
+    mean = sum(values) / len(values)
+    stddev = math.sqrt(max(sum(value * value for value in values) / len(values) - mean * mean, 0))
+    return len(values), mean, min(values), max(values), values[-1], stddev
+
+
+def as_tuple(rollup) -> tuple:
+    return rollup.count, rollup.mean, rollup.min, rollup.max, rollup.last, rollup.stddev
+
+
+def test_rollups_of_written_months(db):
+    usd = db.get_currency_ids()["USD"]
+    rollups = db.get_rollups([usd], "2024-01", "2024-12")[usd]
+    assert [rollup.period for rollup in rollups] == ["2024-01", "2024-02"]
+    assert as_tuple(rollups[0]) == pytest.approx(expected_rollup([90.0, 91.0]))
+    assert as_tuple(rollups[1]) == pytest.approx(expected_rollup([92.0]))
+
+
+def test_rollups_follow_updates(db):
+    usd = db.get_currency_ids()["USD"]
+    db.bulk_insert_curr_values(value_rows(db, "USD", {"2024-01-31": 95.0, "2024-02-29": 93.0,
+                                                      "2023-12-29": 89.0}))
+    rollups = db.get_rollups([usd], "2023-01", "2024-12")[usd]
+    assert [rollup.period for rollup in rollups] == ["2023-12", "2024-01", "2024-02"]
+    assert as_tuple(rollups[1]) == pytest.approx(expected_rollup([90.0, 95.0]))
+    assert as_tuple(rollups[2]) == pytest.approx(expected_rollup([92.0, 93.0]))
+
+
+def test_yearly_rollups_merge_months(db):
+    usd = db.get_currency_ids()["USD"]
+    db.bulk_insert_curr_values(value_rows(db, "USD", {"2023-12-29": 89.0}))
+    rollups = db.get_rollups([usd], "2023-01", "2024-12", RollupPeriod.year)[usd]
+    assert [rollup.period for rollup in rollups] == ["2023", "2024"]
+    assert as_tuple(rollups[1]) == pytest.approx(expected_rollup([90.0, 91.0, 92.0]))
+
+
+def test_incremental_rollups_match_full_rebuild(db):
+    eur = db.get_currency_ids()["EUR"]
+    db.bulk_insert_curr_values(value_rows(db, "EUR", {f"2023-{month:02d}-{day:02d}": month * 10 + day / 10
+                                                      for month in range(1, 13) for day in (1, 15, 28)}))
+    conn = sqlite3.connect(db.path)
+    incremental = conn.execute("SELECT * FROM curr_value_monthly ORDER BY cur_id, month").fetchall()
+    with conn:
+        conn.execute("DELETE FROM curr_value_monthly")
+        conn.execute(ROLLUP_MONTHLY.format(where="1"))
+    assert conn.execute("SELECT * FROM curr_value_monthly ORDER BY cur_id, month").fetchall() == incremental
+    conn.close()
+    assert len(db.get_rollups([eur], "2023-01", "2024-12")[eur]) == 14
@@ -0,0 +1,100 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from src.presentation.app import get_app
+
+SERIES_URL = "/api/series/currency/USD?start_date=2024-01-01&end_date=2024-02-29"
+
+
+@pytest.fixture
+def client(app_db) -> TestClient:
+    # The lifespan is not run, so the app does not scrape basic values
+    return TestClient(get_app())
+
+
+def test_series_has_etag(client):
+    response = client.get(SERIES_URL)
+    assert response.status_code == 200
+    assert response.json() == {"name": "USD", "dates": ["2024-01-30", "2024-01-31", "2024-02-01"],
+                               "values": [20.0, 21.0, 22.0]}
+    assert response.headers["etag"]
+    assert response.headers["last-modified"]
+
+
+def test_not_modified_series_is_not_read(client, app_db, monkeypatch):
+    urls = (SERIES_URL, "/api/series/country/США?start_date=2024-01-01&end_date=2024-02-29",
+            "/api/stats/currency/USD?start_date=2024-01-01&end_date=2024-02-29")
+    etags = [client.get(url).headers["etag"] for url in urls]
+
+    def read_values(*args):
+        raise AssertionError("values are read for a 304 response")
+    for method in ("get_series", "get_series_for_countries", "get_rollups"):
+        monkeypatch.setattr(app_db, method, read_values)
+
+    for url, etag in zip(urls, etags):
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert not response.content
+
+
+def test_etag_changes_after_write(client, app_db):
+    etag = client.get(SERIES_URL).headers["etag"]
+    cur_id = app_db.get_currency_ids()["USD"]
+    app_db.bulk_insert_curr_values([(cur_id, 93.0, 23.0, "2024-02-02")])
+    response = client.get(SERIES_URL, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["values"][-1] == 23.0
+
+
+def test_unknown_currency_is_bad_request(client):
+    response = client.get("/api/series/currency/XXX?start_date=2024-01-01&end_date=2024-02-29")
+    assert response.status_code == 400
+
+
+def test_api_validation_error_is_json(client):
+    response = client.get("/api/series/currency/USD?start_date=2024-01-01")
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["query", "end_date"]
+
+
+def test_form_validation_error_renders_page(client):
+    response = client.post("/parser", data={"start_date": "2024-01-01"})
+    assert response.status_code == 200
+    assert "Некорректный запрос" in response.text
+
+
+def test_main_page_renders_without_chart(client):
+    response = client.get("/")
+    assert response.status_code == 200
+    assert "Германия" in response.text
+    assert "new Chart" not in response.text
+
+
+def test_chart_is_aligned_for_countries(client):
+    response = client.post("/chart", data={"start_date": "2024-01-01", "end_date": "2024-02-29",
+                                           "input_country": ["США", "Германия"]})
+    assert response.status_code == 200
+    assert "new Chart" in response.text
+    assert '"labels": ["2024-01-30", "2024-01-31", "2024-02-01", "2024-02-02"]' in response.text
+
+
+def test_series_is_rebased_on_base_date(client):
+    response = client.get(f"{SERIES_URL}&base_date=2024-01-31")
+    assert response.json()["values"] == [-1.0, 0.0, 1.0]
+    # EUR has no rate on 2024-02-01, the rate of the closest earlier date is the base
+    response = client.get("/api/series/country/Германия?start_date=2024-01-01&end_date=2024-02-29"
+                          "&base_date=2024-02-01")
+    assert response.json()["values"] == [0.0, 1.0]
+
+
+def test_stats_are_rebased_on_base_date(client):
+    url = "/api/stats/currency/USD?start_date=2024-01-01&end_date=2024-02-29"
+    default = client.get(url).json()["stats"]
+    rebased = client.get(f"{url}&base_date=2024-01-31").json()["stats"]
+    assert [el["mean"] for el in rebased] == pytest.approx([el["mean"] - 21.0 for el in default])
+    assert [el["stddev"] for el in default] == [el["stddev"] for el in rebased]
+
+
+def test_base_date_without_data_is_bad_request(client):
+    response = client.get(f"{SERIES_URL}&base_date=2024-01-01")
+    assert response.status_code == 400
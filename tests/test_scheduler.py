@@ -0,0 +1,76 @@
+from datetime import datetime
+
+import pytest
+from dependency_injector.providers import Object
+
+from src.adapter.parsers import ParserAdapter
+from src.container import APP_CONTAINER
+from src.database.locks import FileLock
+from src.jobs.scheduler import DailyScheduler
+from src.models.job import JobStatus
+
+
+@pytest.fixture
+def scheduler(app_db, tmp_path) -> DailyScheduler:
+    scheduler = DailyScheduler()
+    APP_CONTAINER.scheduler.override(Object(scheduler))
+    APP_CONTAINER.scheduler_lock.override(Object(FileLock(str(tmp_path / "scheduler.lock"))))
+    yield scheduler
+    APP_CONTAINER.scheduler.reset_override()
+    APP_CONTAINER.scheduler_lock.reset_override()
+
+
+def test_scheduler_runs_in_one_process(scheduler, tmp_path):
+    # Locks of other processes conflict the same way as a second lock of this process
+    other_process = FileLock(str(tmp_path / "scheduler.lock"))
+    assert other_process.acquire(blocking=False)
+    assert not ParserAdapter().start_scheduler()
+    assert scheduler._thread is None
+    other_process.release()
+
+    assert ParserAdapter().start_scheduler()
+    assert scheduler._thread.is_alive()
+    assert not other_process.acquire(blocking=False)
+    ParserAdapter.stop_scheduler()
+    assert not scheduler._thread.is_alive()
+    assert other_process.acquire(blocking=False)
+    other_process.release()
+
+
+@pytest.mark.parametrize("now, expected", [
+    (datetime(2024, 1, 31, 9, 59), datetime(2024, 1, 31, 10, 0)),
+    (datetime(2024, 1, 31, 10, 0), datetime(2024, 2, 1, 10, 0)),
+    (datetime(2024, 12, 31, 23, 0), datetime(2025, 1, 1, 10, 0)),
+])
+def test_next_run_time(now, expected):
+    assert DailyScheduler(run_at="10:00").next_run_time(now) == expected
+
+
+def test_run_once_retries_failures():
+    attempts = []
+
+    def target() -> int:
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ConnectionError("timeout")
+        return 42
+
+    reported = []
+    scheduler = DailyScheduler(retries=5, backoff=0)
+    assert scheduler.run_once(target, on_status=lambda status: reported.append(status.last_status))
+    assert len(attempts) == 3
+    assert scheduler.status.attempts == 3
+    assert scheduler.status.rows_written == 42
+    assert scheduler.status.last_status == JobStatus.done
+    assert reported[-1] == JobStatus.done
+
+
+def test_run_once_gives_up_after_retries():
+    def target() -> int:
+        raise ConnectionError("timeout")
+
+    scheduler = DailyScheduler(retries=2, backoff=0)
+    assert not scheduler.run_once(target)
+    assert scheduler.status.attempts == 3
+    assert scheduler.status.last_status == JobStatus.failed
+    assert "timeout" in scheduler.status.last_error
@@ -0,0 +1,32 @@
+from array import array
+
+from src.models.series import Rollup, Series, align_series
+
+
+def test_series_are_aligned_on_union_of_dates():
+    first = Series(dates=["2024-01-01", "2024-01-03"], values=array("d", [1.0, 3.0]))
+    second = Series(dates=["2024-01-02", "2024-01-03", "2024-01-04"], values=array("d", [20.0, 30.0, 40.0]))
+    dates, aligned = align_series([first, second])
+    assert dates == ["2024-01-01", "2024-01-02", "2024-01-03", "2024-01-04"]
+    assert aligned == [[1.0, None, 3.0, None], [None, 20.0, 30.0, 40.0]]
+
+
+def test_forward_fill_keeps_leading_gap():
+    first = Series(dates=["2024-01-02", "2024-01-04"], values=array("d", [2.0, 4.0]))
+    second = Series(dates=["2024-01-01", "2024-01-03"], values=array("d", [1.0, 3.0]))
+    assert align_series([first, second], forward_fill=True)[1] == [[None, 2.0, 2.0, 4.0], [1.0, 1.0, 3.0, 3.0]]
+
+
+def test_empty_series_are_aligned():
+    assert align_series([]) == ([], [])
+    assert align_series([Series()], forward_fill=True) == ([], [[]])
+
+
+def test_shift_keeps_dates_and_stddev():
+    series = Series(dates=["2024-01-01", "2024-01-02"], values=array("d", [90.12345, 91.0]))
+    shifted = series.shift(-70.0)
+    assert shifted.dates is series.dates
+    assert list(shifted.values) == [20.1235, 21.0]
+    rollup = Rollup(period="2024-01", count=2, mean=90.5, min=90.0, max=91.0, last=91.0, stddev=0.5)
+    assert rollup.shift(-70.0) == Rollup(period="2024-01", count=2, mean=20.5, min=20.0, max=21.0, last=21.0,
+                                         stddev=0.5)
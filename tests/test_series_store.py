@@ -0,0 +1,74 @@
+from array import array
+
+import pytest
+
+from src.database.series_store import MmapDatabase, SeriesStore, date_to_day
+from src.database.sqlite import Database
+from tests.conftest import COUNTRIES, CURRENCIES, value_rows
+
+USD_VALUES = {"2024-01-30": 90.0, "2024-01-31": 91.0, "2024-02-01": 92.0}
+
+
+@pytest.fixture
+def mmap_db(tmp_path) -> MmapDatabase:
+    database = MmapDatabase(str(tmp_path / "test.db"), batch_size=2)
+    database.insert_currencies(CURRENCIES, "2022-04-22")
+    database.insert_countries(COUNTRIES)
+    database.bulk_insert_curr_values(value_rows(database, "USD", USD_VALUES))
+    yield database
+    database.close()
+
+
+def read_both(database: MmapDatabase, start_date: str = "2024-01-01", end_date: str = "2024-12-31"):
+    currency_ids = sorted(database.get_currency_ids().values())
+    return (database.get_series(currency_ids, start_date, end_date),
+            Database.get_series.__wrapped__(database, currency_ids, start_date, end_date))
+
+
+def test_store_matches_sqlite(mmap_db):
+    assert mmap_db._store_is_current()
+    stored, expected = read_both(mmap_db)
+    assert stored == expected
+    assert stored[mmap_db.get_currency_ids()["USD"]].dates == list(USD_VALUES)
+
+
+def test_store_follows_inserts_and_updates(mmap_db):
+    mmap_db.bulk_insert_curr_values(value_rows(mmap_db, "USD", {"2024-01-31": 95.0, "2024-02-05": 96.0}))
+    mmap_db.bulk_insert_curr_values(value_rows(mmap_db, "EUR", {"2024-03-01": 99.0}))
+    assert mmap_db._store_is_current()
+    stored, expected = read_both(mmap_db)
+    assert stored == expected
+    assert list(stored[mmap_db.get_currency_ids()["USD"]].values) == [90.0, 95.0, 92.0, 96.0]
+
+
+def test_countries_and_currencies_keep_store_current(mmap_db):
+    version = mmap_db.store.version
+    last_modified = mmap_db.get_last_modified()
+    mmap_db.insert_countries({"USD": ["Панама"]})
+    mmap_db.insert_currencies([CURRENCIES[0].model_copy(update={"value": 71.0})], "2022-04-23")
+    assert mmap_db.get_last_modified() > last_modified
+    assert mmap_db.store.version == version
+    assert mmap_db._store_is_current()
+
+
+def test_store_written_by_other_process_is_rebuilt(mmap_db, tmp_path):
+    other = Database(mmap_db.path)
+    other.bulk_insert_curr_values(value_rows(other, "EUR", {"2024-04-01": 100.0}))
+    other.close()
+    assert not mmap_db._store_is_current()
+    stored, expected = read_both(mmap_db)
+    assert stored == expected
+
+    reopened = MmapDatabase(mmap_db.path)
+    assert reopened._store_is_current()
+    assert read_both(reopened)[0] == expected
+    reopened.close()
+
+
+def test_store_value_at(tmp_path):
+    store = SeriesStore(str(tmp_path / "series"))
+    days = array("i", [date_to_day("2024-01-01"), date_to_day("2024-01-03")])
+    store.rebuild([(1, days, array("d", [1.0, 3.0]))], "v1")
+    assert store.get_value_at(1, date_to_day("2024-01-02")) == 1.0
+    assert store.get_value_at(1, date_to_day("2023-12-31")) is None
+    assert SeriesStore(str(tmp_path / "series")).version == "v1"
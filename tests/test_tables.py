@@ -0,0 +1,42 @@
+from datetime import datetime
+
+import pytest
+
+from benchmarks.fixtures import finmarket_page, iban_page, rate
+from src.parsers.currency import CurrencyParser
+from src.parsers.tables import BACKENDS, extract_table
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_backends_extract_rates_table(backend):
+    content = finmarket_page(840, datetime(2024, 1, 1), datetime(2024, 1, 7))
+    rows = extract_table(content, "karramba", backend=backend)
+    assert len(rows) == 5
+    assert rows[0][:3] == ["01.01.2024", "1", f"{rate(840, datetime(2024, 1, 1)):.4f}".replace(".", ",")]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_backends_extract_the_same_cells(backend):
+    content = iban_page(countries_per_currency=2)
+    rows = extract_table(content, "table-bordered", backend=backend)
+    assert rows == extract_table(content, "table-bordered", backend="bs4")
+    assert rows[0][0].endswith("& острова")
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_missing_table(backend):
+    assert extract_table(b"<html><table class='other'><tr><td>1</td></tr></table></html>", "karramba",
+                         backend=backend) is None
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        extract_table(b"", "karramba", backend="regex")
+
+
+def test_rates_are_decoded():
+    content = finmarket_page(978, datetime(2024, 1, 1), datetime(2024, 1, 3))
+    values = CurrencyParser._parse_table(content)
+    assert [(el.date, el.value) for el in values] == [(day, rate(978, day)) for day in
+                                                       (datetime(2024, 1, 1), datetime(2024, 1, 2),
+                                                        datetime(2024, 1, 3))]
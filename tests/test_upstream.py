@@ -0,0 +1,18 @@
+from datetime import datetime
+
+import httpx
+
+from benchmarks.fixtures import finmarket_page
+from benchmarks.upstream import FakeUpstream
+
+
+def test_fake_upstream_serves_pages_with_etags():
+    with FakeUpstream() as upstream:
+        url = f"{upstream.finmarket_url}?cur=840&bd=1&bm=1&by=2024&ed=31&em=1&ey=2024"
+        response = httpx.get(url)
+        assert response.status_code == 200
+        assert response.content == finmarket_page(840, datetime(2024, 1, 1), datetime(2024, 1, 31))
+
+        assert httpx.get(url, headers={"If-None-Match": response.headers["etag"]}).status_code == 304
+        assert httpx.get(upstream.iban_url).status_code == 200
+        assert httpx.get(f"http://127.0.0.1:{upstream.port}/unknown").status_code == 404